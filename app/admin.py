@@ -0,0 +1,53 @@
+"""
+Admin blueprint, loaded lazily
+
+Only the URL rules are defined here. Each rule points at a LazyView that
+imports admin_views (and with it the upload handling, order export and
+profile report code) on the first admin request, so storefront-only workers
+never load any of it. Run a storefront pool with ADMIN_ENABLED=0 to leave the
+blueprint out altogether and route /admin to a separate pool.
+"""
+
+from flask import Blueprint
+from werkzeug.utils import cached_property, import_string
+
+# (rule, view name in admin_views, methods)
+ADMIN_ROUTES = [
+    ('/admin/login', 'admin_login', ['GET', 'POST']),
+    ('/admin/logout', 'admin_logout', ['GET']),
+    ('/admin/category', 'admin_category', ['GET', 'POST']),
+    ('/admin/category/<folder>/add-product', 'add_product_form', ['GET']),
+    ('/admin/delete/<folder>', 'delete_category', ['POST']),
+    ('/admin/manage/<folder>', 'manage_category', ['GET']),
+    ('/admin/manage/<folder>/add', 'add_product', ['GET', 'POST']),
+    ('/admin/manage/<folder>/edit/<slug>', 'edit_product', ['GET', 'POST']),
+    ('/admin/manage/<folder>/delete/<slug>', 'delete_product', ['GET', 'POST']),
+    ('/admin/orders', 'admin_orders', ['GET']),
+    ('/admin/orders/<order_id>/status', 'update_order_status', ['POST']),
+    ('/admin/orders/export', 'export_orders_route', ['GET']),
+    ('/admin/dashboard', 'admin_dashboard', ['GET']),
+    ('/admin/fragment-cache', 'fragment_cache_stats', ['GET']),
+    ('/admin/profile', 'admin_profile', ['GET']),
+    ('/admin/profile/<profile_id>', 'admin_profile_detail', ['GET']),
+]
+
+
+class LazyView:
+    """View function that imports the real one on its first call"""
+
+    def __init__(self, import_name):
+        self.__module__, self.__name__ = import_name.rsplit('.', 1)
+        self.import_name = import_name
+
+    @cached_property
+    def view(self):
+        return import_string(self.import_name)
+
+    def __call__(self, *args, **kwargs):
+        return self.view(*args, **kwargs)
+
+
+bp = Blueprint('admin', __name__)
+
+for rule, name, methods in ADMIN_ROUTES:
+    bp.add_url_rule(rule, name, LazyView(f'admin_views.{name}'), methods=methods)
@@ -0,0 +1,652 @@
+"""
+Admin views: login, category and product editing, orders, the sales
+dashboard, fragment cache stats and request profiles
+
+Imported by the first admin request (see admin.py), together with the image
+upload and order export code only these views use.
+"""
+
+import json
+import math
+import os
+import time
+
+from flask import current_app, flash, jsonify, redirect, render_template, request, send_file, session, url_for
+
+from app import fragment_cache, logger, order_store, request_profiler, slugify
+from catalog import (add_india_shipping, get_listing_args, invalidate_catalog_fragments, load_categories,
+                     load_products, paginate_products, products_path, save_products, update_category_count)
+from datastore import locked, update_json
+from order_export import export_orders, EXPORT_FORMATS
+from order_store import InvalidStatusTransition, ORDER_STATUS_TRANSITIONS
+from shipping import EXCLUDED_COUNTRIES, SHIPPING_DISCOUNT, SHIPPING_RATE_PER_1000KM_PER_KG
+from uploads import save_uploaded_file
+
+ADMIN_ORDERS_PER_PAGE = 50
+
+def admin_profile():
+    """Slowest recently profiled requests with their top functions"""
+    if not session.get('logged_in'):
+        return redirect(url_for('admin.admin_login'))
+    
+    profiles = request_profiler.slowest(limit=min(max(1, request.args.get('limit', 50, type=int)), 200))
+    if request.args.get('format') == 'json':
+        return jsonify({'success': True, 'enabled': current_app.config['PROFILING_ENABLED'], 'profiles': profiles})
+    return render_template('admin_profile.html', profiles=profiles, enabled=current_app.config['PROFILING_ENABLED'])
+
+def admin_profile_detail(profile_id):
+    """Full pstats report for one profile, or the raw .prof file with ?download=1"""
+    if not session.get('logged_in'):
+        return redirect(url_for('admin.admin_login'))
+    
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        return 'Profile not found', 404
+    if request.args.get('download'):
+        return send_file(request_profiler.prof_path(profile_id), as_attachment=True,
+                         download_name=f'{profile_id}.prof')
+    if request.args.get('format') == 'json':
+        return jsonify(profile)
+    return current_app.response_class(profile['text'], mimetype='text/plain')
+
+def admin_login():
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+        
+        # Get admin credentials from environment variables
+        admin_username = os.getenv('ADMIN_USERNAME', 'admin')
+        admin_password = os.getenv('ADMIN_PASSWORD', 'admin123')
+        
+        if username == admin_username and password == admin_password:
+            session['logged_in'] = True
+            return redirect(url_for('admin.admin_category'))
+        else:
+            flash('Invalid credentials')
+    return render_template('admin_login.html')
+
+def admin_logout():
+    session.pop('logged_in', None)
+    return redirect(url_for('admin.admin_login'))
+
+def admin_category():
+    if not session.get('logged_in'):
+        return redirect(url_for('admin.admin_login'))
+
+    if request.method == 'POST':
+        try:
+            name = request.form.get('name', '').strip()
+            description = request.form.get('description', '').strip()
+            folder = request.form.get('folder', '').strip().lower().replace(" ", "_")
+            image_file = request.files.get('image')
+
+            # Validate all required fields first
+            if not name:
+                flash('Category name is required.')
+                return redirect(url_for('admin.admin_category'))
+            
+            if not description:
+                flash('Category description is required.')
+                return redirect(url_for('admin.admin_category'))
+                
+            if not folder:
+                flash('Category folder name is required.')
+                return redirect(url_for('admin.admin_category'))
+
+            if not image_file or not image_file.filename:
+                flash('Category image is required.')
+                return redirect(url_for('admin.admin_category'))
+
+            # Check if folder already exists
+            categories_file = os.path.join('data', 'categories.json')
+            if os.path.exists(categories_file):
+                with open(categories_file, 'r') as f:
+                    existing_categories = json.load(f)
+                
+                for cat in existing_categories:
+                    if cat.get('folder') == folder:
+                        flash(f'Category folder "{folder}" already exists. Choose a different folder name.')
+                        return redirect(url_for('admin.admin_category'))
+            else:
+                existing_categories = []
+
+            # STEP 1: First save the image and ensure it succeeds
+            filename, error = save_uploaded_file(image_file)
+            if error:
+                flash(f'Image upload failed: {error}')
+                return redirect(url_for('admin.admin_category'))
+            
+            if not filename:
+                flash('Image upload failed: No filename returned')
+                return redirect(url_for('admin.admin_category'))
+            
+            # Verify the file was actually saved
+            image_path = os.path.join('static', 'images', filename)
+            if not os.path.exists(image_path):
+                flash('Image upload failed: File was not saved properly')
+                return redirect(url_for('admin.admin_category'))
+            
+
+            # STEP 2: Create data folder only after image upload succeeds
+            folder_path = os.path.join('data', folder)
+            try:
+                os.makedirs(folder_path, exist_ok=True)
+            except Exception as e:
+                # If folder creation fails, clean up the uploaded image
+                try:
+                    os.remove(image_path)
+                except:
+                    pass
+                flash(f'Failed to create category folder: {str(e)}')
+                return redirect(url_for('admin.admin_category'))
+
+            # STEP 3: Update categories.json only after everything else succeeds
+            new_category = {
+                'name': name,
+                'description': description,
+                'folder': folder,
+                'image': filename,
+                'count': 0
+            }
+            
+            try:
+                # Append to the current categories.json, not the copy read above
+                with update_json(categories_file, []) as categories:
+                    categories.append(new_category)
+                
+            except Exception as e:
+                # If JSON update fails, clean up created files
+                try:
+                    os.remove(image_path)
+                    os.rmdir(folder_path)
+                except:
+                    pass
+                flash(f'Failed to save category data: {str(e)}')
+                return redirect(url_for('admin.admin_category'))
+
+            invalidate_catalog_fragments()
+            flash(f'Category "{name}" added successfully!')
+            logger.info('Category created', extra={'category': folder, 'image': filename})
+            return redirect(url_for('admin.admin_category'))
+        
+        except Exception as e:
+            logger.exception('Category creation failed', extra={'category': request.form.get('folder')})
+            flash(f'Error adding category: {str(e)}')
+            return redirect(url_for('admin.admin_category'))
+
+    categories = load_categories()
+    return render_template('admin_category.html', categories=categories)
+
+
+# Route to display add product form for a category
+def add_product_form(folder):
+    if not session.get('logged_in'):
+        return redirect(url_for('admin.admin_login'))
+    return render_template('add_product.html', folder=folder)
+
+    
+def delete_category(folder):
+    if not session.get('logged_in'):
+        return redirect(url_for('admin.admin_login'))
+
+    categories_file = os.path.join('data', 'categories.json')
+    with update_json(categories_file, []) as categories:
+        categories[:] = [cat for cat in categories if cat['folder'] != folder]
+
+    # Optionally remove the folder
+    folder_path = os.path.join('data', folder)
+    if os.path.exists(folder_path):
+        os.rmdir(folder_path)  # Only if folder is empty
+
+    invalidate_catalog_fragments()
+    flash('Category deleted successfully.')
+    return redirect(url_for('admin.admin_category'))
+
+def manage_category(folder):
+    if not session.get('logged_in'):
+        return redirect(url_for('admin.admin_login'))
+    page, per_page, sort = get_listing_args(default_per_page=50)
+    pagination = paginate_products(load_products(folder), page, per_page, sort)
+    products = pagination['items']
+    # Annotate each product on this page with estimated shipping cost for default country (e.g., India)
+    for product in add_india_shipping(products):
+        product['shipping_cost'] = dict(product.get('shipping_cost', {}), India=product['india_shipping'])
+    return render_template('manage_products.html', folder=folder, products=products, pagination=pagination)
+
+
+# Route to add a new product in a category
+def add_product(folder):
+    if not session.get('logged_in'):
+        return redirect(url_for('admin.admin_login'))
+
+    if request.method == 'POST':
+        try:
+            # Validate required fields first
+            name = request.form.get('name', '').strip()
+            description = request.form.get('description', '').strip()
+            oem = request.form.get('oem', '').strip()
+            weight = request.form.get('weight', '').strip()
+            price = request.form.get('price', '').strip()
+            
+            if not name:
+                flash('Product name is required.')
+                return redirect(url_for('admin.add_product', folder=folder))
+            
+            if not description:
+                flash('Product description is required.')
+                return redirect(url_for('admin.add_product', folder=folder))
+                
+            if not price:
+                flash('Product price is required.')
+                return redirect(url_for('admin.add_product', folder=folder))
+            
+            try:
+                stock = int(request.form.get('stock', 0))
+                price_float = float(price)
+                weight_float = float(weight) if weight else 1.0
+            except ValueError:
+                flash('Invalid number format for stock, price, or weight.')
+                return redirect(url_for('admin.add_product', folder=folder))
+
+            # Process specifications
+            spec_categories = request.form.getlist('spec_categories[]')
+            specifications = []
+            
+            logger.debug('Processing product specifications', extra={'spec_categories': spec_categories})
+            
+            for i, category in enumerate(spec_categories):
+                if category.strip():  # Only process non-empty categories
+                    options = request.form.getlist(f'spec_options[{i}][]')
+                    prices = request.form.getlist(f'spec_prices[{i}][]')
+                    weights = request.form.getlist(f'spec_weights[{i}][]')  # Add weight modifiers
+                    
+                    spec_options = []
+                    for j, (option, price_mod, weight_mod) in enumerate(zip(options, prices, weights)):
+                        if option.strip():  # Only process non-empty options
+                            try:
+                                spec_options.append({
+                                    'name': option.strip(),
+                                    'price_modifier': float(price_mod) if price_mod else 0.0,
+                                    'weight_modifier': float(weight_mod) if weight_mod else 0.0
+                                })
+                            except ValueError:
+                                flash(f'Invalid number in specification: {option}')
+                                return redirect(url_for('admin.add_product', folder=folder))
+                    
+                    if spec_options:  # Only add category if it has options
+                        specifications.append({
+                            'category': category.strip(),
+                            'options': spec_options
+                        })
+
+            # STEP 1: Handle image uploads first and ensure they all succeed
+            image_files = request.files.getlist('images[]')
+            valid_image_files = [f for f in image_files if f.filename != '']
+            
+            if not valid_image_files:
+                flash('At least one product image is required.')
+                return redirect(url_for('admin.add_product', folder=folder))
+            
+            uploaded_images = []
+            uploaded_file_paths = []  # Keep track for cleanup if needed
+            
+            logger.debug('Uploading product images', extra={'category': folder, 'image_count': len(valid_image_files)})
+            
+            try:
+                for i, image_file in enumerate(valid_image_files):
+                    if image_file and image_file.filename:
+                        filename, error = save_uploaded_file(image_file)
+                        
+                        if error:
+                            # Clean up any previously uploaded images
+                            for cleanup_path in uploaded_file_paths:
+                                try:
+                                    os.remove(cleanup_path)
+                                except:
+                                    pass
+                            flash(f'Image upload failed: {error}')
+                            return redirect(url_for('admin.add_product', folder=folder))
+                        
+                        if not filename:
+                            # Clean up any previously uploaded images
+                            for cleanup_path in uploaded_file_paths:
+                                try:
+                                    os.remove(cleanup_path)
+                                except:
+                                    pass
+                            flash('Image upload failed: No filename returned')
+                            return redirect(url_for('admin.add_product', folder=folder))
+                        
+                        # Verify the file was actually saved
+                        image_path = os.path.join('static', 'images', filename)
+                        if not os.path.exists(image_path):
+                            # Clean up any previously uploaded images
+                            for cleanup_path in uploaded_file_paths:
+                                try:
+                                    os.remove(cleanup_path)
+                                except:
+                                    pass
+                            flash(f'Image upload failed: File {filename} was not saved properly')
+                            return redirect(url_for('admin.add_product', folder=folder))
+                        
+                        uploaded_images.append(filename)
+                        uploaded_file_paths.append(image_path)
+                        
+            except Exception as e:
+                # Clean up any uploaded images
+                for cleanup_path in uploaded_file_paths:
+                    try:
+                        os.remove(cleanup_path)
+                    except:
+                        pass
+                flash(f'Error during image upload: {str(e)}')
+                return redirect(url_for('admin.add_product', folder=folder))
+
+            # STEP 2: Create product data only after all images are uploaded successfully
+            new_product = {
+                'name': name,
+                'description': description,
+                'oem': oem,
+                'weight': weight,
+                'price': price_float,
+                'stock': stock,
+                'image': uploaded_images[0] if uploaded_images else '',  # Main image for backward compatibility
+                'images': uploaded_images,  # Array of all images
+                'specifications': specifications,
+                'shipping': {
+                    'weight_kg': weight_float,
+                    'excluded_countries': EXCLUDED_COUNTRIES,
+                    'rate_per_1000km_per_kg': SHIPPING_RATE_PER_1000KM_PER_KG,
+                    'shipping_discount': SHIPPING_DISCOUNT
+                }
+            }
+
+            # STEP 3: Load existing products and add new one
+            try:
+                # Read and rewrite products.json under its lock so simultaneous adds are all kept
+                with locked(products_path(folder)):
+                    products = load_products(folder)
+                    products.append(new_product)
+                    save_products(folder, products)
+                
+                # Update category count
+                update_category_count(folder)
+                invalidate_catalog_fragments()
+                
+                flash(f'Product "{name}" added successfully!')
+                logger.info('Product created', extra={'category': folder, 'product': name, 'image_count': len(uploaded_images)})
+                return redirect(url_for('admin.manage_category', folder=folder))
+                
+            except Exception as e:
+                # If product save fails, clean up uploaded images
+                for cleanup_path in uploaded_file_paths:
+                    try:
+                        os.remove(cleanup_path)
+                    except:
+                        pass
+                flash(f'Failed to save product data: {str(e)}')
+                return redirect(url_for('admin.add_product', folder=folder))
+                
+        except Exception as e:
+            logger.exception('Product creation failed', extra={'category': folder})
+            flash(f'Error adding product: {str(e)}')
+            return redirect(url_for('admin.add_product', folder=folder))
+
+    return render_template('add_product.html', folder=folder)
+
+def find_product_index(products, slug):
+    """Position of the product with this slug, or None"""
+    for i, p in enumerate(products):
+        if slugify(p['name']) == slug:
+            return i
+    return None
+
+def edit_product(folder, slug):
+    if not session.get('logged_in'):
+        return redirect(url_for('admin.admin_login'))
+    
+    products = load_products(folder)
+    product_index = find_product_index(products, slug)
+    product = products[product_index] if product_index is not None else None
+    
+    if not product:
+        flash('Product not found.')
+        return redirect(url_for('admin.manage_category', folder=folder))
+    
+    if request.method == 'POST':
+        name = request.form['name'].strip()
+        description = request.form['description'].strip()
+        oem = request.form.get('oem', '').strip()
+        weight = request.form['weight'].strip()
+        price = request.form['price'].strip()
+        stock = int(request.form['stock'])
+        image_file = request.files.get('image')
+        
+        # Process specifications
+        spec_categories = request.form.getlist('spec_categories[]')
+        specifications = []
+        
+        for i, category in enumerate(spec_categories):
+            if category.strip():  # Only process non-empty categories
+                options = request.form.getlist(f'spec_options[{i}][]')
+                prices = request.form.getlist(f'spec_prices[{i}][]')
+                weights = request.form.getlist(f'spec_weights[{i}][]')  # Add weight modifiers
+                
+                spec_options = []
+                for j, (option, price_mod, weight_mod) in enumerate(zip(options, prices, weights)):
+                    if option.strip():  # Only process non-empty options
+                        spec_options.append({
+                            'name': option.strip(),
+                            'price_modifier': float(price_mod) if price_mod else 0.0,
+                            'weight_modifier': float(weight_mod) if weight_mod else 0.0
+                        })
+                
+                if spec_options:  # Only add category if it has options
+                    specifications.append({
+                        'category': category.strip(),
+                        'options': spec_options
+                    })
+        
+        logger.debug('Parsed product specifications',
+                     extra={'category': folder, 'product': slug, 'specifications': specifications})
+        
+        if not name or not description or not price:
+            flash('Name, description, and price are required.')
+            return redirect(url_for('admin.edit_product', folder=folder, slug=slug))
+        
+        # Update product data
+        products[product_index]['name'] = name
+        products[product_index]['description'] = description
+        products[product_index]['oem'] = oem
+        products[product_index]['weight'] = weight
+        products[product_index]['price'] = float(price) if price else 0.0
+        products[product_index]['stock'] = stock
+        products[product_index]['specifications'] = specifications
+        
+        # Handle image updates
+        image_files = request.files.getlist('images[]')
+        valid_image_files = [f for f in image_files if f.filename != '']
+        
+        # Get which existing images to keep
+        images_to_keep = request.form.getlist('keep_images[]')
+        
+        # Start with existing images that user wants to keep
+        existing_images = []
+        if images_to_keep:
+            existing_images = images_to_keep
+        elif not valid_image_files:
+            # If no new images and no keep_images specified, keep all existing images
+            existing_images = products[product_index].get('images', [])
+            if not existing_images and products[product_index].get('image'):
+                existing_images = [products[product_index]['image']]
+        
+        # Add new uploaded images
+        uploaded_images = []
+        if valid_image_files:
+            try:
+                for image_file in valid_image_files:
+                    if image_file and image_file.filename:
+                        filename, error = save_uploaded_file(image_file)
+                        if error:
+                            flash(f'Image upload failed: {error}')
+                            return redirect(url_for('admin.edit_product', folder=folder, slug=slug))
+                        uploaded_images.append(filename)
+            except Exception as e:
+                flash(f'Error uploading images: {str(e)}')
+                return redirect(url_for('admin.edit_product', folder=folder, slug=slug))
+        
+        # Combine kept existing images and new images
+        all_images = existing_images + uploaded_images
+        
+        # Update both image formats for compatibility
+        if all_images:
+            products[product_index]['image'] = all_images[0]
+            products[product_index]['images'] = all_images
+        else:
+            # If no images at all, keep the original structure
+            products[product_index]['image'] = products[product_index].get('image', '')
+            products[product_index]['images'] = products[product_index].get('images', [])
+        
+        # Update shipping info
+        products[product_index]['shipping'] = {
+            'weight_kg': float(weight) if weight else 1.0,
+            'excluded_countries': EXCLUDED_COUNTRIES,
+            'rate_per_1000km_per_kg': SHIPPING_RATE_PER_1000KM_PER_KG,
+            'shipping_discount': SHIPPING_DISCOUNT
+        }
+        
+        # Put the edited record into the current products.json, keeping other admins' changes
+        with locked(products_path(folder)):
+            products = load_products(folder)
+            product_index = find_product_index(products, slug)
+            if product_index is None:
+                flash('Product not found.')
+                return redirect(url_for('admin.manage_category', folder=folder))
+            products[product_index] = product
+            save_products(folder, products)
+        update_category_count(folder)
+        invalidate_catalog_fragments()
+        flash('Product updated successfully!')
+        logger.info('Product updated', extra={'category': folder, 'product': slug})
+        return redirect(url_for('admin.manage_category', folder=folder))
+    
+    return render_template('edit_product.html', folder=folder, product=product)
+
+def delete_product(folder, slug):
+    if not session.get('logged_in'):
+        return redirect(url_for('admin.admin_login'))
+    
+    with locked(products_path(folder)):
+        products = load_products(folder)
+        product_index = find_product_index(products, slug)
+        if product_index is not None:
+            products.pop(product_index)
+            save_products(folder, products)
+    
+    if product_index is not None:
+        update_category_count(folder)
+        invalidate_catalog_fragments()
+        flash('Product deleted successfully!')
+    else:
+        flash('Product not found.')
+    
+    return redirect(url_for('admin.manage_category', folder=folder))
+
+def fragment_cache_stats():
+    """Admin endpoint reporting fragment cache hit rates"""
+    if not session.get('logged_in'):
+        return redirect(url_for('admin.admin_login'))
+    return jsonify({
+        'entries': len(fragment_cache),
+        'max_entries': fragment_cache.max_entries,
+        'fragments': fragment_cache.stats()
+    })
+
+def get_order_filters():
+    """Read order list filters from the query string"""
+    return {
+        'email': request.args.get('email'),
+        'date_from': request.args.get('from'),
+        'date_to': request.args.get('to'),
+        'country': request.args.get('country'),
+        'payment_method': request.args.get('payment_method'),
+        'status': request.args.get('status')
+    }
+
+def admin_orders():
+    """Filterable, paginated order list for admins"""
+    if not session.get('logged_in'):
+        return redirect(url_for('admin.admin_login'))
+    
+    filters = get_order_filters()
+    page = max(1, request.args.get('page', 1, type=int))
+    try:
+        orders, total = order_store.find_orders(limit=ADMIN_ORDERS_PER_PAGE,
+                                                offset=(page - 1) * ADMIN_ORDERS_PER_PAGE,
+                                                **filters)
+    except ValueError as e:
+        if request.args.get('format') == 'json':
+            return jsonify({'success': False, 'message': str(e)}), 400
+        flash(str(e))
+        orders, total = [], 0
+    
+    pages = max(1, math.ceil(total / ADMIN_ORDERS_PER_PAGE))
+    if request.args.get('format') == 'json':
+        return jsonify({'success': True, 'orders': orders, 'total': total, 'page': page, 'pages': pages})
+    
+    return render_template('admin_orders.html',
+                         orders=orders,
+                         total=total,
+                         page=page,
+                         pages=pages,
+                         filters=filters,
+                         query={k: v for k, v in request.args.items() if k != 'page' and v},
+                         transitions=ORDER_STATUS_TRANSITIONS)
+
+def update_order_status(order_id):
+    """Move an order along pending -> paid -> shipped"""
+    if not session.get('logged_in'):
+        return redirect(url_for('admin.admin_login'))
+    
+    data = request.get_json(silent=True) or request.form
+    try:
+        order = order_store.update_status(order_id, data.get('status'), data.get('note', ''))
+    except KeyError:
+        message, code = 'Order not found.', 404
+    except InvalidStatusTransition as e:
+        message, code = str(e), 400
+    else:
+        message, code = f'Order {order_id} marked as {order["status"]}.', 200
+    
+    if request.is_json:
+        return jsonify({'success': code == 200, 'message': message}), code
+    flash(message)
+    return redirect(request.referrer or url_for('admin.admin_orders'))
+
+def admin_dashboard():
+    """Sales dashboard read from pre-aggregated rollups"""
+    if not session.get('logged_in'):
+        return redirect(url_for('admin.admin_login'))
+    
+    days = min(max(1, request.args.get('days', 30, type=int)), 366)
+    top = min(max(1, request.args.get('top', 10, type=int)), 100)
+    stats = order_store.sales_dashboard(days=days, top=top)
+    if request.args.get('format') == 'json':
+        return jsonify(dict(stats, success=True, days=days))
+    return render_template('admin_dashboard.html', stats=stats, days=days)
+
+def export_orders_route():
+    """Stream orders as CSV or JSON Lines, filtered by date, country, payment method and status"""
+    if not session.get('logged_in'):
+        return redirect(url_for('admin.admin_login'))
+    
+    fmt = request.args.get('format', 'csv').lower()
+    try:
+        chunks = export_orders(order_store.iter_orders(**get_order_filters()), fmt)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    filename = f"orders-{time.strftime('%Y%m%d-%H%M%S')}.{extension}"
+    return current_app.response_class(chunks, mimetype=mimetype,
+                              headers={'Content-Disposition': f'attachment; filename={filename}'})
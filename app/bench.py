@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+"""
+Storefront benchmark suite
+
+Builds a synthetic catalog in a temporary directory and drives the hot paths
+through Flask's test client (no server, no network), recording throughput and
+latency percentiles per scenario:
+
+    /, /products/<folder>, /product/<folder>/<slug>, /shipping-info/<country>,
+    and for each cart size: /cart, /update-cart, /place-order (COD)
+
+Worker start-up is measured too: fresh interpreters import the app, call
+create_app() (with and without CATALOG_PRELOAD) and serve a first category
+page, which is what a gunicorn worker boot or restart costs.
+
+With --checkout-concurrency, whole PayPal checkouts (add to cart, place order,
+return from PayPal, order e-mail) are run by that many simultaneous customers
+against real gunicorn servers, once with sync workers and once with gevent
+workers, talking to a mock PayPal and SMTP server that answer with
+--paypal-latency / --smtp-latency. Their throughput is in checkouts per second.
+
+Results are written as JSON so runs can be compared across commits:
+
+    python bench.py --products 1000 --products 50000 --cart-lines 1 --cart-lines 500
+    python bench.py --compare bench_results/<older>.json --fail-on-regression 20
+
+Order e-mails are suppressed and orders go to a throwaway store, so the real
+data directory is never touched.
+"""
+
+import argparse
+import contextlib
+import http.cookiejar
+import importlib.util
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import warnings
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, APP_DIR)
+
+DEFAULT_OUTPUT_DIR = os.path.join(APP_DIR, 'bench_results')
+COUNTRIES = ['India', 'United States', 'Germany', 'Australia', 'Brazil', 'Japan', 'United Kingdom', 'Canada']
+CHECKOUT_FORM = {
+    'name': 'Bench Buyer', 'email': 'bench@example.com', 'phone': '+1 555 0100',
+    'address': '1 Benchmark Way', 'city': 'Springfield', 'state': 'IL', 'country': 'United States',
+    'postal_code': '62701', 'shipping_method': 'air', 'payment_method': 'cod'
+}
+
+
+def make_product(i, rng):
+    price = round(rng.uniform(2, 400), 2)
+    product = {
+        'name': f'{rng.choice([2, 2.5, 3, 3.5, 4, 5, 6])} inch V-Band Clamp SYN{i:05d}',
+        'description': 'Synthetic benchmark product. ' * 4,
+        'oem': ', '.join(f'OEM{i:05d}-{n}' for n in range(rng.randint(0, 6))),
+        'weight': str(round(rng.uniform(0.05, 3.0), 2)),
+        'price': price,
+        'stock': rng.randint(10000, 100000),  # enough that repeated checkouts never sell out
+        'image': f'syn_{i}.jpg',
+        'images': [f'syn_{i}.jpg'],
+        'specifications': [],
+    }
+    if i % 3 == 0:
+        product['specifications'].append({
+            'category': 'Material',
+            'options': [{'name': 'Stainless', 'price_modifier': 4.0, 'weight_modifier': 0.0},
+                        {'name': 'Mild steel', 'price_modifier': 0.0, 'weight_modifier': 0.1}]
+        })
+    return product
+
+
+def write_catalog(root, product_count, category_count, seed=42):
+    """Write categories.json and products.json files; returns {folder: [slugs]}"""
+    from app import slugify
+
+    rng = random.Random(seed)
+    data_dir = os.path.join(root, 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    categories, slugs = [], {}
+    per_category = max(1, product_count // category_count)
+    for c in range(category_count):
+        folder = f'bench_{c}'
+        start = c * per_category
+        end = product_count if c == category_count - 1 else start + per_category
+        products = [make_product(i, rng) for i in range(start, end)]
+        os.makedirs(os.path.join(data_dir, folder), exist_ok=True)
+        with open(os.path.join(data_dir, folder, 'products.json'), 'w') as f:
+            json.dump(products, f)
+        categories.append({'name': f'Bench Category {c}', 'description': 'Synthetic', 'folder': folder,
+                           'image': f'cat_{c}.jpg', 'count': len(products)})
+        slugs[folder] = [slugify(p['name']) for p in products]
+    with open(os.path.join(data_dir, 'categories.json'), 'w') as f:
+        json.dump(categories, f)
+    return slugs
+
+
+@contextlib.contextmanager
+def synthetic_storefront(product_count, category_count):
+    """Run an app built by create_app() against a generated catalog in a temporary directory"""
+    from app import create_app, fragment_cache, metrics
+
+    root = tempfile.mkdtemp(prefix='qualclamps-bench-')
+    previous_cwd = os.getcwd()
+    previous_metrics_dir = metrics.directory
+    app_logger = logging.getLogger('qualclamps')
+    saved_level = app_logger.level
+    try:
+        os.chdir(root)
+        slugs = write_catalog(root, product_count, category_count)
+        app = create_app({
+            'ORDERS_DB': os.path.join(root, 'data', 'orders.db'),
+            'PROFILE_DIR': os.path.join(root, 'data', 'profiles'),
+            'METRICS_DIR': os.path.join(root, 'data', 'metrics'),
+            'MAIL_SUPPRESS_SEND': True,
+        })
+        fragment_cache.clear()
+        # Keep the per-request access log from flooding the terminal
+        app_logger.setLevel(logging.WARNING)
+        yield app, slugs
+    finally:
+        os.chdir(previous_cwd)
+        fragment_cache.clear()
+        app_logger.setLevel(saved_level)
+        # Later apps in this process must not flush into the removed directory
+        metrics.directory = previous_metrics_dir
+        shutil.rmtree(root, ignore_errors=True)
+
+
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import app
+imported = time.perf_counter()
+application = app.create_app(json.loads(sys.argv[2]))
+created = time.perf_counter()
+status = application.test_client().get(sys.argv[3]).status_code
+finished = time.perf_counter()
+print(json.dumps({'import': imported - started, 'create_app': created - imported,
+                  'first_request': finished - created, 'status': status}))
+"""
+
+
+def measure_startup(root, path, runs, preload=False):
+    """Time import, create_app() and the first request in `runs` fresh interpreters"""
+    config = {
+        'ORDERS_DB': os.path.join(root, 'data', 'orders.db'),
+        'PROFILE_DIR': os.path.join(root, 'data', 'profiles'),
+        'METRICS_DIR': os.path.join(root, 'data', 'metrics'),
+        'MAIL_SUPPRESS_SEND': True,
+        'CATALOG_PRELOAD': preload,
+    }
+    env = dict(os.environ, LOG_LEVEL='WARNING')
+    phases = {'import': [], 'create_app': [], 'first_request': [], 'total': []}
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT, APP_DIR, json.dumps(config), path],
+                                cwd=root, env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f'start-up run failed:\n{result.stderr}')
+        timings = json.loads(result.stdout.splitlines()[-1])
+        if timings['status'] >= 400:
+            raise RuntimeError(f"{path} returned {timings['status']} on start-up")
+        for phase in ('import', 'create_app', 'first_request'):
+            phases[phase].append(timings[phase])
+        phases['total'].append(timings['import'] + timings['create_app'] + timings['first_request'])
+    return {phase: summarize(durations) for phase, durations in phases.items()}
+
+
+SERVER_WORKERS = 2
+SERVER_ENTRY_POINTS = {'sync': 'wsgi:application', 'gevent': 'gevent_wsgi:application'}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def gunicorn_server(root, worker_class, env, workers=SERVER_WORKERS):
+    """Run gunicorn on the catalog in root; yields its base URL"""
+    port = free_port()
+    command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+               '--worker-class', worker_class, '--pythonpath', APP_DIR, '--log-level', 'warning']
+    if worker_class == 'gevent':
+        command += ['--worker-connections', '1000']
+    command.append(SERVER_ENTRY_POINTS[worker_class])
+    base_url = f'http://127.0.0.1:{port}'
+    with open(os.path.join(root, f'gunicorn-{worker_class}.log'), 'w') as log:
+        server = subprocess.Popen(command, cwd=root, env=env, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    urllib.request.urlopen(f'{base_url}/contact', timeout=5).read()
+                    break
+                except OSError:
+                    if server.poll() is not None or time.monotonic() > deadline:
+                        raise RuntimeError(f'gunicorn ({worker_class}) did not start, see {log.name}')
+                    time.sleep(0.1)
+            yield base_url
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def paypal_checkout(base_url, opener, folder, slug, payer_id):
+    """One customer's PayPal checkout, from adding to the cart to the confirmation page"""
+    opener.open(urllib.request.Request(
+        f'{base_url}/add-to-cart', headers={'Content-Type': 'application/json'},
+        data=json.dumps({'category_folder': folder, 'product_slug': slug, 'quantity': 2}).encode())).read()
+    try:
+        opener.open(f'{base_url}/place-order',
+                    data=urllib.parse.urlencode(dict(CHECKOUT_FORM, payment_method='paypal')).encode()).read()
+        raise RuntimeError('/place-order did not redirect to PayPal')
+    except urllib.error.HTTPError as e:
+        if e.code != 302:
+            raise
+        approval_url = e.headers['Location']
+    # The mock PayPal numbers approval tokens and payment IDs alike
+    number = int(urllib.parse.parse_qs(urllib.parse.urlparse(approval_url).query)['token'][0][len('EC-'):])
+    query = urllib.parse.urlencode({'paymentId': f'PAYID-TEST{number:06d}', 'PayerID': payer_id})
+    page = opener.open(f'{base_url}/paypal/success?{query}').read()
+    if b'ORD-' not in page:
+        raise RuntimeError('/paypal/success did not confirm the order')
+
+
+def measure_concurrent_checkouts(base_url, slugs, concurrency, checkouts):
+    """Run `checkouts` PayPal checkouts from `concurrency` simultaneous customers"""
+    pairs = [(folder, slug) for folder, folder_slugs in slugs.items() for slug in folder_slugs]
+    numbers = itertools.count()
+    durations, errors = [], []
+
+    def customer():
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+                                             _NoRedirect)
+        while True:
+            i = next(numbers)
+            if i >= checkouts or errors:
+                return
+            started = time.perf_counter()
+            try:
+                paypal_checkout(base_url, opener, *pairs[i % len(pairs)], payer_id=f'BENCH{i}')
+            except Exception as e:  # reported after all customers stop
+                errors.append(e)
+                return
+            durations.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    customers = [threading.Thread(target=customer) for _ in range(concurrency)]
+    for thread in customers:
+        thread.start()
+    for thread in customers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if errors:
+        raise RuntimeError(f'checkout failed: {errors[0]!r}')
+
+    stats = summarize(durations)
+    stats['throughput_rps'] = round(len(durations) / elapsed, 2)
+    return stats
+
+
+def compare_serving_modes(root, slugs, concurrency, checkouts, paypal_latency, smtp_latency):
+    """Concurrent checkout results for sync and gevent gunicorn workers"""
+    from harness import FakeSMTPServer, MockPayPalServer
+
+    paypal = MockPayPalServer().start()
+    smtp = FakeSMTPServer().start()
+    paypal.latency, smtp.latency = paypal_latency, smtp_latency
+    env = dict(os.environ, LOG_LEVEL='WARNING', PAYPAL_MODE='sandbox', PAYPAL_ENDPOINT=paypal.url,
+               PAYPAL_CLIENT_ID='bench-client', PAYPAL_CLIENT_SECRET='bench-secret',
+               MAIL_SERVER=smtp.host, MAIL_PORT=str(smtp.port), MAIL_USE_TLS='0', MAIL_PASSWORD='',
+               METRICS_DIR=os.path.join(root, 'data', 'metrics'))
+    results = {}
+    try:
+        for worker_class in SERVER_ENTRY_POINTS:
+            smtp.clear()
+            smtp.latency = smtp_latency
+            with gunicorn_server(root, worker_class, env) as base_url:
+                results[worker_class] = measure_concurrent_checkouts(base_url, slugs, concurrency, checkouts)
+                # gevent workers send the e-mail after the response; every order must still get one
+                deadline = time.monotonic() + 10 + smtp_latency * checkouts
+                while len(smtp.messages) < checkouts and time.monotonic() < deadline:
+                    time.sleep(0.05)
+                if len(smtp.messages) != checkouts:
+                    raise RuntimeError(f'{worker_class}: {len(smtp.messages)} of {checkouts} order e-mails sent')
+    finally:
+        paypal.stop()
+        smtp.stop()
+    return results
+
+
+def fill_cart(client, slugs, lines, rng):
+    """Put `lines` distinct products into the client's session cart"""
+    pairs = [(folder, slug) for folder, folder_slugs in slugs.items() for slug in folder_slugs]
+    chosen = rng.sample(pairs, min(lines, len(pairs)))
+    cart = {}
+    for folder, slug in chosen:
+        key = f'{folder}:{slug}:{{}}'
+        cart[key] = {'category_folder': folder, 'product_slug': slug, 'quantity': rng.randint(1, 50),
+                     'specifications': {}, 'added_at': time.time()}
+    with client.session_transaction() as sess:
+        sess['cart'] = cart
+    return list(cart)
+
+
+def summarize(durations):
+    durations = sorted(durations)
+    total = sum(durations)
+
+    def percentile(p):
+        return durations[min(len(durations) - 1, int(round(p / 100.0 * (len(durations) - 1))))] * 1000
+
+    return {
+        'requests': len(durations),
+        'throughput_rps': round(len(durations) / total, 2) if total else None,
+        'mean_ms': round(statistics.fmean(durations) * 1000, 3),
+        'p50_ms': round(percentile(50), 3),
+        'p90_ms': round(percentile(90), 3),
+        'p99_ms': round(percentile(99), 3),
+        'max_ms': round(durations[-1] * 1000, 3),
+    }
+
+
+def measure(requests, make_request, setup=None, warmup=3):
+    """Time make_request(i) for i in range(requests); setup(i) runs untimed"""
+    durations = []
+    for i in range(-warmup, requests):
+        if setup:
+            setup(i)
+        started = time.perf_counter()
+        response = make_request(i)
+        elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise RuntimeError(f'{response.request.path} returned {response.status_code}')
+        if i >= 0:
+            durations.append(elapsed)
+    return summarize(durations)
+
+
+def run_scenarios(app, slugs, requests, cart_sizes, seed=7):
+    rng = random.Random(seed)
+    folders = list(slugs)
+    products = [(folder, slug) for folder in folders for slug in slugs[folder]]
+    results = {}
+    client = app.test_client()
+
+    results['home'] = measure(requests, lambda i: client.get('/'))
+    results['category'] = measure(requests, lambda i: client.get(
+        f'/products/{folders[i % len(folders)]}?page={1 + i % 5}&sort={["default", "price", "name"][i % 3]}'))
+    results['product'] = measure(requests, lambda i: client.get(
+        '/product/%s/%s' % products[rng.randrange(len(products))]))
+    results['shipping_info'] = measure(requests, lambda i: client.get(
+        f'/shipping-info/{COUNTRIES[i % len(COUNTRIES)]}?weight={1 + i % 40}&quantity={1 + i % 200}'))
+
+    for lines in cart_sizes:
+        cart_keys = fill_cart(client, slugs, lines, rng)
+        results[f'cart[lines={lines}]'] = measure(requests, lambda i: client.get('/cart'))
+        results[f'update_cart[lines={lines}]'] = measure(requests, lambda i: client.post(
+            '/update-cart', json={'cart_key': cart_keys[i % len(cart_keys)], 'quantity': 1 + i % 20}))
+        results[f'place_order[lines={lines}]'] = measure(
+            requests, lambda i: client.post('/place-order', data=CHECKOUT_FORM),
+            setup=lambda i: fill_cart(client, slugs, lines, rng))
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=APP_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(product_counts, cart_sizes, requests, categories, startup_runs=5, checkout_concurrency=(),
+        paypal_latency=0.2, smtp_latency=0.1):
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'requests_per_scenario': requests,
+            'startup_runs': startup_runs,
+            'categories': categories,
+            'server_workers': SERVER_WORKERS,
+            'paypal_latency': paypal_latency,
+            'smtp_latency': smtp_latency,
+        },
+        'results': {},
+    }
+    with warnings.catch_warnings():
+        # Large carts exceed the 4 KB cookie limit browsers enforce; the test client does not
+        warnings.simplefilter('ignore')
+        for count in product_counts:
+            with synthetic_storefront(count, categories) as (app, slugs):
+                for scenario, stats in run_scenarios(app, slugs, requests, cart_sizes).items():
+                    report['results'][f'products={count}/{scenario}'] = stats
+                if startup_runs:
+                    path = f'/products/{next(iter(slugs))}'
+                    for preload in (False, True):
+                        label = 'startup[preload]' if preload else 'startup'
+                        for phase, stats in measure_startup(os.getcwd(), path, startup_runs, preload).items():
+                            report['results'][f'products={count}/{label}/{phase}'] = stats
+                for concurrency in checkout_concurrency:
+                    modes = compare_serving_modes(os.getcwd(), slugs, concurrency, max(requests, concurrency),
+                                                  paypal_latency, smtp_latency)
+                    for worker_class, stats in modes.items():
+                        report['results'][f'products={count}/checkout[concurrency={concurrency}]/{worker_class}'] = stats
+    return report
+
+
+def compare(report, baseline, threshold=None):
+    """Print p50/p99/throughput changes against a baseline; returns regressed scenario names"""
+    regressions = []
+    print(f"\nComparison with {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')})")
+    print(f"{'scenario':<45} {'p50 ms':>18} {'p99 ms':>18} {'rps':>18}")
+    for name, stats in report['results'].items():
+        old = baseline['results'].get(name)
+        if not old:
+            continue
+        cells = []
+        for key in ('p50_ms', 'p99_ms', 'throughput_rps'):
+            change = (stats[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            cells.append(f'{stats[key]:>9.2f} ({change:+6.1f}%)')
+        print(f'{name:<45} ' + ' '.join(cells))
+        if threshold is not None and old['p50_ms'] and \
+                (stats['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark storefront hot paths with a synthetic catalog')
+    parser.add_argument('--products', type=int, action='append',
+                        help='Catalog size to test (repeatable, default: 1000 and 10000)')
+    parser.add_argument('--cart-lines', type=int, action='append',
+                        help='Cart size to test (repeatable, default: 1, 50 and 500)')
+    parser.add_argument('--categories', type=int, default=10, help='Categories to spread products over')
+    parser.add_argument('--requests', type=int, default=100, help='Timed requests per scenario')
+    parser.add_argument('--startup-runs', type=int, default=5,
+                        help='Fresh interpreters to time start-up in (0 to skip)')
+    parser.add_argument('--checkout-concurrency', type=int, action='append', default=[],
+                        help='Simultaneous PayPal checkouts against sync and gevent gunicorn workers (repeatable)')
+    parser.add_argument('--paypal-latency', type=float, default=0.2, help='Seconds the mock PayPal takes per call')
+    parser.add_argument('--smtp-latency', type=float, default=0.1, help='Seconds the fake SMTP server takes per message')
+    parser.add_argument('--output', '-o', help='Result file (default: bench_results/<commit>-<time>.json)')
+    parser.add_argument('--compare', help='Earlier result file to compare against')
+    parser.add_argument('--fail-on-regression', type=float, metavar='PERCENT',
+                        help='Exit non-zero if any p50 is this much slower than --compare')
+    args = parser.parse_args(argv)
+    if args.checkout_concurrency and not all(importlib.util.find_spec(name) for name in ('gunicorn', 'gevent')):
+        parser.error('--checkout-concurrency needs gunicorn and gevent (pip install -r requirements-dev.txt)')
+
+    report = run(args.products or [1000, 10000], args.cart_lines or [1, 50, 500], args.requests, args.categories,
+                 args.startup_runs, args.checkout_concurrency, args.paypal_latency, args.smtp_latency)
+
+    print(f"{'scenario':<45} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, stats in report['results'].items():
+        print(f"{name:<45} {stats['throughput_rps']:>9.1f} {stats['p50_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+
+    output = args.output or os.path.join(
+        DEFAULT_OUTPUT_DIR, f"{report['meta']['commit']}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'\nResults written to {output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.fail_on_regression)
+        if regressions:
+            print(f"\nRegressed by more than {args.fail_on_regression}%: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
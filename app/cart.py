@@ -0,0 +1,616 @@
+"""
+Cart and checkout blueprint
+
+The cart lives in the session; prices, weights and shipping are worked out
+from the current catalog on every view, and /place-order turns the cart into
+an order (COD, UPI, e-mail invoice or a PayPal redirect). Quantities are
+checked against live stock as they change, and /place-order takes the stock,
+or reserves it for a PayPal checkout (see inventory.py).
+"""
+
+import json
+import time
+
+from flask import Blueprint, flash, g, jsonify, redirect, render_template, request, session, url_for
+
+from app import inventory, logger, metrics, order_id_generator, order_store, slugify
+from catalog import load_products
+from currency import BASE_CURRENCY, PAYPAL_CURRENCIES, current_currency, rate_table
+from geography import country_name
+from inventory import OutOfStock, catalog_stock, order_lines, product_sku, shortage_message
+from notifications import send_order_notification
+from payments import create_paypal_payment
+from pricing import bulk_discount_rate, current_price_list, price_book
+from serving import run_in_background
+from packing import packed_dimensions
+from shipping import SHIPPING_METHODS, is_shipping_allowed
+from warehouses import shipping_network
+
+bp = Blueprint('cart', __name__)
+
+# Cart helper functions
+def get_cart_total_quantity():
+    """Get total quantity of all items in cart"""
+    cart = get_cart()
+    total_quantity = 0
+    for item in cart.values():
+        total_quantity += item['quantity']
+    return total_quantity
+
+def should_auto_select_sea_shipping():
+    """Check if sea shipping should be auto-selected based on quantity"""
+    return get_cart_total_quantity() >= 1000
+
+def get_cart():
+    """Get cart from session"""
+    return session.get('cart', {})
+
+def save_cart(cart):
+    """Save cart to session"""
+    session['cart'] = cart
+    session.permanent = True  # Make cart persist across browser sessions
+    g.pop('cart_quote', None)
+
+def get_cart_destination():
+    """Where the cart ships and how, {'country': ..., 'method': ...}, or None before a country is chosen.
+
+    Carts from before there was one destination per cart take it from their
+    first line that had shipping.
+    """
+    destination = session.get('cart_shipping')
+    if destination:
+        return destination
+    for item in get_cart().values():
+        shipping = item.get('shipping') or {}
+        if shipping.get('country'):
+            return {'country': shipping['country'], 'method': shipping.get('method') or 'air'}
+    return None
+
+def set_cart_destination(country, method=None):
+    """Ship the cart to country, by method or else the method already chosen"""
+    current = get_cart_destination() or {}
+    if method not in SHIPPING_METHODS:
+        method = current.get('method', 'air')
+    session['cart_shipping'] = {'country': country_name(country) or country, 'method': method}
+    g.pop('cart_quote', None)
+
+def check_stock(cart, category_folder, product_slug, added):
+    """Raise ValueError if adding `added` units would put more of a product in the cart than is for sale"""
+    for product in load_products(category_folder):
+        if slugify(product['name']) == product_slug:
+            break
+    else:
+        return
+    
+    available = inventory.available(product_sku(category_folder, product_slug), catalog_stock(product))
+    if available is None:
+        return
+    # Items that differ only in specifications draw on the same stock
+    in_cart = sum(item['quantity'] for item in cart.values()
+                  if item['category_folder'] == category_folder and item['product_slug'] == product_slug)
+    if in_cart + added > available:
+        if not available:
+            raise ValueError(f"{product['name']} is out of stock")
+        raise ValueError(f"Only {available} of {product['name']} in stock")
+
+def add_to_cart(category_folder, product_slug, quantity=1, specifications=None, shipping=None):
+    """Add item to cart"""
+    cart = get_cart()
+    check_stock(cart, category_folder, product_slug, quantity)
+    
+    # Create unique cart item key based on product and specifications
+    spec_key = json.dumps(specifications or {}, sort_keys=True)
+    cart_key = f"{category_folder}:{product_slug}:{spec_key}"
+    
+    if cart_key in cart:
+        cart[cart_key]['quantity'] += quantity
+    else:
+        cart[cart_key] = {
+            'category_folder': category_folder,
+            'product_slug': product_slug,
+            'quantity': quantity,
+            'specifications': specifications or {},
+            'added_at': time.time()
+        }
+    
+    # The whole cart ships together, to the destination picked in the shipping calculator
+    if shipping and shipping.get('country'):
+        set_cart_destination(shipping['country'], shipping.get('method'))
+    
+    save_cart(cart)
+    return cart_key
+
+def remove_from_cart(cart_key):
+    """Remove item from cart"""
+    cart = get_cart()
+    if cart_key in cart:
+        del cart[cart_key]
+        save_cart(cart)
+
+def update_cart_quantity(cart_key, quantity):
+    """Update quantity of cart item"""
+    cart = get_cart()
+    if cart_key in cart:
+        if quantity <= 0:
+            del cart[cart_key]
+        else:
+            item = cart[cart_key]
+            check_stock(cart, item['category_folder'], item['product_slug'], quantity - item['quantity'])
+            cart[cart_key]['quantity'] = quantity
+        
+        save_cart(cart)
+
+def price_line(item, product):
+    """Base price, specification modifiers and bulk discount rate for a cart line.
+
+    Contract prices from the customer's price list replace catalog prices
+    where the list has them (see pricing.py). Returns (base_price,
+    {spec category: (option, price modifier, weight modifier)}, discount_rate).
+    """
+    book, price_list = price_book(), current_price_list()
+    sku = product_sku(item['category_folder'], item['product_slug'])
+    base_price = book.base_price(price_list, sku, float(product.get('price', 0)))
+    
+    modifiers = {}
+    for spec_category, selected_option in item['specifications'].items():
+        for spec in product.get('specifications', []):
+            if spec['category'] == spec_category:
+                for option in spec['options']:
+                    if option['name'] == selected_option:
+                        modifier = book.option_modifier(price_list, sku, spec_category, selected_option,
+                                                        float(option.get('price_modifier', 0)))
+                        modifiers[spec_category] = (selected_option, modifier, float(option.get('weight_modifier', 0)))
+                        break
+                break
+    
+    return base_price, modifiers, book.discount_rate(price_list, item['quantity'])
+
+def find_cart_product(item):
+    for product in load_products(item['category_folder']):
+        if slugify(product['name']) == item['product_slug']:
+            return product
+    return None
+
+def get_bulk_discount_rate(quantity):
+    """Get the standard bulk discount rate for a quantity"""
+    return bulk_discount_rate(quantity)
+
+def shipment_lines(cart_items):
+    """Cart lines as warehouses.ShippingNetwork.plan() takes them"""
+    return [{'sku': item['sku'], 'weight': item['total_weight'], 'quantity': item['quantity'],
+             'unit_weight': item['unit_weight'], 'dimensions': item['dimensions']} for item in cart_items]
+
+@metrics.timed('cart_quote')
+def get_cart_quote():
+    """The cart priced once per request: its items, products total and one shipment plan.
+
+    /cart, /checkout and /place-order all take their totals from here, so
+    they agree. Shipping is planned for the whole cart, packed into cartons
+    and charged on their chargeable weight (see warehouses.ShippingNetwork.plan
+    and packing); until the cart has a
+    destination, or if we do not ship there, shipping_total is 0 and
+    shipping_available is False.
+    """
+    if 'cart_quote' not in g:
+        cart_items = get_cart_items_with_details()
+        destination = get_cart_destination()
+        plan = None
+        if cart_items and destination:
+            plan = shipping_network().plan(destination['country'], shipment_lines(cart_items), destination['method'],
+                                           available=inventory.origin_available)
+        
+        products_total = round(sum(item['final_total'] for item in cart_items), 2)
+        shipping_total = plan['cost'] if plan else 0.0
+        g.cart_quote = {
+            'cart_items': cart_items,
+            'destination': destination,
+            'products_total': products_total,
+            'shipping_total': shipping_total,
+            'cart_total': round(products_total + shipping_total, 2),
+            'total_weight': sum(item['total_weight'] for item in cart_items),
+            'chargeable_weight': sum(shipment['chargeable_weight'] for shipment in plan['shipments']) if plan else None,
+            'cartons': sum(shipment['cartons'] for shipment in plan['shipments']) if plan else 0,
+            'shipments': plan['shipments'] if plan else [],
+            'shipping_available': plan is not None,
+        }
+    return g.cart_quote
+
+@metrics.timed('cart_pricing')
+def get_cart_items_with_details():
+    """Get cart items with full product details"""
+    cart = get_cart()
+    cart_items = []
+    
+    for cart_key, item in cart.items():
+        product = find_cart_product(item)
+        if product:
+            # Calculate price with specifications (contract prices if a price list applies)
+            base_price, modifiers, discount_rate = price_line(item, product)
+            spec_details = {
+                spec_category: {'option': option, 'price_modifier': modifier, 'weight_modifier': weight_modifier}
+                for spec_category, (option, modifier, weight_modifier) in modifiers.items()
+            }
+            total_spec_modifier = sum(detail['price_modifier'] for detail in spec_details.values())
+            unit_price = base_price + total_spec_modifier
+            
+            # Calculate totals with bulk discount
+            quantity = item['quantity']
+            discount_amount = unit_price * discount_rate
+            final_unit_price = unit_price - discount_amount
+            subtotal = unit_price * quantity
+            total_discount = discount_amount * quantity
+            final_total = final_unit_price * quantity
+            
+            # Calculate weight with modifiers
+            base_weight = float(product.get('weight', 1.0))
+            total_weight_modifier = sum(detail['weight_modifier'] for detail in spec_details.values())
+            unit_weight = base_weight + total_weight_modifier
+            total_weight = unit_weight * quantity
+            
+            # Packed size, for packing the shipment into cartons
+            dimensions = packed_dimensions(product)
+            
+            cart_items.append({
+                'cart_key': cart_key,
+                'sku': product_sku(item['category_folder'], item['product_slug']),
+                'product': product,
+                'category_folder': item['category_folder'],
+                'quantity': quantity,
+                'specifications': item['specifications'],
+                'spec_details': spec_details,
+                'base_price': base_price,
+                'total_spec_modifier': total_spec_modifier,
+                'unit_price': unit_price,
+                'base_weight': base_weight,
+                'total_weight_modifier': total_weight_modifier,
+                'unit_weight': unit_weight,
+                'total_weight': total_weight,
+                'dimensions': dimensions,
+                'discount_rate': discount_rate,
+                'discount_amount': discount_amount,
+                'final_unit_price': final_unit_price,
+                'subtotal': subtotal,
+                'total_discount': total_discount,
+                'final_total': final_total
+            })
+    
+    return cart_items
+
+# Cart routes
+@bp.route("/add-to-cart", methods=["POST"])
+def add_to_cart_route():
+    """Add item to cart via AJAX"""
+    try:
+        data = request.get_json()
+        category_folder = data.get('category_folder')
+        product_slug = data.get('product_slug')
+        quantity = int(data.get('quantity', 1))
+        specifications = data.get('specifications', {})
+        shipping = data.get('shipping', {})
+        
+        cart_key = add_to_cart(category_folder, product_slug, quantity, specifications, shipping)
+        cart_count = len(get_cart())
+        
+        return jsonify({
+            'success': True,
+            'message': f'Added {quantity} item(s) to cart',
+            'cart_count': cart_count,
+            'cart_key': cart_key
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+@bp.route("/cart")
+def cart():
+    """Display cart page"""
+    quote = get_cart_quote()
+    
+    return render_template('cart.html', 
+                         quote=quote,
+                         cart_items=quote['cart_items'], 
+                         cart_total=quote['cart_total'],
+                         products_total=quote['products_total'],
+                         shipping_total=quote['shipping_total'],
+                         total_weight=quote['total_weight'],
+                         price_list_name=price_book().names.get(current_price_list()))
+
+@bp.route("/price-list", methods=["POST"])
+def apply_price_list():
+    """Apply a contract price list by its code, or go back to standard pricing with an empty code"""
+    code = request.form.get('code', '').strip().upper()
+    if not code:
+        session.pop('price_list', None)
+        flash('Standard pricing restored.')
+        return redirect(url_for('cart.cart'))
+    
+    book = price_book()
+    list_id = book.codes.get(code)
+    if list_id is None:
+        flash('That price list code is not valid.')
+    else:
+        session['price_list'] = list_id
+        flash(f'{book.names[list_id]} pricing applied.')
+    return redirect(url_for('cart.cart'))
+
+@bp.route("/update-cart", methods=["POST"])
+def update_cart():
+    """Update cart item quantity"""
+    try:
+        data = request.get_json()
+        cart_key = data.get('cart_key')
+        quantity = int(data.get('quantity', 0))
+        
+        update_cart_quantity(cart_key, quantity)
+        
+        # Recalculate totals
+        quote = get_cart_quote()
+        
+        return jsonify({
+            'success': True,
+            'cart_total': quote['cart_total'],
+            'products_total': quote['products_total'],
+            'shipping_total': quote['shipping_total'],
+            'chargeable_weight': round(quote['chargeable_weight'] or 0, 3),
+            'cartons': quote['cartons'],
+            'cart_count': len(get_cart())
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+@bp.route("/remove-from-cart", methods=["POST"])
+def remove_from_cart_route():
+    """Remove item from cart"""
+    try:
+        data = request.get_json()
+        cart_key = data.get('cart_key')
+        
+        remove_from_cart(cart_key)
+        
+        return jsonify({
+            'success': True,
+            'cart_count': len(get_cart()),
+            'cart_total': get_cart_quote()['cart_total']
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+@bp.route("/clear-cart")
+def clear_cart():
+    """Clear the cart (for testing purposes)"""
+    session['cart'] = {}
+    flash('Cart cleared successfully.')
+    return redirect(url_for('cart.cart'))
+
+@bp.route("/checkout")
+def checkout():
+    """Display checkout page"""
+    quote = get_cart_quote()
+    
+    if not quote['cart_items']:
+        flash('Your cart is empty.')
+        return redirect(url_for('cart.cart'))
+    
+    return render_template('checkout.html', 
+                         quote=quote,
+                         cart_items=quote['cart_items'], 
+                         products_total=quote['products_total'],
+                         shipping_total=quote['shipping_total'],
+                         cart_total=quote['cart_total'],
+                         total_weight=quote['total_weight'])
+
+@bp.route("/cart-shipping", methods=["POST"])
+def cart_shipping():
+    """Ship the cart to another country (the method stays as chosen) and return the new totals"""
+    data = request.get_json(silent=True) or request.form
+    country = (data.get('country') or '').strip()
+    if not is_shipping_allowed(country):
+        return jsonify({
+            'success': False,
+            'message': f'Sorry, we cannot ship to {country}' if country_name(country) else f'Sorry, we could not find a country called {country}'
+        }), 400
+    
+    set_cart_destination(country)
+    quote = get_cart_quote()
+    return jsonify({
+        'success': True,
+        'country': quote['destination']['country'],
+        'method': quote['destination']['method'],
+        'products_total': quote['products_total'],
+        'shipping_total': quote['shipping_total'],
+        'cart_total': quote['cart_total'],
+        'total_weight': round(quote['total_weight'], 3),
+        'chargeable_weight': round(quote['chargeable_weight'] or 0, 3),
+        'cartons': quote['cartons'],
+        'shipments': [{'name': shipment['name'], 'cost': shipment['cost']} for shipment in quote['shipments']]
+    })
+
+@bp.route("/place-order", methods=["POST"])
+def place_order():
+    """Process order placement"""
+    if not get_cart():
+        flash('Your cart is empty.')
+        return redirect(url_for('cart.cart'))
+    
+    # Get form data
+    customer_info = {
+        'name': request.form.get('name'),
+        'email': request.form.get('email'),
+        'phone': request.form.get('phone'),
+        'company': request.form.get('company', ''),
+        'address': request.form.get('address'),
+        'city': request.form.get('city'),
+        'state': request.form.get('state'),
+        'country': request.form.get('country'),
+        'postal_code': request.form.get('postal_code'),
+        'shipping_method': request.form.get('shipping_method'),
+        'payment_method': request.form.get('payment_method', 'cod'),
+        'notes': request.form.get('notes', '')
+    }
+    
+    # Validate required fields
+    required_fields = ['name', 'email', 'phone', 'address', 'city', 'country']
+    for field in required_fields:
+        if not customer_info[field]:
+            flash(f'{field.replace("_", " ").title()} is required.')
+            return redirect(url_for('cart.checkout'))
+    
+    if not is_shipping_allowed(customer_info['country']):
+        flash(f'Sorry, we cannot ship to {customer_info["country"]}.')
+        return redirect(url_for('cart.checkout'))
+    # Store the country under our name for it, however the customer spelled it
+    customer_info['country'] = country_name(customer_info['country'])
+    
+    # Price the cart and its shipment to this country exactly as /cart and /checkout do; the
+    # method is the one chosen with the shipping calculator, which checkout does not let change
+    submitted_method = customer_info['shipping_method']
+    set_cart_destination(customer_info['country'], None if get_cart_destination() else submitted_method)
+    quote = get_cart_quote()
+    cart_items = quote['cart_items']
+    if not cart_items:
+        flash('Your cart is empty.')
+        return redirect(url_for('cart.cart'))
+    if submitted_method and submitted_method != quote['destination']['method']:
+        flash('The shipping method cannot be changed at checkout. Please choose it with the shipping calculator.')
+        return redirect(url_for('cart.checkout'))
+    customer_info['shipping_method'] = quote['destination']['method']
+    
+    # One ID for the whole checkout: PayPal SKU, stored order and emails all use it
+    order_id = order_id_generator.next_id()
+    
+    # Hold the stock while the order is stored, or while the customer is at PayPal;
+    # every line is checked and claimed in one transaction across all workers
+    stock_lines = order_lines(cart_items)
+    origin_lines = shipping_network().origin_lines(quote['shipments'])
+    try:
+        inventory.reserve(order_id, stock_lines, origins=origin_lines)
+    except OutOfStock as e:
+        flash(shortage_message(cart_items, e))
+        return redirect(url_for('cart.cart'))
+    
+    # Totals from the quote: products only, and the consolidated shipment(s)
+    cart_total = quote['products_total']
+    shipping_cost = quote['shipping_total']
+    total_weight = quote['total_weight']
+    
+    # Totals stay in BASE_CURRENCY; the customer pays in the currency they shop in,
+    # except through PayPal in a currency PayPal cannot take
+    currency = current_currency()
+    exchange_rate = rate_table().multipliers[currency]
+    charge_currency = currency
+    if customer_info['payment_method'] == 'paypal' and currency not in PAYPAL_CURRENCIES:
+        charge_currency = BASE_CURRENCY
+    charge_amount = rate_table().convert(cart_total + shipping_cost, charge_currency)
+    price_list = current_price_list()
+    
+    # Handle payment method
+    payment_status = 'pending'
+    payment_info = {
+        'method': customer_info['payment_method'],
+        'status': payment_status,
+        'amount': charge_amount,
+        'currency': charge_currency
+    }
+    
+    # Add payment-specific information
+    if customer_info['payment_method'] == 'cod':
+        payment_info['instructions'] = 'Pay cash on delivery when you receive your order.'
+    elif customer_info['payment_method'] == 'paypal':
+        # Create PayPal payment
+        return_url = url_for('payments.paypal_success', _external=True)
+        cancel_url = url_for('payments.paypal_cancel', _external=True)
+        
+        paypal_payment = create_paypal_payment(
+            charge_amount,
+            order_id,
+            return_url,
+            cancel_url,
+            charge_currency
+        )
+        
+        approval_url = None
+        if paypal_payment:
+            approval_url = next((link.href for link in paypal_payment.links if link.rel == 'approval_url'), None)
+        if approval_url:
+            # Store order data in session for completion after PayPal approval
+            session['pending_order'] = {
+                'order_id': order_id,
+                'customer_info': customer_info,
+                'cart_items': cart_items,
+                'cart_total': cart_total,
+                'shipping_cost': shipping_cost,
+                'total_weight': total_weight,
+                'chargeable_weight': quote['chargeable_weight'],
+                'currency': currency,
+                'exchange_rate': exchange_rate,
+                'charge_amount': charge_amount,
+                'charge_currency': charge_currency,
+                'price_list': price_list,
+                'shipments': quote['shipments'],
+                'payment_id': paypal_payment.id
+            }
+            
+            # Redirect to PayPal for approval
+            return redirect(approval_url)
+        else:
+            inventory.release(order_id)
+            flash('Error creating PayPal payment. Please try again or choose a different payment method.')
+            return redirect(url_for('cart.checkout'))
+            
+    elif customer_info['payment_method'] == 'upi':
+        payment_info['instructions'] = 'Please pay using UPI and send payment screenshot via email.'
+        payment_info['upi_id'] = 'qualityclamps@upi'
+        payment_info['upi_name'] = 'Quality Clamps'
+    elif customer_info['payment_method'] == 'email':
+        payment_info['instructions'] = 'We will contact you directly for bulk pricing negotiation and payment terms. Check your email within 2 hours for personalized pricing and payment options.'
+        payment_info['contact_email'] = 'orders@qualclamps.com'
+        payment_info['note'] = 'Bulk orders qualify for special pricing and flexible payment terms'
+    
+    # Create order
+    order = {
+        'order_id': order_id,
+        'customer_info': customer_info,
+        'order_items': cart_items,
+        'subtotal': cart_total,
+        'shipping_cost': shipping_cost,
+        'total': round(cart_total + shipping_cost, 2),
+        'total_weight': total_weight,
+        'chargeable_weight': quote['chargeable_weight'],
+        'currency': currency,
+        'exchange_rate': exchange_rate,
+        'price_list': price_list,
+        'shipments': quote['shipments'],
+        'payment_info': payment_info,
+        'status': 'pending',
+        'created_at': time.time(),
+        'created_date': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+    
+    # Save order, then take the stock it holds; if the order cannot be stored, let the stock go
+    try:
+        order_store.add_order(order)
+    except Exception:
+        inventory.release(order_id)
+        raise
+    shortages = inventory.commit(order_id, stock_lines, origins=origin_lines, force=True)
+    if shortages:
+        # Only an admin lowering the stock can get here; the order is stored, so it takes what is left
+        logger.warning('Stock short for placed order', extra={
+            'order_id': order_id, 'shortages': {str(key): units for key, units in shortages.items()}})
+    
+    # Send email notification to sales team (while the confirmation renders, in gevent workers)
+    run_in_background(send_order_notification, order)
+    
+    # Clear cart
+    session['cart'] = {}
+    
+    flash(f'Order {order["order_id"]} placed successfully! We will contact you soon.')
+    return render_template('order_confirmation.html', order=order)
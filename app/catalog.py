@@ -0,0 +1,275 @@
+"""
+Catalog data: category and product files, listing pagination and the
+conditional GET / fragment caching helpers for catalog pages
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+from functools import wraps
+
+from flask import current_app, g, make_response, request, session
+from markupsafe import Markup
+
+from app import catalog_cache, fragment_cache, inventory, metrics, slugify
+from currency import FX_RATES_FILE, current_currency
+from datastore import update_json, write_json
+from inventory import catalog_stock, product_sku
+from packing import product_line, shipping_quote
+
+def parse_json(f):
+    with metrics.span('json_parse'):
+        return json.load(f)
+
+@metrics.timed('load_categories')
+def load_categories():
+    categories_file = os.path.join('data', 'categories.json')
+    cached = catalog_cache.load(categories_file, parse=parse_json)
+    if cached is not None:
+        # The cached objects are shared by every request; callers get copies to change
+        categories = [dict(category) for category in cached]
+        
+        # Update counts for all categories
+        categories_updated = False
+        for category in categories:
+            actual_count = product_count(category['folder'])
+            if category.get('count', 0) != actual_count:
+                category['count'] = actual_count
+                categories_updated = True
+        
+        # Save updated counts if any were changed
+        if categories_updated:
+            save_category_counts({category['folder']: category['count'] for category in categories})
+        
+        return categories
+    return []
+
+def product_count(folder):
+    """Number of products in a category, read off the parsed file without copying it"""
+    cached = catalog_cache.load(products_path(folder), parse=parse_json)
+    return len(cached) if cached is not None else 0
+
+def warm_catalog_cache():
+    """Parse every catalog file into the cache; returns the number of products"""
+    return sum(category['count'] for category in load_categories())
+
+def get_category(folder):
+    """Find a category by folder name"""
+    for category in load_categories():
+        if category['folder'] == folder:
+            return category
+    return None
+
+# Catalog listing pagination
+PRODUCTS_PER_PAGE = 24
+MAX_PRODUCTS_PER_PAGE = 96
+SIZE_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*(?:inch|in\b|")', re.IGNORECASE)
+
+def get_product_price(product):
+    """Get product price as a float for sorting"""
+    try:
+        return float(product.get('price', 0))
+    except (ValueError, TypeError):
+        return 0.0
+
+def get_product_size(product):
+    """Get nominal size in inches from the product record or its name"""
+    try:
+        return float(product['size_in'])
+    except (KeyError, ValueError, TypeError):
+        pass
+    match = SIZE_PATTERN.search(product.get('name', ''))
+    return float(match.group(1)) if match else float('inf')
+
+# sort name -> (key function, reverse); 'default' keeps catalog order
+PRODUCT_SORTS = {
+    'name': (lambda p: p.get('name', '').lower(), False),
+    'price': (get_product_price, False),
+    'price_desc': (get_product_price, True),
+    'size': (get_product_size, False),
+}
+
+def get_listing_args(default_per_page=PRODUCTS_PER_PAGE):
+    """Read page, per_page and sort from the query string with safe defaults"""
+    page = max(1, request.args.get('page', 1, type=int))
+    per_page = request.args.get('per_page', default_per_page, type=int)
+    per_page = min(max(1, per_page), MAX_PRODUCTS_PER_PAGE)
+    sort = request.args.get('sort', 'default')
+    if sort not in PRODUCT_SORTS:
+        sort = 'default'
+    return page, per_page, sort
+
+def paginate_products(products, page=1, per_page=PRODUCTS_PER_PAGE, sort='default'):
+    """Sort products and return one page of them with pagination details"""
+    if sort in PRODUCT_SORTS:
+        key, reverse = PRODUCT_SORTS[sort]
+        products = sorted(products, key=key, reverse=reverse)
+    
+    total = len(products)
+    pages = max(1, math.ceil(total / per_page))
+    page = min(page, pages)
+    start = (page - 1) * per_page
+    
+    return {
+        'items': products[start:start + per_page],
+        'page': page,
+        'per_page': per_page,
+        'sort': sort,
+        'total': total,
+        'pages': pages,
+        'has_prev': page > 1,
+        'has_next': page < pages
+    }
+
+def add_india_shipping(products):
+    """Annotate products with the India air shipping cost shown on listings, packed as the cart packs it"""
+    for product in products:
+        product['india_shipping'] = shipping_quote('India', [product_line(product)])[2]
+    return products
+
+def add_live_stock(folder, products):
+    """Show the units still for sale (after orders and checkout reservations) as each product's stock"""
+    for product in products:
+        available = inventory.available(product_sku(folder, slugify(product['name'])), catalog_stock(product))
+        if available is not None:
+            product['stock'] = available
+    return products
+
+# Conditional GET support for catalog pages
+CATALOG_CACHE_CONTROL = 'private, no-cache'  # Browsers keep the page but revalidate with If-None-Match
+
+def get_catalog_revision():
+    """Get a token that changes whenever catalog data, exchange rates or page templates change.
+
+    Only file metadata is read (mtime and size), so this is cheap enough to
+    run on every request. Orders, stock and other non-catalog files are
+    ignored: pages showing live stock add their category's stock revision
+    (see stock_revision). The value is computed once per request.
+    """
+    if 'catalog_revision' in g:
+        return g.catalog_revision
+
+    stamps = []
+    candidates = [os.path.join('data', 'categories.json'), FX_RATES_FILE]
+    if os.path.isdir('data'):
+        for entry in sorted(os.scandir('data'), key=lambda e: e.name):
+            if entry.is_dir():
+                candidates.append(os.path.join(entry.path, 'products.json'))
+    # Every template, including templates/fragments/ whose output the fragment cache keeps
+    template_dir = os.path.join(current_app.root_path, current_app.template_folder)
+    for directory, subdirectories, files in os.walk(template_dir):
+        subdirectories.sort()
+        candidates.extend(os.path.join(directory, name) for name in sorted(files))
+
+    for path in candidates:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        stamps.append(f"{path}:{stat.st_mtime_ns}:{stat.st_size}")
+
+    g.catalog_revision = hashlib.sha1('|'.join(stamps).encode()).hexdigest()
+    return g.catalog_revision
+
+def stock_revision(folder):
+    """Token for the live stock shown on a category's pages, which changes with nothing else"""
+    return inventory.revision(folder)
+
+def cached_fragment(name, key, render):
+    """Get rendered HTML for a catalog fragment, calling render() only on a cache miss"""
+    # Prices are rendered in the customer's currency, so each currency has its own copy
+    html = fragment_cache.get_or_render(name, (key, current_currency(), get_catalog_revision()), render)
+    return Markup(html)
+
+def invalidate_catalog_fragments():
+    """Drop cached catalog fragments after an admin write"""
+    fragment_cache.clear()
+
+def get_catalog_etag(folder=None):
+    """Build a strong ETag for the current catalog page.
+
+    The navbar renders the cart badge from the session, so the cart size is part
+    of the tag alongside the catalog revision, the display currency and the
+    requested URL. Pages of one category also show its live stock.
+    """
+    cart_count = len(session.get('cart', {}))
+    stock = stock_revision(folder) if folder else ''
+    raw = f"{get_catalog_revision()}|{stock}|{cart_count}|{current_currency()}|{request.full_path}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+def catalog_page(view):
+    """Answer If-None-Match with 304 for catalog pages without rendering them"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # Requests that change session state must always run the view
+        if request.method != 'GET' or request.args.get('clear_cart'):
+            return view(*args, **kwargs)
+
+        etag = get_catalog_etag(kwargs.get('category_folder'))
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = CATALOG_CACHE_CONTROL
+        return response
+    return wrapper
+
+# Helper functions for products
+@metrics.timed('load_products')
+def load_products(folder):
+    products_file = products_path(folder)
+    cached = catalog_cache.load(products_file, parse=parse_json)
+    if cached is not None:
+        # The cached objects are shared by every request; callers get copies to change
+        products = [dict(product) for product in cached]
+        
+        # Save the defaults if any were added, to the current version of the file
+        if fill_product_defaults(products):
+            with update_json(products_file, []) as stored:
+                fill_product_defaults(stored)
+        
+        return products
+    return []
+
+def fill_product_defaults(products):
+    """Add fields older product records lack; returns True if any were added"""
+    updated = False
+    for product in products:
+        if 'price' not in product:
+            product['price'] = 0.0
+            updated = True
+        if 'weight' not in product:
+            product['weight'] = '1.0'
+            updated = True
+        # Migrate images field (convert single image to images array)
+        if 'images' not in product and 'image' in product:
+            product['images'] = [product['image']] if product['image'] else []
+            updated = True
+        elif 'images' not in product:
+            product['images'] = []
+            updated = True
+    return updated
+
+def products_path(folder):
+    return os.path.join('data', folder, 'products.json')
+
+def save_products(folder, products):
+    """Replace a category's products.json; call under locked(products_path(folder)) to read-modify-write"""
+    write_json(products_path(folder), products)
+
+def save_category_counts(counts):
+    """Write product counts (folder -> count) into categories.json"""
+    with update_json(os.path.join('data', 'categories.json'), []) as categories:
+        for category in categories:
+            if category['folder'] in counts:
+                category['count'] = counts[category['folder']]
+
+def update_category_count(folder):
+    """Update the product count for a specific category"""
+    save_category_counts({folder: product_count(folder)})
@@ -0,0 +1,65 @@
+"""
+Parsed catalog files shared by every request in a process
+
+load_categories() and load_products() used to read and parse their JSON file
+on every call. CatalogCache keeps the parsed document for each file and checks
+the file's inode, size and mtime (a single stat call) before handing it out,
+so admin edits, imports and writes by other workers are picked up on the next
+request.
+
+Entries are plain Python objects, so filling the cache before gunicorn forks
+its workers (--preload) lets every worker share one parsed copy of the catalog
+copy-on-write instead of each parsing it again. Callers get the shared objects
+and must copy anything they mutate.
+"""
+
+import json
+import os
+import threading
+
+
+class CatalogCache:
+    """Thread-safe cache of parsed JSON files, revalidated with os.stat()"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, path, parse=json.load):
+        """Return parse(file) for path, parsing again only if the file changed.
+
+        Returns None if the file does not exist.
+        """
+        key = os.path.abspath(path)
+        try:
+            stat = os.stat(key)
+        except FileNotFoundError:
+            with self._lock:
+                self._entries.pop(key, None)
+            return None
+        stamp = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # Parsed outside the lock; if the file is replaced meanwhile the stamp
+        # no longer matches and the next load parses it again
+        with open(key) as f:
+            document = parse(f)
+        with self._lock:
+            self._entries[key] = (stamp, document)
+        return document
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
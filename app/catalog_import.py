@@ -0,0 +1,239 @@
+"""
+Bulk product import helpers for the `flask catalog import` command
+
+Records are streamed from CSV, JSON Lines or a JSON array, validated in one
+pass and converted into the same product shape the admin forms write, so the
+whole batch can be saved to products.json with a single write.
+"""
+
+import csv
+import json
+import math
+import os
+import re
+
+from jsonstream import iter_json_array
+
+TIMESTAMP_SUFFIX = re.compile(r'_\d{9,}$')  # added by save_uploaded_file
+
+
+def iter_records(path):
+    """Yield raw product records from a .csv, .jsonl or .json file"""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, newline='' if ext == '.csv' else None, encoding='utf-8') as f:
+        if ext == '.csv':
+            yield from csv.DictReader(f)
+        elif ext in ('.jsonl', '.ndjson'):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        else:
+            yield from iter_json_array(f)
+
+
+def build_image_index(image_dir):
+    """Map lowercase filenames and stems to the files present in image_dir"""
+    index = {}
+    if not os.path.isdir(image_dir):
+        return index
+    for name in sorted(os.listdir(image_dir)):
+        stem = os.path.splitext(name)[0].lower()
+        # Exact names win over stems, and the newest upload wins over older ones
+        index[name.lower()] = name
+        index.setdefault('stem:' + stem, name)
+        index['stem:' + TIMESTAMP_SUFFIX.sub('', stem)] = name
+    return index
+
+
+def match_image(reference, image_index):
+    """Find an uploaded image by filename, ignoring case and upload timestamps"""
+    reference = os.path.basename(str(reference).strip())
+    if not reference:
+        return None
+    lowered = reference.lower()
+    if lowered in image_index:
+        return image_index[lowered]
+    stem = os.path.splitext(lowered)[0]
+    return image_index.get('stem:' + stem) or image_index.get('stem:' + stem.replace(' ', '_'))
+
+
+def _split_list(value):
+    """Accept lists or ';'/',' separated strings"""
+    if value is None or value == '':
+        return []
+    if isinstance(value, list):
+        return [str(v).strip() for v in value if str(v).strip()]
+    separator = ';' if ';' in str(value) else ','
+    return [v.strip() for v in str(value).split(separator) if v.strip()]
+
+
+def _parse_number(value, field, cast, errors, minimum=0):
+    try:
+        number = cast(value)
+    except (ValueError, TypeError, OverflowError):
+        errors.append(f'{field} must be a number')
+        return None
+    if not math.isfinite(number):
+        errors.append(f'{field} must be a finite number')
+        return None
+    if number < minimum:
+        errors.append(f'{field} must be at least {minimum}')
+        return None
+    return number
+
+
+def _parse_specifications(value, errors):
+    if value in (None, ''):
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            errors.append('specifications must be valid JSON')
+            return []
+    if not isinstance(value, list):
+        errors.append('specifications must be a list')
+        return []
+
+    specifications = []
+    for spec in value:
+        category = str(spec.get('category', '')).strip() if isinstance(spec, dict) else ''
+        if not category:
+            errors.append('specification category is required')
+            continue
+        if not isinstance(spec.get('options', []), list):
+            errors.append(f'specification options must be a list: {category}')
+            continue
+        options = []
+        for option in spec.get('options', []):
+            if not isinstance(option, dict):
+                errors.append(f'specification option must be an object: {category}')
+                continue
+            name = str(option.get('name', '')).strip()
+            if not name:
+                continue
+            try:
+                modifiers = [float(option.get(key) or 0) for key in ('price_modifier', 'weight_modifier')]
+            except (ValueError, TypeError):
+                modifiers = None
+            if modifiers is None or not all(math.isfinite(modifier) for modifier in modifiers):
+                errors.append(f'invalid modifier in specification option: {name}')
+                continue
+            options.append({'name': name, 'price_modifier': modifiers[0], 'weight_modifier': modifiers[1]})
+        if options:
+            specifications.append({'category': category, 'options': options})
+    return specifications
+
+
+def _from_vband_reference(record):
+    """Fill name/description/oem for rows shaped like vband_clamps_full.json"""
+    size = record.get('size_in')
+    part_no = record.get('your_part_no', '')
+    record = dict(record)
+    record.setdefault('name', f'{size} inch V-Band Clamp {part_no}'.strip())
+    record.setdefault('description',
+                      f'V-band clamp with a {size}-inch nominal diameter ({record.get("type", "standard")} profile).')
+    if 'oem' not in record:
+        references = [record.get('exco_part', '')] + list(record.get('cross_references', []))
+        record['oem'] = ', '.join(r for r in references if r)
+    return record
+
+
+def normalize_record(record, image_index, shipping_defaults, default_price=None, default_weight=None):
+    """Validate one raw record and convert it to a product dict.
+
+    Returns (product, errors); product is None when the record is invalid.
+    """
+    if not isinstance(record, dict):
+        return None, ['record must be an object']
+    if 'name' not in record and 'size_in' in record:
+        record = _from_vband_reference(record)
+
+    errors = []
+    name = str(record.get('name') or '').strip()
+    description = str(record.get('description') or '').strip()
+    if not name:
+        errors.append('name is required')
+    if not description:
+        errors.append('description is required')
+
+    price_value = record.get('price')
+    if price_value in (None, ''):
+        price_value = default_price
+    if price_value in (None, ''):
+        errors.append('price is required')
+        price = None
+    else:
+        price = _parse_number(price_value, 'price', float, errors)
+
+    weight_value = record.get('weight')
+    if weight_value in (None, ''):
+        weight_value = default_weight if default_weight is not None else 1.0
+    weight = _parse_number(weight_value, 'weight', float, errors)
+    if weight == 0:
+        errors.append('weight must be greater than 0')
+
+    stock = _parse_number(record.get('stock') or 0, 'stock', int, errors)
+    specifications = _parse_specifications(record.get('specifications'), errors)
+
+    images = []
+    for reference in _split_list(record.get('images') or record.get('image')):
+        matched = match_image(reference, image_index)
+        if matched:
+            images.append(matched)
+        else:
+            errors.append(f'image not found: {reference}')
+
+    if errors:
+        return None, errors
+
+    oem = record.get('oem', '')
+    if isinstance(oem, list):
+        oem = ', '.join(oem)
+
+    product = {
+        'name': name,
+        'description': description,
+        'oem': str(oem).strip(),
+        'weight': str(weight),
+        'price': price,
+        'stock': stock,
+        'image': images[0] if images else '',
+        'images': images,
+        'specifications': specifications,
+        'shipping': dict(shipping_defaults, weight_kg=weight)
+    }
+    return product, []
+
+
+# The product fields each record field sets, for --replace
+RECORD_FIELDS = {
+    'name': ('name',),
+    'description': ('description',),
+    'oem': ('oem',),
+    'price': ('price',),
+    'weight': ('weight',),
+    'stock': ('stock',),
+    'specifications': ('specifications',),
+    'image': ('image', 'images'),
+    'images': ('image', 'images'),
+}
+
+
+def merge_product(existing, product, record):
+    """Update an existing product from a normalized record, only with the fields the record supplied.
+
+    Columns missing from the import file (or left empty) keep their current
+    values, so a price-only file does not reset stock or specifications.
+    """
+    if 'name' not in record and 'size_in' in record:
+        record = _from_vband_reference(record)
+    for field, keys in RECORD_FIELDS.items():
+        if record.get(field) not in (None, ''):
+            for key in keys:
+                existing[key] = product[key]
+    if record.get('weight') not in (None, ''):
+        shipping = existing.get('shipping') or product['shipping']
+        existing['shipping'] = dict(shipping, weight_kg=product['shipping']['weight_kg'])
+    return existing
@@ -0,0 +1,216 @@
+"""
+Flask CLI commands: `flask catalog import`, `flask orders export|rebuild-stats`
+`flask fx refresh|import`, `flask pricing import` and `flask warehouses import`
+"""
+
+import csv
+import json
+import os
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from app import order_store, slugify
+from catalog import (get_category, invalidate_catalog_fragments, load_products, products_path, save_products,
+                     update_category_count)
+from catalog_import import iter_records, merge_product, normalize_record, build_image_index
+from currency import BASE_CURRENCY, fetch_rates, read_rates_file, save_rates
+from datastore import locked
+from order_export import export_orders, EXPORT_FORMATS
+from pricing import save_price_lists, validate_price_lists
+from shipping import EXCLUDED_COUNTRIES, SHIPPING_DISCOUNT, SHIPPING_RATE_PER_1000KM_PER_KG
+from warehouses import save_warehouses, validate_warehouses
+
+@click.group(cls=AppGroup)
+def catalog():
+    """Catalog maintenance commands"""
+
+@catalog.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--category', 'folder', required=True, help='Category folder to import into.')
+@click.option('--price', 'default_price', type=float, help='Price for records that have none.')
+@click.option('--weight', 'default_weight', type=float, help='Weight in kg for records that have none.')
+@click.option('--replace', is_flag=True, help='Update products with the same name instead of skipping them.')
+@click.option('--skip-invalid', is_flag=True, help='Import the valid records even if some fail validation.')
+@click.option('--dry-run', is_flag=True, help='Validate the file without writing anything.')
+def import_catalog(path, folder, default_price, default_weight, replace, skip_invalid, dry_run):
+    """Bulk import products from a CSV, JSON Lines or JSON file into a category.
+
+    All records are validated before anything is written, products.json is
+    rewritten once and the category count is updated once.
+    """
+    if not get_category(folder):
+        raise click.ClickException(f'Category "{folder}" does not exist')
+    
+    started = time.time()
+    # Merge into the current products.json under its lock, so admin edits made meanwhile are kept
+    with locked(products_path(folder)):
+        products = load_products(folder)
+        index_by_slug = {slugify(p['name']): i for i, p in enumerate(products)}
+        image_index = build_image_index(current_app.config['UPLOAD_FOLDER'])
+        shipping_defaults = {
+            'excluded_countries': EXCLUDED_COUNTRIES,
+            'rate_per_1000km_per_kg': SHIPPING_RATE_PER_1000KM_PER_KG,
+            'shipping_discount': SHIPPING_DISCOUNT
+        }
+    
+        added = updated = skipped = 0
+        invalid = []
+        try:
+            for record_no, record in enumerate(iter_records(path), 1):
+                product, errors = normalize_record(record, image_index, shipping_defaults,
+                                                   default_price=default_price, default_weight=default_weight)
+                if errors:
+                    invalid.append((record_no, errors))
+                    continue
+            
+                slug = slugify(product['name'])
+                if slug not in index_by_slug:
+                    index_by_slug[slug] = len(products)
+                    products.append(product)
+                    added += 1
+                elif replace:
+                    merge_product(products[index_by_slug[slug]], product, record)
+                    updated += 1
+                else:
+                    skipped += 1
+        except (ValueError, csv.Error) as e:
+            raise click.ClickException(f'Could not read {path}: {e}')
+    
+        for record_no, errors in invalid[:20]:
+            click.echo(f"  record {record_no}: {'; '.join(errors)}", err=True)
+        if len(invalid) > 20:
+            click.echo(f'  ... and {len(invalid) - 20} more invalid records', err=True)
+        if invalid and not skip_invalid:
+            raise click.ClickException(f'{len(invalid)} invalid record(s), nothing imported (use --skip-invalid to import the rest)')
+    
+        summary = f'{added} added, {updated} updated, {skipped} skipped, {len(invalid)} invalid'
+        if dry_run:
+            click.echo(f'Dry run: {summary}')
+            return
+    
+        # Write products atomically in one go
+        save_products(folder, products)
+    
+    update_category_count(folder)
+    invalidate_catalog_fragments()
+    click.echo(f'Imported into {folder}: {summary} in {time.time() - started:.2f}s')
+
+@click.group(cls=AppGroup)
+def orders():
+    """Order management commands"""
+
+@orders.command('export')
+@click.option('--format', 'fmt', type=click.Choice(sorted(EXPORT_FORMATS)), default='csv', show_default=True)
+@click.option('--from', 'date_from', help='Only orders on or after this date (YYYY-MM-DD).')
+@click.option('--to', 'date_to', help='Only orders on or before this date (YYYY-MM-DD).')
+@click.option('--country', help='Only orders shipping to this country.')
+@click.option('--payment-method', help='Only orders paid with this method (cod, paypal, upi, email).')
+@click.option('--status', help='Only orders with this status.')
+@click.option('--output', '-o', type=click.File('w'), default='-', help='Output file (default: stdout).')
+def export_orders_command(fmt, date_from, date_to, country, payment_method, status, output):
+    """Stream orders as CSV or JSON Lines"""
+    try:
+        orders = order_store.iter_orders(date_from=date_from, date_to=date_to, country=country,
+                                         payment_method=payment_method, status=status)
+        chunks = export_orders(orders, fmt)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    for chunk in chunks:
+        output.write(chunk)
+
+@orders.command('rebuild-stats')
+def rebuild_stats_command():
+    """Recompute the sales dashboard rollups from the order history"""
+    started = time.time()
+    rows = order_store.rebuild_rollups()
+    click.echo(f'Rebuilt {rows} rollup rows from {order_store.count()} orders '
+               f'in {time.time() - started:.2f}s')
+
+@click.group(cls=AppGroup)
+def fx():
+    """Exchange rate commands"""
+
+def report_rates(rates, source):
+    save_rates(rates, source)
+    listed = ', '.join(f'{code} {rate:g}' for code, rate in sorted(rates.items()))
+    click.echo(f'Saved {len(rates)} rates from {source} (1 {BASE_CURRENCY} = {listed})')
+
+@fx.command('refresh')
+@click.option('--url', help='Rates API to download from (default: FX_RATES_URL).')
+def refresh_rates_command(url):
+    """Download current exchange rates"""
+    url = url or current_app.config['FX_RATES_URL']
+    try:
+        rates = fetch_rates(url)
+    except (OSError, ValueError) as e:
+        raise click.ClickException(f'Could not refresh rates from {url}: {e}')
+    report_rates(rates, url)
+
+@fx.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+def import_rates_command(path):
+    """Load exchange rates from a JSON rates file or a currency,rate CSV"""
+    try:
+        rates = read_rates_file(path)
+    except ValueError as e:
+        raise click.ClickException(f'{path}: {e}')
+    report_rates(rates, os.path.basename(path))
+
+@click.group(cls=AppGroup)
+def pricing():
+    """Contract price list commands"""
+
+@pricing.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--dry-run', is_flag=True, help='Validate the file without writing anything.')
+def import_price_lists_command(path, dry_run):
+    """Replace the contract price lists with a JSON file (format in pricing.py)"""
+    try:
+        with open(path) as f:
+            price_lists = json.load(f)
+    except ValueError as e:
+        raise click.ClickException(f'Could not read {path}: {e}')
+    
+    errors = validate_price_lists(price_lists)
+    for error in errors[:20]:
+        click.echo(f'  {error}', err=True)
+    if errors:
+        raise click.ClickException(f'{len(errors)} error(s), nothing imported')
+    
+    summary = ', '.join(f"{p['name']} ({len(p.get('products') or {})} products)" for p in price_lists) or 'no price lists'
+    if dry_run:
+        click.echo(f'Dry run: {summary}')
+        return
+    save_price_lists(price_lists)
+    click.echo(f'Saved {len(price_lists)} price list(s): {summary}')
+
+@click.group(cls=AppGroup)
+def warehouses():
+    """Warehouse commands"""
+
+@warehouses.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--dry-run', is_flag=True, help='Validate the file without writing anything.')
+def import_warehouses_command(path, dry_run):
+    """Replace the warehouse list and stock levels with a JSON file (format in warehouses.py)"""
+    try:
+        with open(path) as f:
+            warehouse_list = json.load(f)
+    except ValueError as e:
+        raise click.ClickException(f'Could not read {path}: {e}')
+    
+    errors = validate_warehouses(warehouse_list)
+    for error in errors[:20]:
+        click.echo(f'  {error}', err=True)
+    if errors:
+        raise click.ClickException(f'{len(errors)} error(s), nothing imported')
+    
+    summary = ', '.join(f"{w['name']} ({len(w.get('stock') or {})} SKUs)" for w in warehouse_list) or 'no warehouses'
+    if dry_run:
+        click.echo(f'Dry run: {summary}')
+        return
+    save_warehouses(warehouse_list)
+    click.echo(f'Saved {len(warehouse_list)} warehouse(s): {summary}')
@@ -0,0 +1,67 @@
+"""
+Shared pytest fixtures
+
+`storefront` runs the app against a fresh copy of a small catalog in a
+temporary directory, with orders in a throwaway SQLite store, e-mail delivered
+to a local fake SMTP server and PayPal calls answered by a local mock. Nothing
+touches the real data directory, SMTP account or PayPal sandbox, so the suite
+runs offline and in parallel (`python -m pytest -n auto`).
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, fragment_cache
+from harness import FakeSMTPServer, MockPayPalServer, Storefront, write_test_catalog
+
+ADMIN_CREDENTIALS = ('test-admin', 'test-password')
+
+
+@pytest.fixture(scope='session')
+def smtp_server():
+    server = FakeSMTPServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(scope='session')
+def paypal_server():
+    server = MockPayPalServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def storefront(tmp_path, monkeypatch, smtp_server, paypal_server):
+    """An app built by create_app() on a temporary data directory, fake SMTP and mock PayPal"""
+    write_test_catalog(str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    data_dir = tmp_path / 'data'
+    monkeypatch.setenv('ADMIN_USERNAME', ADMIN_CREDENTIALS[0])
+    monkeypatch.setenv('ADMIN_PASSWORD', ADMIN_CREDENTIALS[1])
+
+    app = create_app({
+        'ORDERS_DB': str(data_dir / 'orders.db'),
+        'PROFILE_DIR': str(data_dir / 'profiles'),
+        'METRICS_DIR': str(data_dir / 'metrics'),
+        'MAIL_SERVER': smtp_server.host,
+        'MAIL_PORT': smtp_server.port,
+        'MAIL_USE_TLS': False,
+        'MAIL_USERNAME': None,
+        'MAIL_PASSWORD': None,
+        'MAIL_SUPPRESS_SEND': False,
+        'PAYPAL_MODE': 'sandbox',
+        'PAYPAL_CLIENT_ID': 'test-client',
+        'PAYPAL_CLIENT_SECRET': 'test-secret',
+        'PAYPAL_ENDPOINT': paypal_server.url,
+    })
+
+    smtp_server.clear()
+    paypal_server.reset()
+    fragment_cache.clear()
+    yield Storefront(app, tmp_path, smtp_server, paypal_server, ADMIN_CREDENTIALS)
+    fragment_cache.clear()
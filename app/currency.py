@@ -0,0 +1,178 @@
+"""
+Display and checkout currencies
+
+The catalog, shipping rates and stored order totals are all in BASE_CURRENCY.
+Customers can pick another currency in the navbar; amounts are converted for
+display, and for payment, with the rates in data/fx_rates.json:
+
+    {"base": "USD", "as_of": "2026-10-19T06:00:00Z", "source": "...",
+     "rates": {"EUR": 0.92, "INR": 88.4}}
+
+`flask fx refresh` downloads the rates (deploy_vps.sh runs it daily), and
+`flask fx import <file>` loads them from a file on a server that cannot reach
+the internet. Without the file only BASE_CURRENCY is offered.
+
+The file is read through the catalog cache, so the per-currency multipliers
+are built once per version of it, and it is part of the catalog revision;
+catalog fragments are cached per currency (see catalog.cached_fragment), so a
+converted price is computed once per page version rather than per request.
+"""
+
+import csv
+import json
+import os
+import time
+import urllib.request
+
+from flask import current_app, g, session
+
+from app import catalog_cache, logger
+from datastore import write_json
+
+BASE_CURRENCY = 'USD'
+FX_RATES_FILE = os.path.join('data', 'fx_rates.json')
+
+# Currencies offered when the rates file has them: code -> (symbol, decimal places)
+CURRENCIES = {
+    'USD': ('$', 2),
+    'EUR': ('€', 2),
+    'GBP': ('£', 2),
+    'INR': ('₹', 2),
+    'AED': ('AED ', 2),
+    'SAR': ('SAR ', 2),
+    'QAR': ('QAR ', 2),
+    'OMR': ('OMR ', 3),
+    'KWD': ('KWD ', 3),
+    'BHD': ('BHD ', 3),
+}
+
+# PayPal payments can be made in these; other currencies are charged in BASE_CURRENCY
+PAYPAL_CURRENCIES = {'USD', 'EUR', 'GBP'}
+
+
+def format_amount(amount, currency, rate=1.0):
+    """Convert a BASE_CURRENCY amount at rate and format it, e.g. ₹1,104.50"""
+    symbol, places = CURRENCIES.get(currency, (f'{currency} ', 2))
+    return f'{symbol}{round(float(amount) * rate, places):,.{places}f}'
+
+
+class RateTable:
+    """Multipliers from BASE_CURRENCY to every offered currency with a rate"""
+
+    def __init__(self, rates, as_of=None, source=None):
+        self.multipliers = {BASE_CURRENCY: 1.0}
+        for code in CURRENCIES:
+            if rates.get(code, 0) > 0:
+                self.multipliers[code] = float(rates[code])
+        self.as_of = as_of
+        self.source = source
+
+    @property
+    def currencies(self):
+        return list(self.multipliers)
+
+    def convert(self, amount, currency):
+        """A BASE_CURRENCY amount in currency, rounded to its decimal places"""
+        return round(float(amount) * self.multipliers[currency], CURRENCIES[currency][1])
+
+    def format(self, amount, currency):
+        return format_amount(amount, currency, self.multipliers[currency])
+
+
+def normalize_rates(document):
+    """Rates from BASE_CURRENCY for the offered currencies, from a rates document in any base.
+
+    Accepts {"base": ..., "rates": {...}} as written here and by most rate
+    APIs ("base_code" is accepted for "base"). Raises ValueError if the
+    document has no usable rates.
+    """
+    base = str(document.get('base') or document.get('base_code') or BASE_CURRENCY).upper()
+    try:
+        rates = {str(code).upper(): float(rate) for code, rate in (document.get('rates') or {}).items()}
+    except (TypeError, ValueError):
+        raise ValueError('Rates must be numbers')
+    rates[base] = 1.0
+    if rates.get(BASE_CURRENCY, 0) <= 0:
+        raise ValueError(f'No {BASE_CURRENCY} rate to convert from {base}')
+
+    per_base = rates[BASE_CURRENCY]
+    normalized = {code: round(rate / per_base, 8) for code, rate in rates.items()
+                  if code in CURRENCIES and code != BASE_CURRENCY and rate > 0}
+    if not normalized:
+        raise ValueError(f'No rates for any of {", ".join(sorted(CURRENCIES))}')
+    return normalized
+
+
+def read_rates_file(path):
+    """Rates from a JSON rates document or a CSV of currency,rate rows (rates from BASE_CURRENCY)"""
+    with open(path, newline='') as f:
+        if path.lower().endswith('.csv'):
+            rows = [row for row in csv.reader(f) if row and not row[0].startswith('#')]
+            if rows and rows[0][0].strip().lower() == 'currency':
+                rows = rows[1:]
+            if any(len(row) < 2 for row in rows):
+                raise ValueError('Each CSV row needs a currency and a rate')
+            return normalize_rates({'base': BASE_CURRENCY, 'rates': {row[0].strip(): row[1] for row in rows}})
+        return normalize_rates(json.load(f))
+
+
+def fetch_rates(url, timeout=30):
+    """Download a rates document from url"""
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return normalize_rates(json.load(response))
+
+
+def save_rates(rates, source):
+    """Replace data/fx_rates.json; running workers pick it up on their next request"""
+    write_json(FX_RATES_FILE, {
+        'base': BASE_CURRENCY,
+        'as_of': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'source': source,
+        'rates': dict(sorted(rates.items())),
+    })
+
+
+def parse_rate_file(f):
+    document = json.load(f)
+    try:
+        rates = normalize_rates(document)
+    except ValueError:
+        logger.warning('Ignoring unusable exchange rates', extra={'path': FX_RATES_FILE})
+        rates = {}
+    return RateTable(rates, as_of=document.get('as_of'), source=document.get('source'))
+
+
+BASE_ONLY = RateTable({})
+
+
+def rate_table():
+    """The current rates, checked against the file once per request"""
+    if 'rate_table' not in g:
+        g.rate_table = catalog_cache.load(FX_RATES_FILE, parse=parse_rate_file) or BASE_ONLY
+    return g.rate_table
+
+
+def current_currency():
+    """The customer's chosen currency, else DEFAULT_CURRENCY, if there is a rate for it"""
+    multipliers = rate_table().multipliers
+    for code in (session.get('currency'), current_app.config['DEFAULT_CURRENCY']):
+        if code in multipliers:
+            return code
+    return BASE_CURRENCY
+
+
+def money(amount, currency=None):
+    """Template filter: a BASE_CURRENCY amount in the customer's currency"""
+    return rate_table().format(amount or 0, currency or current_currency())
+
+
+def order_money(amount, order):
+    """Template filter: an order amount in the currency and at the rate the order was placed with"""
+    return format_amount(amount or 0, order.get('currency', BASE_CURRENCY), order.get('exchange_rate', 1.0))
+
+
+def currency_format():
+    """Settings for formatMoney() in page scripts (see currency_script.html)"""
+    currency = current_currency()
+    symbol, places = CURRENCIES[currency]
+    return {'code': currency, 'symbol': symbol, 'places': places, 'rate': rate_table().multipliers[currency]}
@@ -0,0 +1,121 @@
+"""
+Locked, atomic writes for the JSON files under data/
+
+Every gunicorn worker (and `flask catalog import`) may rewrite categories.json
+or a category's products.json. Writers take an fcntl lock on a `<file>.lock`
+file next to the data file, so read-modify-write cycles in different
+processes run one after another instead of losing each other's changes.
+
+The new version is written to a temporary file in the same directory, flushed
+with fsync and renamed over the old one, so a reader opening the file at any
+moment gets either the old or the new document, never a truncated one.
+Readers therefore take no lock. Each version's mtime is set strictly later
+than the one it replaces, so a stat-based cache (CatalogCache) always sees the
+change even on filesystems with coarse timestamps or when an inode is reused.
+"""
+
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+_held = threading.local()
+_path_locks = {}
+_path_locks_guard = threading.Lock()
+
+
+def _path_lock(key):
+    with _path_locks_guard:
+        return _path_locks.setdefault(key, threading.Lock())
+
+
+@contextmanager
+def locked(path):
+    """Hold the exclusive writer lock for path.
+
+    Re-entrant within a thread, so helpers that write (save_products) can be
+    called from inside a larger locked update of the same file.
+    """
+    held = _held.__dict__.setdefault('locks', {})
+    key = os.path.abspath(path)
+    if key in held:
+        held[key] += 1
+        try:
+            yield
+        finally:
+            held[key] -= 1
+        return
+
+    directory = os.path.dirname(key)
+    os.makedirs(directory, exist_ok=True)
+    # Writers in this process queue on a threading lock first (a cooperative one
+    # under gevent), so flock only ever waits for another process
+    with _path_lock(key), open(f'{key}.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        held[key] = 1
+        try:
+            yield
+        finally:
+            del held[key]
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def read_json(path, default=None):
+    """Parse the current version of path without locking; default if it does not exist"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def write_json(path, data, indent=2):
+    """Replace path with data atomically, under the writer lock"""
+    with locked(path):
+        directory = os.path.dirname(os.path.abspath(path))
+        try:
+            previous = os.stat(path)
+        except FileNotFoundError:
+            previous = None
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f, indent=indent)
+                f.flush()
+                os.fchmod(f.fileno(), previous.st_mode & 0o777 if previous else 0o644)
+                os.fsync(f.fileno())
+            mtime_ns = time.time_ns()
+            if previous and mtime_ns <= previous.st_mtime_ns:
+                mtime_ns = previous.st_mtime_ns + 1
+            os.utime(tmp_path, ns=(mtime_ns, mtime_ns))
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        # Make the rename itself durable
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+@contextmanager
+def update_json(path, default):
+    """Read path under the writer lock, let the caller change it, then write it back.
+
+    The document is parsed fresh from disk, not from a cache. Nothing is
+    written if the block raises.
+    """
+    with locked(path):
+        data = read_json(path, default)
+        yield data
+        write_json(path, data)
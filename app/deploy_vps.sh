@@ -50,7 +50,7 @@ source venv/bin/activate
 # 4. Install Python dependencies
 print_status "Installing Python dependencies..."
 pip install --upgrade pip
-pip install Flask Flask-Mail python-dotenv paypalrestsdk gunicorn
+pip install Flask Flask-Mail python-dotenv paypalrestsdk gunicorn gevent
 
 # 5. Create directories
 print_status "Creating necessary directories..."
@@ -76,13 +76,41 @@ User=$USER
 Group=www-data
 WorkingDirectory=$APP_DIR
 Environment=PATH=$APP_DIR/venv/bin
-ExecStart=$APP_DIR/venv/bin/gunicorn --workers 3 --bind 0.0.0.0:8000 app:app
+ExecStart=$APP_DIR/venv/bin/gunicorn -c gunicorn.conf.py
+ExecReload=/bin/kill -s HUP \$MAINPID
 Restart=always
 
 [Install]
 WantedBy=multi-user.target
 EOF
 
+# 8. Refresh exchange rates daily (prices can be shown in the customer's currency)
+print_status "Creating exchange rate refresh timer..."
+sudo tee /etc/systemd/system/qualclamps-fx.service > /dev/null <<EOF
+[Unit]
+Description=Quality Clamps exchange rate refresh
+After=network-online.target
+
+[Service]
+Type=oneshot
+User=$USER
+WorkingDirectory=$APP_DIR
+Environment=PATH=$APP_DIR/venv/bin
+ExecStart=$APP_DIR/venv/bin/flask --app app:create_app fx refresh
+EOF
+
+sudo tee /etc/systemd/system/qualclamps-fx.timer > /dev/null <<EOF
+[Unit]
+Description=Refresh Quality Clamps exchange rates daily
+
+[Timer]
+OnCalendar=daily
+Persistent=true
+
+[Install]
+WantedBy=timers.target
+EOF
+
 print_status "Deployment script completed!"
 print_warning "Next steps:"
 echo "1. Copy your Flask application files to $APP_DIR"
@@ -91,4 +119,7 @@ echo "3. Start the service:"
 echo "   sudo systemctl daemon-reload"
 echo "   sudo systemctl start qualclamps"
 echo "   sudo systemctl enable qualclamps"
+echo "   sudo systemctl enable --now qualclamps-fx.timer"
 echo "4. Access your application at http://<your_vps_ip>:8000"
+echo "Worker count, threads and recycling are set in gunicorn.conf.py (WEB_CONCURRENCY etc. in .env override them)"
+echo "Without internet access, load exchange rates from a file instead: flask --app app:create_app fx import rates.csv"
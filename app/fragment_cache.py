@@ -0,0 +1,80 @@
+"""
+In-process LRU cache for rendered template fragments
+
+Catalog pages spend most of their time rendering the product grid, category
+tiles and product detail body, all of which only change when the catalog does.
+Entries are keyed by fragment name, a caller supplied key and the catalog
+revision, so a stale revision can never be served. Admin writes call clear().
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class FragmentCache:
+    """Thread-safe LRU cache of rendered HTML with per-fragment hit counters"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _fragment_stats(self, name):
+        return self._stats.setdefault(name, {'hits': 0, 'misses': 0, 'evictions': 0})
+
+    def get(self, name, key):
+        """Return cached HTML for (name, key), or None on a miss"""
+        cache_key = (name, key)
+        with self._lock:
+            stats = self._fragment_stats(name)
+            html = self._entries.get(cache_key)
+            if html is None:
+                stats['misses'] += 1
+                return None
+            self._entries.move_to_end(cache_key)
+            stats['hits'] += 1
+            return html
+
+    def set(self, name, key, html):
+        """Store rendered HTML, evicting the least recently used entries"""
+        cache_key = (name, key)
+        with self._lock:
+            self._fragment_stats(name)
+            self._entries[cache_key] = html
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                (evicted_name, _), _ = self._entries.popitem(last=False)
+                self._fragment_stats(evicted_name)['evictions'] += 1
+
+    def get_or_render(self, name, key, render):
+        """Return cached HTML, calling render() to build it on a miss"""
+        html = self.get(name, key)
+        if html is None:
+            html = render()
+            self.set(name, key, html)
+        return html
+
+    def clear(self):
+        """Drop every cached fragment (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Get hit/miss counters and hit rate for each fragment name"""
+        with self._lock:
+            sizes = {}
+            for name, _ in self._entries:
+                sizes[name] = sizes.get(name, 0) + 1
+
+            report = {}
+            for name, stats in self._stats.items():
+                lookups = stats['hits'] + stats['misses']
+                report[name] = dict(stats,
+                                    entries=sizes.get(name, 0),
+                                    hit_rate=round(stats['hits'] / lookups, 4) if lookups else 0.0)
+            return report
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,290 @@
+"""
+Countries, their coordinates and great-circle distances for shipping
+
+Each country has ISO 3166 codes and a representative point for freight: the
+geographic centre for most countries, the main commercial centre for the
+large ones where the centre is far from where goods go (Russia, Canada,
+Brazil, Argentina, Chile, Australia). Country names typed by customers are
+matched against names, ISO codes and common aliases ("USA", "UAE",
+"Deutschland"), with a close-spelling fallback, and each distinct input is
+resolved once.
+
+A DistanceTable computes the distance from each origin to every country when
+it is built, so a shipping quote is a dictionary lookup and an index.
+"""
+
+import difflib
+import math
+import unicodedata
+from array import array
+from functools import lru_cache
+
+EARTH_RADIUS_KM = 6371.0
+
+# (ISO alpha-2, ISO alpha-3, name, latitude, longitude)
+COUNTRIES = (
+    # South and Central Asia
+    ('IN', 'IND', 'India', 22.9, 79.6),
+    ('PK', 'PAK', 'Pakistan', 30.0, 69.4),
+    ('NP', 'NPL', 'Nepal', 28.4, 84.1),
+    ('BD', 'BGD', 'Bangladesh', 23.7, 90.4),
+    ('LK', 'LKA', 'Sri Lanka', 7.9, 80.8),
+    ('BT', 'BTN', 'Bhutan', 27.5, 90.4),
+    ('MV', 'MDV', 'Maldives', 3.2, 73.2),
+    ('AF', 'AFG', 'Afghanistan', 33.9, 67.7),
+    ('KZ', 'KAZ', 'Kazakhstan', 48.0, 66.9),
+    ('UZ', 'UZB', 'Uzbekistan', 41.4, 64.6),
+    ('TM', 'TKM', 'Turkmenistan', 39.0, 59.6),
+    ('KG', 'KGZ', 'Kyrgyzstan', 41.2, 74.8),
+    ('TJ', 'TJK', 'Tajikistan', 38.9, 71.3),
+    # East and South-East Asia
+    ('CN', 'CHN', 'China', 35.9, 104.2),
+    ('HK', 'HKG', 'Hong Kong', 22.3, 114.2),
+    ('MO', 'MAC', 'Macau', 22.2, 113.5),
+    ('TW', 'TWN', 'Taiwan', 23.7, 121.0),
+    ('MN', 'MNG', 'Mongolia', 46.9, 103.8),
+    ('JP', 'JPN', 'Japan', 36.2, 138.3),
+    ('KR', 'KOR', 'South Korea', 35.9, 127.8),
+    ('KP', 'PRK', 'North Korea', 40.3, 127.5),
+    ('MM', 'MMR', 'Myanmar', 21.9, 96.0),
+    ('TH', 'THA', 'Thailand', 15.9, 101.0),
+    ('LA', 'LAO', 'Laos', 19.9, 102.5),
+    ('KH', 'KHM', 'Cambodia', 12.6, 105.0),
+    ('VN', 'VNM', 'Vietnam', 14.1, 108.3),
+    ('MY', 'MYS', 'Malaysia', 4.2, 102.0),
+    ('SG', 'SGP', 'Singapore', 1.35, 103.8),
+    ('BN', 'BRN', 'Brunei', 4.5, 114.7),
+    ('ID', 'IDN', 'Indonesia', -0.8, 113.9),
+    ('PH', 'PHL', 'Philippines', 12.9, 121.8),
+    ('TL', 'TLS', 'East Timor', -8.9, 125.7),
+    # Middle East and Caucasus
+    ('IR', 'IRN', 'Iran', 32.4, 53.7),
+    ('IQ', 'IRQ', 'Iraq', 33.2, 43.7),
+    ('SY', 'SYR', 'Syria', 34.8, 39.0),
+    ('TR', 'TUR', 'Turkey', 39.0, 35.2),
+    ('GE', 'GEO', 'Georgia', 42.3, 43.4),
+    ('AM', 'ARM', 'Armenia', 40.1, 45.0),
+    ('AZ', 'AZE', 'Azerbaijan', 40.1, 47.6),
+    ('SA', 'SAU', 'Saudi Arabia', 23.9, 45.1),
+    ('AE', 'ARE', 'United Arab Emirates', 23.4, 53.8),
+    ('QA', 'QAT', 'Qatar', 25.4, 51.2),
+    ('KW', 'KWT', 'Kuwait', 29.3, 47.5),
+    ('BH', 'BHR', 'Bahrain', 26.0, 50.6),
+    ('OM', 'OMN', 'Oman', 21.5, 55.9),
+    ('YE', 'YEM', 'Yemen', 15.6, 48.5),
+    ('JO', 'JOR', 'Jordan', 30.6, 36.2),
+    ('LB', 'LBN', 'Lebanon', 33.9, 35.9),
+    ('IL', 'ISR', 'Israel', 31.0, 34.9),
+    ('PS', 'PSE', 'Palestine', 31.9, 35.2),
+    ('CY', 'CYP', 'Cyprus', 35.1, 33.4),
+    # Africa
+    ('EG', 'EGY', 'Egypt', 26.8, 30.8),
+    ('LY', 'LBY', 'Libya', 26.3, 17.2),
+    ('TN', 'TUN', 'Tunisia', 33.9, 9.5),
+    ('DZ', 'DZA', 'Algeria', 28.0, 1.7),
+    ('MA', 'MAR', 'Morocco', 31.8, -7.1),
+    ('SD', 'SDN', 'Sudan', 12.9, 30.2),
+    ('SS', 'SSD', 'South Sudan', 6.9, 31.3),
+    ('ET', 'ETH', 'Ethiopia', 9.1, 40.5),
+    ('ER', 'ERI', 'Eritrea', 15.2, 39.8),
+    ('DJ', 'DJI', 'Djibouti', 11.8, 42.6),
+    ('SO', 'SOM', 'Somalia', 5.2, 46.2),
+    ('KE', 'KEN', 'Kenya', 0.0, 37.9),
+    ('UG', 'UGA', 'Uganda', 1.4, 32.3),
+    ('TZ', 'TZA', 'Tanzania', -6.4, 34.9),
+    ('RW', 'RWA', 'Rwanda', -1.9, 29.9),
+    ('NG', 'NGA', 'Nigeria', 9.1, 8.7),
+    ('GH', 'GHA', 'Ghana', 7.9, -1.0),
+    ('CI', 'CIV', 'Ivory Coast', 7.5, -5.5),
+    ('SN', 'SEN', 'Senegal', 14.5, -14.5),
+    ('ML', 'MLI', 'Mali', 17.6, -4.0),
+    ('BF', 'BFA', 'Burkina Faso', 12.2, -1.6),
+    ('NE', 'NER', 'Niger', 17.6, 8.1),
+    ('TD', 'TCD', 'Chad', 15.5, 18.7),
+    ('CM', 'CMR', 'Cameroon', 7.4, 12.4),
+    ('CF', 'CAF', 'Central African Republic', 6.6, 20.9),
+    ('CD', 'COD', 'Democratic Republic of Congo', -4.0, 21.8),
+    ('CG', 'COG', 'Republic of the Congo', -0.2, 15.8),
+    ('AO', 'AGO', 'Angola', -11.2, 17.9),
+    ('ZM', 'ZMB', 'Zambia', -13.1, 27.8),
+    ('ZW', 'ZWE', 'Zimbabwe', -19.0, 29.2),
+    ('MW', 'MWI', 'Malawi', -13.3, 34.3),
+    ('MZ', 'MOZ', 'Mozambique', -18.7, 35.5),
+    ('BW', 'BWA', 'Botswana', -22.3, 24.7),
+    ('NA', 'NAM', 'Namibia', -23.0, 18.5),
+    ('ZA', 'ZAF', 'South Africa', -30.6, 22.9),
+    ('MG', 'MDG', 'Madagascar', -18.8, 46.9),
+    ('MU', 'MUS', 'Mauritius', -20.3, 57.6),
+    ('SC', 'SYC', 'Seychelles', -4.7, 55.5),
+    # Europe
+    ('RU', 'RUS', 'Russia', 55.8, 37.6),
+    ('UA', 'UKR', 'Ukraine', 48.4, 31.2),
+    ('BY', 'BLR', 'Belarus', 53.7, 28.0),
+    ('MD', 'MDA', 'Moldova', 47.4, 28.4),
+    ('PL', 'POL', 'Poland', 51.9, 19.1),
+    ('LT', 'LTU', 'Lithuania', 55.2, 23.9),
+    ('LV', 'LVA', 'Latvia', 56.9, 24.6),
+    ('EE', 'EST', 'Estonia', 58.6, 25.0),
+    ('FI', 'FIN', 'Finland', 61.9, 25.7),
+    ('SE', 'SWE', 'Sweden', 60.1, 18.6),
+    ('NO', 'NOR', 'Norway', 60.5, 8.5),
+    ('DK', 'DNK', 'Denmark', 56.3, 9.5),
+    ('IS', 'ISL', 'Iceland', 65.0, -19.0),
+    ('DE', 'DEU', 'Germany', 51.2, 10.5),
+    ('NL', 'NLD', 'Netherlands', 52.1, 5.3),
+    ('BE', 'BEL', 'Belgium', 50.5, 4.5),
+    ('LU', 'LUX', 'Luxembourg', 49.8, 6.1),
+    ('FR', 'FRA', 'France', 46.2, 2.2),
+    ('GB', 'GBR', 'United Kingdom', 54.0, -2.0),
+    ('IE', 'IRL', 'Ireland', 53.4, -8.2),
+    ('ES', 'ESP', 'Spain', 40.5, -3.7),
+    ('PT', 'PRT', 'Portugal', 39.4, -8.2),
+    ('IT', 'ITA', 'Italy', 41.9, 12.6),
+    ('MT', 'MLT', 'Malta', 35.9, 14.4),
+    ('CH', 'CHE', 'Switzerland', 46.8, 8.2),
+    ('AT', 'AUT', 'Austria', 47.5, 14.6),
+    ('CZ', 'CZE', 'Czech Republic', 49.8, 15.5),
+    ('SK', 'SVK', 'Slovakia', 48.7, 19.7),
+    ('HU', 'HUN', 'Hungary', 47.2, 19.5),
+    ('SI', 'SVN', 'Slovenia', 46.2, 15.0),
+    ('HR', 'HRV', 'Croatia', 45.1, 15.2),
+    ('BA', 'BIH', 'Bosnia and Herzegovina', 43.9, 17.7),
+    ('RS', 'SRB', 'Serbia', 44.0, 21.0),
+    ('ME', 'MNE', 'Montenegro', 42.7, 19.4),
+    ('AL', 'ALB', 'Albania', 41.2, 20.2),
+    ('MK', 'MKD', 'North Macedonia', 41.6, 21.7),
+    ('GR', 'GRC', 'Greece', 39.1, 21.8),
+    ('BG', 'BGR', 'Bulgaria', 42.7, 25.5),
+    ('RO', 'ROU', 'Romania', 45.9, 25.0),
+    # Americas
+    ('US', 'USA', 'United States', 37.1, -95.7),
+    ('CA', 'CAN', 'Canada', 45.4, -75.7),
+    ('MX', 'MEX', 'Mexico', 23.6, -102.6),
+    ('GT', 'GTM', 'Guatemala', 15.8, -90.2),
+    ('BZ', 'BLZ', 'Belize', 17.2, -88.5),
+    ('HN', 'HND', 'Honduras', 15.2, -86.2),
+    ('SV', 'SLV', 'El Salvador', 13.8, -88.9),
+    ('NI', 'NIC', 'Nicaragua', 12.9, -85.2),
+    ('CR', 'CRI', 'Costa Rica', 9.7, -83.8),
+    ('PA', 'PAN', 'Panama', 8.5, -80.8),
+    ('CU', 'CUB', 'Cuba', 21.5, -77.8),
+    ('JM', 'JAM', 'Jamaica', 18.1, -77.3),
+    ('DO', 'DOM', 'Dominican Republic', 18.7, -70.2),
+    ('TT', 'TTO', 'Trinidad and Tobago', 10.7, -61.2),
+    ('CO', 'COL', 'Colombia', 4.6, -74.3),
+    ('VE', 'VEN', 'Venezuela', 6.4, -66.6),
+    ('GY', 'GUY', 'Guyana', 4.9, -58.9),
+    ('SR', 'SUR', 'Suriname', 3.9, -56.0),
+    ('EC', 'ECU', 'Ecuador', -1.8, -78.2),
+    ('PE', 'PER', 'Peru', -9.2, -75.0),
+    ('BO', 'BOL', 'Bolivia', -16.3, -63.6),
+    ('BR', 'BRA', 'Brazil', -22.0, -47.0),
+    ('PY', 'PRY', 'Paraguay', -23.4, -58.4),
+    ('UY', 'URY', 'Uruguay', -32.5, -55.8),
+    ('AR', 'ARG', 'Argentina', -34.6, -58.4),
+    ('CL', 'CHL', 'Chile', -33.4, -70.7),
+    # Oceania
+    ('AU', 'AUS', 'Australia', -33.9, 151.2),
+    ('NZ', 'NZL', 'New Zealand', -40.9, 174.9),
+    ('PG', 'PNG', 'Papua New Guinea', -6.3, 144.0),
+    ('FJ', 'FJI', 'Fiji', -17.7, 178.1),
+    ('SB', 'SLB', 'Solomon Islands', -9.6, 160.2),
+    ('VU', 'VUT', 'Vanuatu', -15.4, 167.0),
+    ('NC', 'NCL', 'New Caledonia', -20.9, 165.6),
+    ('WS', 'WSM', 'Samoa', -13.8, -172.1),
+    ('TO', 'TON', 'Tonga', -21.2, -175.2),
+    ('CK', 'COK', 'Cook Islands', -21.2, -159.8),
+    ('PF', 'PYF', 'French Polynesia', -17.7, -149.4),
+)
+
+# Other names customers use: alias -> ISO alpha-2
+ALIASES = {
+    'bharat': 'IN', 'hindustan': 'IN',
+    'prc': 'CN', 'peoples republic of china': 'CN', 'mainland china': 'CN',
+    'ceylon': 'LK', 'burma': 'MM', 'siam': 'TH', 'viet nam': 'VN', 'lao pdr': 'LA',
+    'timor leste': 'TL', 'brunei darussalam': 'BN', 'hong kong sar': 'HK', 'macao': 'MO',
+    'korea': 'KR', 'republic of korea': 'KR', 'dprk': 'KP', 'persia': 'IR',
+    'turkiye': 'TR', 'ksa': 'SA', 'uae': 'AE', 'emirates': 'AE', 'dubai': 'AE', 'abu dhabi': 'AE',
+    'cote divoire': 'CI', 'dr congo': 'CD', 'drc': 'CD', 'congo kinshasa': 'CD',
+    'congo': 'CG', 'congo brazzaville': 'CG', 'rsa': 'ZA',
+    'russian federation': 'RU', 'czechia': 'CZ', 'deutschland': 'DE', 'holland': 'NL',
+    'uk': 'GB', 'great britain': 'GB', 'britain': 'GB', 'england': 'GB', 'scotland': 'GB',
+    'wales': 'GB', 'northern ireland': 'GB', 'eire': 'IE', 'espana': 'ES', 'italia': 'IT',
+    'schweiz': 'CH', 'suisse': 'CH', 'osterreich': 'AT', 'hellas': 'GR', 'hrvatska': 'HR',
+    'bosnia': 'BA', 'macedonia': 'MK',
+    'us': 'US', 'united states of america': 'US', 'america': 'US',
+    'mexique': 'MX', 'brasil': 'BR',
+}
+
+CLOSE_MATCH_CUTOFF = 0.85
+
+
+def normalize_name(name):
+    """Lower-case, accent-free, punctuation-free form of a country name, e.g. 'U.S.A.' -> 'usa'"""
+    name = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode().lower()
+    name = name.replace('&', ' and ').replace('.', '').replace("'", '')
+    name = ' '.join(''.join(c if c.isalnum() else ' ' for c in name).split())
+    return name[4:] if name.startswith('the ') else name
+
+
+INDEX = {code: i for i, (code, _, _, _, _) in enumerate(COUNTRIES)}
+NAMES = {code: name for code, _, name, _, _ in COUNTRIES}
+
+_LOOKUP = {}
+for _alpha2, _alpha3, _name, _, _ in COUNTRIES:
+    for _key in (_alpha2, _alpha3, _name):
+        _LOOKUP[normalize_name(_key)] = _alpha2
+for _alias, _alpha2 in ALIASES.items():
+    _LOOKUP[normalize_name(_alias)] = _alpha2
+# Close-spelling matches only against names and aliases; two and three letter codes match too easily
+_SPELLINGS = [key for key in _LOOKUP if len(key) > 3]
+
+
+@lru_cache(maxsize=4096)
+def country_code(name):
+    """ISO alpha-2 code for a country name, code or alias, or None if it is not a country we know"""
+    key = normalize_name(name or '')
+    if key in _LOOKUP:
+        return _LOOKUP[key]
+    if len(key) > 3:
+        match = difflib.get_close_matches(key, _SPELLINGS, n=1, cutoff=CLOSE_MATCH_CUTOFF)
+        if match:
+            return _LOOKUP[match[0]]
+    return None
+
+
+def country_name(name):
+    """Our name for a country, e.g. 'UAE' -> 'United Arab Emirates'; None if unknown"""
+    code = country_code(name)
+    return NAMES[code] if code else None
+
+
+# Destination trigonometry, computed once for every DistanceTable row
+_LATITUDES = array('d', (math.radians(lat) for _, _, _, lat, _ in COUNTRIES))
+_LONGITUDES = array('d', (math.radians(lon) for _, _, _, _, lon in COUNTRIES))
+_COS_LATITUDES = array('d', (math.cos(lat) for lat in _LATITUDES))
+
+
+def distance_row(latitude, longitude):
+    """Great-circle (haversine) distances in km from a point to every country, in COUNTRIES order"""
+    lat, lon = math.radians(latitude), math.radians(longitude)
+    cos_lat = math.cos(lat)
+    row = array('d', bytes(8 * len(COUNTRIES)))
+    for i, (to_lat, to_lon, to_cos) in enumerate(zip(_LATITUDES, _LONGITUDES, _COS_LATITUDES)):
+        h = math.sin((to_lat - lat) / 2) ** 2 + cos_lat * to_cos * math.sin((to_lon - lon) / 2) ** 2
+        row[i] = 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(h)))
+    return row
+
+
+class DistanceTable:
+    """Distances from each origin to every country, computed when the table is built"""
+
+    def __init__(self, origins):
+        # origins: {origin id: (latitude, longitude)}
+        self.origins = list(origins)
+        self.rows = {origin: distance_row(lat, lon) for origin, (lat, lon) in origins.items()}
+
+    def distance(self, origin, country):
+        """km from origin to a country name, code or alias; None for unknown countries"""
+        code = country_code(country)
+        return None if code is None else self.rows[origin][INDEX[code]]
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+WSGI entry point for gevent workers
+
+    pip install gevent
+    gunicorn -k gevent --worker-connections 100 --preload gevent_wsgi:application
+
+The standard library is patched before the app (and the locks, queues and
+thread-locals it creates at import) is loaded, so the patching is complete
+even when a preloading master imports this module before forking. See
+serving.py for what runs concurrently.
+"""
+
+from gevent import monkey
+
+monkey.patch_all()
+
+from wsgi import application
+
+__all__ = ['application']
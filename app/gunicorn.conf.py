@@ -0,0 +1,128 @@
+"""
+Gunicorn settings for Quality Clamps
+
+    gunicorn -c gunicorn.conf.py
+
+Every value can be overridden from the environment or .env (or on the command line):
+
+    GUNICORN_BIND           address to listen on (default 0.0.0.0:8000)
+    GUNICORN_WORKER_CLASS   gthread (default), sync or gevent
+    WEB_CONCURRENCY         worker processes (default: sized as below)
+    GUNICORN_MAX_WORKERS    most workers the default sizing starts (default 12)
+    GUNICORN_WORKER_MEMORY_MB  memory to allow each worker when sizing (default 150)
+    GUNICORN_THREADS        threads per gthread worker (default 4)
+    GUNICORN_MAX_REQUESTS   requests before a worker is replaced (default 1000, 0 = never)
+    GUNICORN_TIMEOUT        seconds a worker may go silent before it is killed (default 60)
+    STATSD_HOST             host:port to send gunicorn's request and worker metrics to
+
+The app is loaded in the master with CATALOG_PRELOAD on, so the catalog is
+parsed once and shared by the forked workers (see catalog_cache.py).
+
+Sizing: without WEB_CONCURRENCY the master starts 2 x CPUs + 1 workers, but
+no more than GUNICORN_MAX_WORKERS and no more than fit in the memory limit
+(the container's cgroup limit, else the machine's RAM) at
+GUNICORN_WORKER_MEMORY_MB each. Peak memory per worker is logged when it
+exits (max_rss_kb); set GUNICORN_WORKER_MEMORY_MB a little above it. A
+gthread worker serves GUNICORN_THREADS requests at once, so raise threads
+rather than workers when requests mostly wait on PayPal or SMTP, or use
+gevent for hundreds of such waits per worker.
+
+Scaling a running server: gunicorn has no autoscaler, but the master adds a
+worker on SIGTTIN and retires one on SIGTTOU, without dropping requests:
+
+    systemctl kill -s TTIN --kill-who=main qualclamps    # deploy_vps.sh installs
+    docker kill -s TTIN flask_app                         # docker-compose.yml; gunicorn is PID 1
+
+Watch the statsd gauges (gunicorn.workers, request rate and duration) or
+/metrics to decide when; a restart returns to the configured count.
+"""
+
+import logging
+import os
+import resource
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+
+
+def _memory_limit_mb():
+    """The container's memory limit, else the machine's RAM, in MB; None if unknown"""
+    try:
+        with open('/sys/fs/cgroup/memory.max') as f:
+            limit = f.read().strip()
+        if limit != 'max':
+            return int(limit) // 2**20
+    except (OSError, ValueError):
+        pass
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemTotal:'):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _default_workers():
+    count = min(2 * _cpus + 1, int(os.getenv('GUNICORN_MAX_WORKERS', 12)))
+    memory = _memory_limit_mb()
+    if memory is not None:
+        count = min(count, memory // int(os.getenv('GUNICORN_WORKER_MEMORY_MB', 150)))
+    return max(1, count)
+
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Checkout mostly waits on PayPal and SMTP; threads (or gevent greenlets, see
+# gevent_wsgi.py) keep one slow PayPal call from occupying a whole process
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv('WEB_CONCURRENCY') or _default_workers())
+threads = int(os.getenv('GUNICORN_THREADS', 4)) if worker_class == 'gthread' else 1
+worker_connections = 100
+wsgi_app = 'gevent_wsgi:application' if worker_class == 'gevent' else 'wsgi:application'
+
+# Parse the catalog in the master before forking
+preload_app = True
+os.environ.setdefault('CATALOG_PRELOAD', '1')
+
+# Replace workers now and then so slow leaks cannot grow without bound; the
+# jitter keeps them from all restarting at once
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = max_requests // 10
+
+# A PayPal create or execute call can take tens of seconds on a bad day
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+# Behind nginx, which keeps its own client connections open
+keepalive = 5
+
+proc_name = 'qualclamps'
+statsd_host = os.getenv('STATSD_HOST') or None
+statsd_prefix = 'qualclamps'
+
+_logger = logging.getLogger('qualclamps')
+
+
+def when_ready(server):
+    server.log.info('Serving with %d %s workers (%d threads each), max_requests %d',
+                    workers, worker_class, threads, max_requests)
+
+
+def post_fork(server, worker):
+    worker.booted_at = time.monotonic()
+
+
+def worker_exit(server, worker):
+    # Requests served and peak memory per worker, as one structured log line
+    _logger.info('Worker exiting', extra={
+        'worker_pid': worker.pid,
+        'requests': worker.nr,
+        'max_requests': worker.max_requests,
+        'uptime_s': round(time.monotonic() - worker.booted_at, 1),
+        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    })
@@ -0,0 +1,284 @@
+"""
+In-process test doubles for the pytest harness (see conftest.py)
+
+FakeSMTPServer accepts mail on a local port and keeps the parsed messages, so
+Flask-Mail's real smtplib code path runs without a mail account.
+MockPayPalServer implements the handful of PayPal REST v1 endpoints the app
+uses (OAuth token, create, find and execute payment) on a local port, so
+paypalrestsdk talks HTTP to it exactly as it would to the sandbox.
+
+Both bind to port 0, so parallel pytest-xdist workers never collide. Setting
+`latency` makes them answer as slowly as the real services (bench.py uses it).
+"""
+
+import email
+import email.policy
+import itertools
+import json
+import os
+import re
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TEST_CATEGORY = {
+    'name': 'V-Band Clamps',
+    'description': 'Test category',
+    'folder': 'v_band',
+    'image': 'v_band.jpg',
+    'count': 3,
+}
+
+TEST_PRODUCTS = [
+    {'name': '4 inch V-Band Clamp', 'description': 'Stainless clamp', 'oem': 'EXCO 400',
+     'weight': '0.3', 'price': 12.5, 'stock': 1000, 'image': 'clamp4.jpg', 'images': ['clamp4.jpg'],
+     'specifications': [{'category': 'Material', 'options': [
+         {'name': 'Stainless', 'price_modifier': 2.0, 'weight_modifier': 0.0},
+         {'name': 'Mild steel', 'price_modifier': 0.0, 'weight_modifier': 0.05}]}]},
+    {'name': '5 inch V-Band Clamp', 'description': 'Quick release clamp', 'oem': 'EXCO 500',
+     'weight': '0.4', 'price': 15.0, 'stock': 50, 'image': 'clamp5.jpg', 'images': ['clamp5.jpg'],
+     'specifications': []},
+    {'name': '6 inch V-Band Clamp', 'description': 'Heavy duty clamp', 'oem': '',
+     'weight': '0.5', 'price': 19.99, 'stock': 0, 'image': 'clamp6.jpg', 'images': ['clamp6.jpg'],
+     'specifications': []},
+]
+
+
+def write_test_catalog(root):
+    """Create data/ with one category and a few products under root"""
+    data_dir = os.path.join(root, 'data')
+    os.makedirs(os.path.join(data_dir, TEST_CATEGORY['folder']), exist_ok=True)
+    with open(os.path.join(data_dir, 'categories.json'), 'w') as f:
+        json.dump([TEST_CATEGORY], f, indent=2)
+    with open(os.path.join(data_dir, TEST_CATEGORY['folder'], 'products.json'), 'w') as f:
+        json.dump(TEST_PRODUCTS, f, indent=2)
+    os.makedirs(os.path.join(root, 'static', 'images'), exist_ok=True)
+    return data_dir
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.reply('220 localhost fake SMTP')
+        sender, recipients = None, []
+        for raw in self.rfile:
+            command = raw.decode('utf-8', 'replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb == 'EHLO':
+                self.wfile.write(b'250-localhost\r\n250 8BITMIME\r\n')
+            elif verb in ('HELO', 'NOOP'):
+                self.reply('250 OK')
+            elif verb == 'RSET':
+                sender, recipients = None, []
+                self.reply('250 OK')
+            elif verb == 'MAIL':
+                sender = re.search(r'<(.*?)>', command).group(1)
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                recipients.append(re.search(r'<(.*?)>', command).group(1))
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                for data_line in self.rfile:
+                    if data_line in (b'.\r\n', b'.\n'):
+                        break
+                    lines.append(data_line[1:] if data_line.startswith(b'..') else data_line)
+                message = email.message_from_bytes(b''.join(lines), policy=email.policy.default)
+                time.sleep(self.server.sink.latency)
+                self.server.sink.deliver(sender, recipients, message)
+                sender, recipients = None, []
+                self.reply('250 OK queued')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeSMTPServer:
+    """Local SMTP sink collecting (sender, recipients, message) deliveries"""
+
+    def __init__(self, host='127.0.0.1'):
+        self._server = _ThreadingTCPServer((host, 0), _SMTPHandler)
+        self._server.sink = self
+        self.host, self.port = self._server.server_address
+        self._lock = threading.Lock()
+        self.messages = []
+        self.latency = 0.0
+
+    def deliver(self, sender, recipients, message):
+        with self._lock:
+            self.messages.append({'sender': sender, 'recipients': recipients, 'message': message,
+                                  'subject': message['Subject']})
+
+    def clear(self):
+        with self._lock:
+            self.messages = []
+        self.latency = 0.0
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _PayPalHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        try:
+            return json.loads(body or b'{}')
+        except ValueError:
+            return {}
+
+    def do_POST(self):
+        paypal = self.server.paypal
+        time.sleep(paypal.latency)
+        if self.path.startswith('/v1/oauth2/token'):
+            self.read_json()
+            return self.send_json(200, {'access_token': 'A21-test-token', 'token_type': 'Bearer',
+                                        'expires_in': 32400})
+
+        body = self.read_json()
+        if paypal.fail_next:
+            paypal.fail_next = False
+            return self.send_json(400, {'name': 'VALIDATION_ERROR', 'message': 'Simulated failure'})
+
+        if self.path == '/v1/payments/payment':
+            return self.send_json(201, paypal.create(body))
+
+        match = re.fullmatch(r'/v1/payments/payment/([\w-]+)/execute', self.path)
+        if match and match.group(1) in paypal.payments:
+            return self.send_json(200, paypal.execute(match.group(1), body.get('payer_id')))
+        self.send_json(404, {'name': 'INVALID_RESOURCE_ID', 'message': 'Not found'})
+
+    def do_GET(self):
+        time.sleep(self.server.paypal.latency)
+        match = re.fullmatch(r'/v1/payments/payment/([\w-]+)', self.path)
+        payment = match and self.server.paypal.payments.get(match.group(1))
+        if not payment:
+            return self.send_json(404, {'name': 'INVALID_RESOURCE_ID', 'message': 'Not found'})
+        self.send_json(200, payment)
+
+
+class MockPayPalServer:
+    """Local stand-in for the PayPal REST v1 payments API"""
+
+    def __init__(self, host='127.0.0.1'):
+        self._server = ThreadingHTTPServer((host, 0), _PayPalHandler)
+        self._server.daemon_threads = True
+        self._server.paypal = self
+        host, port = self._server.server_address
+        self.url = f'http://{host}:{port}'
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.payments = {}
+        self.fail_next = False
+        self.latency = 0.0
+
+    def create(self, body):
+        with self._lock:
+            number = next(self._ids)
+        payment_id = f'PAYID-TEST{number:06d}'
+        payment = dict(body, id=payment_id, state='created', links=[
+            {'href': f'{self.url}/checkoutnow?token=EC-{number}', 'rel': 'approval_url', 'method': 'REDIRECT'},
+            {'href': f'{self.url}/v1/payments/payment/{payment_id}/execute', 'rel': 'execute', 'method': 'POST'},
+        ])
+        self.payments[payment_id] = payment
+        return payment
+
+    def execute(self, payment_id, payer_id):
+        payment = self.payments[payment_id]
+        payment.update(state='approved', payer={'payer_info': {'payer_id': payer_id}})
+        return payment
+
+    def reset(self):
+        self.payments = {}
+        self.fail_next = False
+        self.latency = 0.0
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+CHECKOUT_FORM = {
+    'name': 'Test Customer', 'email': 'buyer@example.com', 'phone': '+1 555 0100',
+    'company': 'Test Company', 'address': '123 Test Street', 'city': 'Springfield',
+    'state': 'IL', 'country': 'United States', 'postal_code': '62701',
+    'shipping_method': 'air', 'payment_method': 'cod', 'notes': 'Test order'
+}
+
+
+class Storefront:
+    """Handle returned by the `storefront` fixture"""
+
+    def __init__(self, app, root, smtp, paypal, admin_credentials):
+        self.app = app
+        self.root = str(root)
+        self.data_dir = os.path.join(self.root, 'data')
+        self.smtp = smtp
+        self.paypal = paypal
+        self.admin_credentials = admin_credentials
+
+    def client(self):
+        return self.app.test_client()
+
+    def service(self, name):
+        """One of the app's lazily created services, e.g. 'order_store'"""
+        import app as app_module
+        with self.app.app_context():
+            return getattr(app_module, name)._get_current_object()
+
+    @property
+    def order_store(self):
+        return self.service('order_store')
+
+    def admin_client(self):
+        """A client logged in through the real admin login form"""
+        client = self.app.test_client()
+        username, password = self.admin_credentials
+        response = client.post('/admin/login', data={'username': username, 'password': password})
+        assert response.status_code == 302, 'admin login failed'
+        return client
+
+    def add_to_cart(self, client, product_slug='4-inch-v-band-clamp', quantity=1, specifications=None):
+        response = client.post('/add-to-cart', json={
+            'category_folder': TEST_CATEGORY['folder'], 'product_slug': product_slug,
+            'quantity': quantity, 'specifications': specifications or {}})
+        assert response.get_json()['success'], response.get_json()
+        return response.get_json()['cart_key']
+
+    def place_order(self, client, **fields):
+        return client.post('/place-order', data=dict(CHECKOUT_FORM, **fields))
+
+    def products(self, folder=TEST_CATEGORY['folder']):
+        with open(os.path.join(self.data_dir, folder, 'products.json')) as f:
+            return json.load(f)
@@ -0,0 +1,341 @@
+"""
+Stock levels and checkout reservations
+
+Each product with a `stock` value in products.json is a SKU
+(`<category folder>/<product slug>`) with a row in stock_levels, kept in the
+orders database. products.json holds the level an admin last set; the row
+holds what is actually on hand after sales. When the products.json value
+changes (admin edit, catalog import), it replaces the on-hand count. Products
+without a `stock` value are not tracked and never run out.
+
+Orders take stock in one BEGIN IMMEDIATE transaction that checks and
+decrements every line, so simultaneous checkouts in any worker cannot sell
+more than is on hand. A checkout first reserves its lines: until the order
+is stored, or for up to RESERVATION_TTL seconds while the customer is at
+PayPal. Reserved units are not available to anyone else until the order is
+committed, the payment is cancelled or the reservation expires.
+
+Warehouses (see warehouses.py) hold part of that stock abroad. Their levels
+are kept per (origin, sku) in origin_stock the same way: the quantity in
+warehouses.json replaces the on-hand count when it changes, and the lines
+an order ships from a warehouse are reserved and committed in the same
+transaction as its stock lines.
+
+Stock checks (add to cart, cart updates, product pages) are answered from a
+per-process snapshot of available units. It is rebuilt only when another
+connection has committed a change, which SQLite reports through
+`PRAGMA data_version` without reading the database file, or when a
+reservation expires. Each rebuild also fingerprints the levels of every
+category folder, so catalog pages and their cached fragments are
+revalidated only when stock in their own category moves.
+"""
+
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+
+RESERVATION_TTL = 30 * 60  # seconds a PayPal checkout holds its stock
+
+INVENTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stock_levels (
+    sku TEXT PRIMARY KEY,
+    on_hand INTEGER NOT NULL,
+    catalog_stock INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stock_reservations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    reference TEXT NOT NULL,
+    sku TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_stock_reservations_reference ON stock_reservations (reference);
+CREATE INDEX IF NOT EXISTS idx_stock_reservations_sku ON stock_reservations (sku, expires_at);
+CREATE TABLE IF NOT EXISTS origin_stock (
+    origin TEXT NOT NULL,
+    sku TEXT NOT NULL,
+    on_hand INTEGER NOT NULL,
+    warehouse_stock INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (origin, sku)
+);
+CREATE TABLE IF NOT EXISTS origin_reservations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    reference TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    sku TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_origin_reservations_reference ON origin_reservations (reference);
+CREATE INDEX IF NOT EXISTS idx_origin_reservations_sku ON origin_reservations (origin, sku, expires_at);
+"""
+
+
+class OutOfStock(ValueError):
+    """Raised when an order or reservation asks for more than is available"""
+
+    def __init__(self, shortages):
+        self.shortages = shortages  # {sku: units available}
+        super().__init__(', '.join(f'{sku}: only {available} available' for sku, available in shortages.items()))
+
+
+class OriginOutOfStock(OutOfStock):
+    """Raised when a warehouse no longer has the lines an order was to ship from it
+
+    shortages is {(origin, sku): units available there}.
+    """
+
+
+def product_sku(folder, product_slug):
+    return f'{folder}/{product_slug}'
+
+
+def sku_folder(sku):
+    return sku.rpartition('/')[0]
+
+
+def catalog_stock(product):
+    """The product's stock value from products.json as an int, or None if it is not tracked"""
+    try:
+        return max(0, int(product['stock']))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def order_lines(items):
+    """Stock lines {sku: (quantity, catalog stock)} for cart items, summing items that differ only in specifications"""
+    lines = {}
+    for item in items:
+        if 'sku' not in item:
+            continue
+        quantity, _ = lines.get(item['sku'], (0, None))
+        lines[item['sku']] = (quantity + item['quantity'], catalog_stock(item['product']))
+    return lines
+
+
+def shortage_message(items, error):
+    """Tell the customer which cart items are short, for a flash message"""
+    if isinstance(error, OriginOutOfStock):
+        return ('Sorry, the warehouse your order was to ship from no longer has enough stock. '
+                'Please review the shipping for your cart.')
+    names = {item['sku']: item['product']['name'] for item in items if 'sku' in item}
+    short = ', '.join(f"{names.get(sku, sku)} ({available} left)" for sku, available in error.shortages.items())
+    return f'Sorry, some items are no longer in stock in the quantity you ordered: {short}. Please update your cart.'
+
+
+class Inventory:
+    """Thread- and fork-safe stock levels with an in-memory availability snapshot"""
+
+    def __init__(self, db_path, reservation_ttl=RESERVATION_TTL, clock=time.time):
+        self.db_path = db_path
+        self.reservation_ttl = reservation_ttl
+        self.clock = clock
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._watch = None
+        self._snapshot = None
+        self._origin_snapshot = None
+        self._snapshot_version = None
+        self._snapshot_expires = 0.0
+        self._revisions = {}
+
+    def _open(self):
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _connect(self):
+        """Get this thread's connection for writes"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        self._levels()  # creates the schema in this process
+        conn = self._open()
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _levels(self):
+        """{sku: (on_hand, catalog_stock, reserved)}, rebuilt only when something changed"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # One watch connection per process; its data_version moves whenever
+                # any other connection (other threads or workers) commits
+                self._watch = self._open()
+                self._watch.executescript(INVENTORY_SCHEMA)
+                self._pid = os.getpid()
+                self._snapshot = None
+
+            version = self._watch.execute('PRAGMA data_version').fetchone()[0]
+            now = self.clock()
+            if self._snapshot is not None and version == self._snapshot_version and now < self._snapshot_expires:
+                return self._snapshot
+
+            levels = {sku: (on_hand, stock, 0) for sku, on_hand, stock in
+                      self._watch.execute('SELECT sku, on_hand, catalog_stock FROM stock_levels')}
+            expires = math.inf
+            for sku, reserved, first_expiry in self._watch.execute(
+                    'SELECT sku, SUM(quantity), MIN(expires_at) FROM stock_reservations '
+                    'WHERE expires_at > ? GROUP BY sku', (now,)):
+                on_hand, stock, _ = levels.get(sku, (0, 0, 0))
+                levels[sku] = (on_hand, stock, reserved)
+                expires = min(expires, first_expiry)
+
+            by_folder = {}
+            for sku, level in sorted(levels.items()):
+                by_folder.setdefault(sku_folder(sku), []).append((sku, level))
+            # Digests rather than hash() so every worker gives the same ETags
+            self._revisions = {folder: hashlib.sha1(repr(folder_levels).encode()).hexdigest()[:16]
+                               for folder, folder_levels in by_folder.items()}
+            origin_levels = {(origin, sku): (on_hand, stock, 0) for origin, sku, on_hand, stock in
+                             self._watch.execute('SELECT origin, sku, on_hand, warehouse_stock FROM origin_stock')}
+            for origin, sku, reserved, first_expiry in self._watch.execute(
+                    'SELECT origin, sku, SUM(quantity), MIN(expires_at) FROM origin_reservations '
+                    'WHERE expires_at > ? GROUP BY origin, sku', (now,)):
+                on_hand, stock, _ = origin_levels.get((origin, sku), (0, 0, 0))
+                origin_levels[origin, sku] = (on_hand, stock, reserved)
+                expires = min(expires, first_expiry)
+
+            self._origin_snapshot = origin_levels
+            self._snapshot, self._snapshot_version, self._snapshot_expires = levels, version, expires
+            return levels
+
+    def available(self, sku, stock):
+        """Units of sku that can still be sold, or None if it is not tracked.
+
+        stock is the product's current catalog_stock(); a value the stock
+        table has not seen yet (new product, admin edit) counts as on hand.
+        """
+        if stock is None:
+            return None
+        on_hand, seen_stock, reserved = self._levels().get(sku, (stock, stock, 0))
+        if seen_stock != stock:
+            on_hand = stock
+        return max(0, on_hand - reserved)
+
+    def origin_available(self, origin, sku, stock):
+        """Units of sku a warehouse can still ship; stock is its quantity in warehouses.json"""
+        self._levels()
+        on_hand, seen_stock, reserved = self._origin_snapshot.get((origin, sku), (stock, stock, 0))
+        if seen_stock != stock:
+            on_hand = stock
+        return max(0, on_hand - reserved)
+
+    def revision(self, folder):
+        """Token that changes whenever availability in a category folder changes, for cache keys and ETags"""
+        self._levels()
+        return self._revisions.get(folder, '')
+
+    def _begin(self):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        return conn
+
+    def _check(self, conn, reference, lines, now, force=False):
+        """Sync catalog levels and return ({sku: available to reference} for tracked lines, shortages)"""
+        available = {}
+        for sku, (quantity, stock) in lines.items():
+            if stock is None:
+                continue
+            conn.execute(
+                'INSERT INTO stock_levels (sku, on_hand, catalog_stock, updated_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (sku) DO UPDATE SET on_hand = excluded.on_hand, catalog_stock = excluded.catalog_stock, '
+                'updated_at = excluded.updated_at WHERE catalog_stock != excluded.catalog_stock',
+                (sku, stock, stock, now))
+            on_hand = conn.execute('SELECT on_hand FROM stock_levels WHERE sku = ?', (sku,)).fetchone()[0]
+            reserved = conn.execute(
+                'SELECT COALESCE(SUM(quantity), 0) FROM stock_reservations '
+                'WHERE sku = ? AND expires_at > ? AND reference != ?', (sku, now, reference)).fetchone()[0]
+            available[sku] = max(0, on_hand - reserved)
+        shortages = {sku: units for sku, units in available.items() if lines[sku][0] > units}
+        if shortages and not force:
+            raise OutOfStock(shortages)
+        return available, shortages
+
+    def _check_origins(self, conn, reference, origins, now, force=False):
+        """Sync warehouse levels for origins {(origin, sku): (quantity, warehouse stock)}; returns shortages"""
+        shortages = {}
+        for (origin, sku), (quantity, stock) in origins.items():
+            conn.execute(
+                'INSERT INTO origin_stock (origin, sku, on_hand, warehouse_stock, updated_at) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (origin, sku) DO UPDATE SET on_hand = excluded.on_hand, '
+                'warehouse_stock = excluded.warehouse_stock, updated_at = excluded.updated_at '
+                'WHERE warehouse_stock != excluded.warehouse_stock',
+                (origin, sku, stock, stock, now))
+            on_hand = conn.execute('SELECT on_hand FROM origin_stock WHERE origin = ? AND sku = ?',
+                                   (origin, sku)).fetchone()[0]
+            reserved = conn.execute(
+                'SELECT COALESCE(SUM(quantity), 0) FROM origin_reservations '
+                'WHERE origin = ? AND sku = ? AND expires_at > ? AND reference != ?',
+                (origin, sku, now, reference)).fetchone()[0]
+            if quantity > on_hand - reserved:
+                shortages[origin, sku] = max(0, on_hand - reserved)
+        if shortages and not force:
+            raise OriginOutOfStock(shortages)
+        return shortages
+
+    def reserve(self, reference, lines, ttl=None, origins=None):
+        """Hold stock for reference (an order ID) until commit(), release() or expiry.
+
+        lines maps sku -> (quantity, catalog stock), and origins maps the
+        lines shipping from warehouses, (origin, sku) -> (quantity, warehouse
+        stock). Reserving again for the same reference replaces its
+        reservation and restarts the clock. Raises OutOfStock (or
+        OriginOutOfStock) without reserving anything if any line is short.
+        """
+        now = self.clock()
+        expires_at = now + (self.reservation_ttl if ttl is None else ttl)
+        origins = origins or {}
+        conn = self._begin()
+        with conn:
+            conn.execute('DELETE FROM stock_reservations WHERE reference = ? OR expires_at <= ?', (reference, now))
+            conn.execute('DELETE FROM origin_reservations WHERE reference = ? OR expires_at <= ?', (reference, now))
+            for sku in self._check(conn, reference, lines, now)[0]:
+                conn.execute('INSERT INTO stock_reservations (reference, sku, quantity, expires_at) VALUES (?, ?, ?, ?)',
+                             (reference, sku, lines[sku][0], expires_at))
+            self._check_origins(conn, reference, origins, now)
+            conn.executemany(
+                'INSERT INTO origin_reservations (reference, origin, sku, quantity, expires_at) VALUES (?, ?, ?, ?, ?)',
+                [(reference, origin, sku, quantity, expires_at) for (origin, sku), (quantity, _) in origins.items()])
+
+    def commit(self, reference, lines, origins=None, force=False):
+        """Take the stock for an order, using its reservation if it has one.
+
+        origins are the warehouse lines, as for reserve(). Raises OutOfStock
+        (or OriginOutOfStock) without changing anything if any line is short,
+        unless force is set for an order that stands anyway (stored or paid):
+        then short lines take what is left, down to zero, and the shortages
+        {sku or (origin, sku): units that were available} are returned.
+        """
+        now = self.clock()
+        origins = origins or {}
+        conn = self._begin()
+        with conn:
+            available, shortages = self._check(conn, reference, lines, now, force)
+            for sku in available:
+                conn.execute('UPDATE stock_levels SET on_hand = MAX(0, on_hand - ?), updated_at = ? WHERE sku = ?',
+                             (lines[sku][0], now, sku))
+            shortages.update(self._check_origins(conn, reference, origins, now, force))
+            conn.executemany(
+                'UPDATE origin_stock SET on_hand = MAX(0, on_hand - ?), updated_at = ? WHERE origin = ? AND sku = ?',
+                [(quantity, now, origin, sku) for (origin, sku), (quantity, _) in origins.items()])
+            conn.execute('DELETE FROM stock_reservations WHERE reference = ?', (reference,))
+            conn.execute('DELETE FROM origin_reservations WHERE reference = ?', (reference,))
+        return shortages
+
+    def release(self, reference):
+        """Drop reference's reservation (payment cancelled or failed)"""
+        conn = self._begin()
+        with conn:
+            conn.execute('DELETE FROM stock_reservations WHERE reference = ?', (reference,))
+            conn.execute('DELETE FROM origin_reservations WHERE reference = ?', (reference,))
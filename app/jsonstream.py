@@ -0,0 +1,61 @@
+"""
+Incremental reading of large JSON data files
+
+The data directory stores catalogs and orders as a single JSON array per file.
+These helpers decode such arrays item by item so memory stays flat as the
+files grow.
+"""
+
+import json
+
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+def iter_json_array(f, chunk_size=JSON_CHUNK_SIZE):
+    """Yield the items of a top-level JSON array without loading the whole file"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    eof = False
+
+    while True:
+        if not eof and len(buffer) < chunk_size:
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+
+        buffer = buffer.lstrip()
+        if not started:
+            if not buffer:
+                if eof:
+                    return
+                continue
+            if buffer[0] != '[':
+                raise ValueError('JSON import file must contain an array of products')
+            buffer = buffer[1:]
+            started = True
+            continue
+
+        if buffer.startswith(','):
+            buffer = buffer[1:]
+            continue
+        if buffer.startswith(']'):
+            return
+        if not buffer:
+            if eof:
+                raise ValueError('Unexpected end of JSON import file')
+            continue
+
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # Item is split across chunks, read more
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+
+        yield item
+        buffer = buffer[end:]
@@ -0,0 +1,248 @@
+"""
+Request timing and hot-path instrumentation, exported in Prometheus format
+
+Each process keeps latency histograms in memory: one series per route (method,
+endpoint, status) and one per named span (catalog loads, JSON parsing, cart
+pricing, shipping, template rendering, SMTP and PayPal calls). Observing a
+value is a dict lookup and a bisect under a lock.
+
+So that /metrics reports the whole server rather than whichever gunicorn
+worker answered, every process writes a snapshot of its series to
+<directory>/metrics-<pid>.json at most every flush_interval seconds (and at
+exit). collect() sums those files with the live series of the current
+process. Files left by workers that have exited are folded into
+metrics-archive.json so counts never go backwards when workers are recycled.
+"""
+
+import atexit
+import bisect
+import fcntl
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from processes import pid_alive
+
+logger = logging.getLogger('qualclamps')
+
+METRIC_PREFIX = 'qualclamps_'
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_HELP = {
+    'request_duration_seconds': 'Time spent handling requests, by route and status',
+    'span_duration_seconds': 'Time spent in instrumented sections of request handling',
+}
+
+
+def _series_key(name, labels):
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _merge(target, series):
+    """Add series ({key: [bucket counts..., sum, count]}) into target"""
+    for key, values in series.items():
+        current = target.get(key)
+        if current is None:
+            target[key] = list(values)
+        else:
+            for i, value in enumerate(values):
+                current[i] += value
+
+
+def _dump(series):
+    return [{'name': name, 'labels': dict(labels), 'values': values}
+            for (name, labels), values in series.items()]
+
+
+def _load(path):
+    try:
+        with open(path) as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {_series_key(entry['name'], entry['labels']): entry['values'] for entry in entries}
+
+
+def _write_atomic(path, series):
+    # A temporary file of its own for every write, so concurrent writers never share one
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f'{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(_dump(series), f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class MetricsCollector:
+    """Latency histograms shared across worker processes through a directory"""
+
+    def __init__(self, directory=None, buckets=DEFAULT_BUCKETS, flush_interval=5.0):
+        self.directory = None
+        self.buckets = tuple(buckets)
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._series = {}
+        self._pid = os.getpid()
+        self._last_flush = 0.0
+        self._dirty = False
+        self._flush_at_exit = False
+        if directory:
+            self.configure(directory)
+
+    def configure(self, directory):
+        """Share series with other workers through directory from now on"""
+        # Resolved now so later working-directory changes do not move the files
+        self.directory = os.path.abspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        if not self._flush_at_exit:
+            atexit.register(self.flush, force=True)
+            self._flush_at_exit = True
+
+    def _check_fork(self):
+        # A forked worker starts with its parent's series; they are already
+        # counted in the parent's file
+        if self._pid != os.getpid():
+            self._series = {}
+            self._pid = os.getpid()
+            self._last_flush = 0.0
+            self._dirty = False
+            self._flush_lock = threading.Lock()
+
+    def observe(self, name, seconds, **labels):
+        """Record one duration in the histogram for name and labels"""
+        key = _series_key(name, labels)
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._check_fork()
+            values = self._series.get(key)
+            if values is None:
+                values = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            values[index] += 1
+            values[-2] += seconds
+            values[-1] += 1
+            self._dirty = True
+        if self.directory and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    @contextmanager
+    def span(self, name, **labels):
+        """Time a block of code as a span"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('span_duration_seconds', time.perf_counter() - started, span=name, **labels)
+
+    def timed(self, name):
+        """Decorator timing every call of a function as a span"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _snapshot(self):
+        with self._lock:
+            self._check_fork()
+            return {key: list(values) for key, values in self._series.items()}
+
+    def _pid_file(self, pid):
+        return os.path.join(self.directory, f'metrics-{pid}.json')
+
+    def flush(self, force=False):
+        """Write this process's series to its snapshot file.
+
+        Called from request hooks, so it never raises: a failed write is
+        logged and retried at the next flush. Threads that find another one
+        flushing skip theirs, except a forced flush, which waits.
+        """
+        if not self.directory or not (self._dirty or force):
+            return
+        if not self._flush_lock.acquire(blocking=force):
+            return
+        try:
+            if not (self._dirty or force):
+                return  # another thread flushed while this one waited
+            self._last_flush = time.monotonic()
+            self._dirty = False
+            series = self._snapshot()
+            if series:
+                _write_atomic(self._pid_file(os.getpid()), series)
+        except OSError:
+            self._dirty = True
+            logger.warning('Could not write metrics snapshot', exc_info=True)
+        finally:
+            self._flush_lock.release()
+
+    def collect(self):
+        """Series summed over this process, other live workers and exited workers"""
+        totals = {}
+        if self.directory:
+            with open(os.path.join(self.directory, 'metrics.lock'), 'a') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    archive_path = os.path.join(self.directory, 'metrics-archive.json')
+                    archive = _load(archive_path)
+                    archived = False
+                    for path in glob.glob(os.path.join(self.directory, 'metrics-[0-9]*.json')):
+                        pid = int(os.path.basename(path)[len('metrics-'):-len('.json')])
+                        if pid == os.getpid():
+                            continue  # this process's live series are added below
+                        if pid_alive(pid):
+                            _merge(totals, _load(path))
+                        else:
+                            _merge(archive, _load(path))
+                            os.remove(path)
+                            archived = True
+                    if archived:
+                        _write_atomic(archive_path, archive)
+                    _merge(totals, archive)
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+        _merge(totals, self._snapshot())
+        return totals
+
+    def render(self):
+        """Render all series in the Prometheus text exposition format"""
+        series = self.collect()
+        lines = []
+        for name in sorted({name for name, _ in series}):
+            metric = METRIC_PREFIX + name
+            lines.append(f'# HELP {metric} {METRIC_HELP.get(name, name)}')
+            lines.append(f'# TYPE {metric} histogram')
+            for (series_name, labels), values in sorted(series.items()):
+                if series_name != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), values):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{metric}_bucket{_format_labels(labels, [("le", le)])} {cumulative}')
+                lines.append(f'{metric}_sum{_format_labels(labels)} {values[-2]:.6f}')
+                lines.append(f'{metric}_count{_format_labels(labels)} {values[-1]}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,140 @@
+"""
+Order and contact form e-mails to the sales team
+"""
+
+import time
+
+from app import logger, mail, metrics
+from currency import BASE_CURRENCY, format_amount
+
+# Email helper functions
+def send_order_notification(order_data):
+    """Send order notification email to sales team"""
+    from flask_mail import Message
+    try:
+        # Create order summary
+        order_items_html = ""
+        for item in order_data['order_items']:
+            order_items_html += f"""
+            <tr>
+                <td>{item['product']['name']}</td>
+                <td>{item['quantity']}</td>
+                <td>${item['final_unit_price']:.2f}</td>
+                <td>${item['final_total']:.2f}</td>
+            </tr>
+            """
+        
+        # Create email content
+        html_body = f"""
+        <html>
+        <body>
+            <h2>New Order Received - {order_data['order_id']}</h2>
+            
+            <h3>Customer Information:</h3>
+            <ul>
+                <li><strong>Name:</strong> {order_data['customer_info']['name']}</li>
+                <li><strong>Company:</strong> {order_data['customer_info'].get('company', 'N/A')}</li>
+                <li><strong>Email:</strong> {order_data['customer_info']['email']}</li>
+                <li><strong>Phone:</strong> {order_data['customer_info']['phone']}</li>
+                <li><strong>Address:</strong> {order_data['customer_info']['address']}</li>
+                <li><strong>City:</strong> {order_data['customer_info']['city']}</li>
+                <li><strong>State:</strong> {order_data['customer_info']['state']}</li>
+                <li><strong>Country:</strong> {order_data['customer_info']['country']}</li>
+                <li><strong>Postal Code:</strong> {order_data['customer_info']['postal_code']}</li>
+            </ul>
+            
+            <h3>Order Details:</h3>
+            <table border="1" cellpadding="5" cellspacing="0">
+                <tr>
+                    <th>Product</th>
+                    <th>Quantity</th>
+                    <th>Unit Price</th>
+                    <th>Total</th>
+                </tr>
+                {order_items_html}
+            </table>
+            
+            <h3>Order Summary:</h3>
+            <ul>
+                <li><strong>Subtotal:</strong> ${order_data['subtotal']:.2f}</li>
+                <li><strong>Shipping ({order_data['customer_info']['shipping_method']}):</strong> ${order_data['shipping_cost']:.2f}</li>
+                <li><strong>Total:</strong> ${order_data['total']:.2f}</li>
+                <li><strong>Total Weight:</strong> {order_data['total_weight']:.2f} kg</li>
+                <li><strong>Price List:</strong> {order_data.get('price_list') or 'Standard'}</li>
+                <li><strong>Ships From:</strong> {', '.join(s['name'] for s in order_data.get('shipments', [])) or 'Faridabad works'}</li>
+            </ul>
+            
+            <h3>Payment Information:</h3>
+            <ul>
+                <li><strong>Method:</strong> {order_data['payment_info']['method']}</li>
+                <li><strong>Status:</strong> {order_data['payment_info']['status']}</li>
+                <li><strong>Amount:</strong> {format_amount(order_data['payment_info']['amount'], order_data['payment_info'].get('currency', BASE_CURRENCY))}</li>
+            </ul>
+            
+            <h3>Additional Notes:</h3>
+            <p>{order_data['customer_info'].get('notes', 'No additional notes')}</p>
+            
+            <p><strong>Order Date:</strong> {order_data.get('created_date', 'N/A')}</p>
+        </body>
+        </html>
+        """
+        
+        # Send email
+        msg = Message(
+            subject=f'New Order: {order_data["order_id"]} - {order_data["customer_info"]["name"]}',
+            recipients=['sales@qualclamps.com'],
+            html=html_body,
+            sender='postman@qualclamps.com'
+        )
+        
+        with metrics.span('smtp_send'):
+            mail.send(msg)
+        logger.info('Order notification email sent', extra={'order_id': order_data['order_id']})
+        return True
+        
+    except Exception:
+        logger.exception('Order notification email failed', extra={'order_id': order_data.get('order_id')})
+        return False
+
+def send_contact_notification(contact_data):
+    """Send contact form notification email to sales team"""
+    from flask_mail import Message
+    try:
+        # Create email content
+        html_body = f"""
+        <html>
+        <body>
+            <h2>New Contact Form Submission</h2>
+            
+            <h3>Contact Information:</h3>
+            <ul>
+                <li><strong>Name:</strong> {contact_data.get('name', 'N/A')}</li>
+                <li><strong>Email:</strong> {contact_data.get('email', 'N/A')}</li>
+                <li><strong>Phone:</strong> {contact_data.get('phone', 'N/A')}</li>
+                <li><strong>Inquiry Type:</strong> {contact_data.get('inquiry', 'N/A')}</li>
+            </ul>
+            
+            <h3>Message:</h3>
+            <p>{contact_data.get('message', 'No message provided')}</p>
+            
+            <p><strong>Submitted on:</strong> {time.strftime('%Y-%m-%d %H:%M:%S')}</p>
+        </body>
+        </html>
+        """
+        
+        # Send email
+        msg = Message(
+            subject=f'Contact Form: {contact_data.get("inquiry", "General")} - {contact_data.get("name", "Unknown")}',
+            recipients=['sales@qualclamps.com'],
+            html=html_body,
+            sender='postman@qualclamps.com'
+        )
+        
+        with metrics.span('smtp_send'):
+            mail.send(msg)
+        logger.info('Contact notification email sent')
+        return True
+        
+    except Exception:
+        logger.exception('Contact notification email failed')
+        return False
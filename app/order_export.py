@@ -0,0 +1,116 @@
+"""
+Streaming order export for the sales team
+
+Orders are taken one at a time from an iterator (the order store's cursor) and
+written out as CSV or JSON Lines by generators, so memory use does not depend
+on how many orders have been placed.
+
+Customers type their names, addresses and notes, so CSV text cells that a
+spreadsheet would read as a formula (starting with =, +, -, @, tab or CR) are
+prefixed with an apostrophe.
+"""
+
+import csv
+import io
+import json
+import time
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+}
+
+CSV_COLUMNS = [
+    'order_id', 'created_date', 'status', 'payment_method', 'payment_status',
+    'name', 'company', 'email', 'phone', 'country', 'city', 'shipping_method',
+    'item_count', 'total_quantity', 'total_weight', 'subtotal', 'shipping_cost', 'total'
+]
+
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def parse_date(value, end_of_day=False):
+    """Parse YYYY-MM-DD into a local timestamp; None for empty values"""
+    if not value:
+        return None
+    try:
+        day = time.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f'Invalid date "{value}", expected YYYY-MM-DD')
+    timestamp = time.mktime(day)
+    return timestamp + 86400 if end_of_day else timestamp
+
+
+def get_order_items(order):
+    """Line items of an order (older orders stored them under 'items')"""
+    return order.get('order_items') or order.get('items') or []
+
+
+def get_payment_method(order):
+    payment_info = order.get('payment_info') or {}
+    return payment_info.get('method') or (order.get('customer_info') or {}).get('payment_method', '')
+
+
+def get_order_status(order):
+    return order.get('status') or (order.get('payment_info') or {}).get('status', '')
+
+
+def order_to_row(order):
+    """Flatten an order into the CSV columns"""
+    customer = order.get('customer_info') or {}
+    payment_info = order.get('payment_info') or {}
+    items = get_order_items(order)
+    return {
+        'order_id': order.get('order_id', ''),
+        'created_date': order.get('created_date', ''),
+        'status': get_order_status(order),
+        'payment_method': get_payment_method(order),
+        'payment_status': payment_info.get('status', ''),
+        'name': customer.get('name', ''),
+        'company': customer.get('company', ''),
+        'email': customer.get('email', ''),
+        'phone': customer.get('phone', ''),
+        'country': customer.get('country', ''),
+        'city': customer.get('city', ''),
+        'shipping_method': customer.get('shipping_method', ''),
+        'item_count': len(items),
+        'total_quantity': sum(item.get('quantity', 0) for item in items),
+        'total_weight': order.get('total_weight', 0),
+        'subtotal': order.get('subtotal', 0),
+        'shipping_cost': order.get('shipping_cost', 0),
+        'total': order.get('total', 0),
+    }
+
+
+def spreadsheet_safe(value):
+    """Keep a text cell from being run as a spreadsheet formula"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def iter_csv(orders):
+    """Yield CSV text chunks (header first, then one row per order)"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS)
+    writer.writeheader()
+    for order in orders:
+        writer.writerow({column: spreadsheet_safe(value) for column, value in order_to_row(order).items()})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_jsonl(orders):
+    """Yield one JSON document per line for each order"""
+    for order in orders:
+        yield json.dumps(order) + '\n'
+
+
+def export_orders(orders, fmt='csv'):
+    """Stream orders in the requested format"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'Unsupported export format "{fmt}"')
+    return iter_csv(orders) if fmt == 'csv' else iter_jsonl(orders)
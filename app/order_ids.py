@@ -0,0 +1,109 @@
+"""
+Collision-free, time-ordered order IDs
+
+IDs look like ORD-0000236454912000257 and pack three fields into one 63-bit
+number, printed as 19 zero-padded digits so they sort as plain strings:
+
+    milliseconds since 2025-01-01 (41 bits) | worker (8 bits) | sequence (14 bits)
+
+Every process claims a worker slot in the order store's order_id_workers
+table (OrderStore.claim_id_worker); slots held by processes that have exited
+are reused, so gunicorn workers (including ones forked after preload or
+recycled) never share a number. Each slot also leases time ahead of the
+clock: before issuing an ID past its lease, a generator records a new high
+water mark LEASE_MS later. A process that starts after a restart, even with
+a clock that went backwards, begins past every lease, so it never reissues
+an ID. Inside a process a lock plus a per-millisecond sequence keeps IDs
+unique and strictly increasing, even if the system clock steps backwards.
+"""
+
+import os
+import threading
+import time
+
+ORDER_ID_PREFIX = 'ORD-'
+EPOCH_MS = 1735689600000  # 2025-01-01T00:00:00Z
+WORKER_BITS = 8
+SEQUENCE_BITS = 14
+MAX_WORKERS = 1 << WORKER_BITS
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+ID_DIGITS = 19
+# How far past the last ID a slot's recorded high water mark runs; one write to the store per lease
+LEASE_MS = 10000
+
+
+class OrderIdGenerator:
+    """Issue unique, sortable order IDs across threads and processes"""
+
+    def __init__(self, store, prefix=ORDER_ID_PREFIX, clock=time.time):
+        self.store = store
+        self.prefix = prefix
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._pid = None
+        self.worker_id = None
+        self._last_ms = 0
+        self._sequence = 0
+        self._leased_ms = 0
+
+    def _now_ms(self):
+        return int(self.clock() * 1000) - EPOCH_MS
+
+    def _claim_worker(self):
+        """Take a worker slot not held by a live process from the order store"""
+        self.worker_id, claimed_ms = self.store.claim_id_worker(self._now_ms(), LEASE_MS, MAX_WORKERS)
+        # Start strictly after the claim time: a previous holder of this slot
+        # may have issued IDs up to the end of its lease
+        self._last_ms = claimed_ms
+        self._sequence = MAX_SEQUENCE
+        self._leased_ms = claimed_ms + LEASE_MS
+        self._pid = os.getpid()
+
+    def next_number(self):
+        """Return the next ID as an integer"""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._claim_worker()
+
+            now_ms = self._now_ms()
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._sequence = 0
+            else:
+                # Same millisecond, or the clock went backwards: keep counting
+                self._sequence += 1
+                if self._sequence > MAX_SEQUENCE:
+                    self._last_ms += 1
+                    self._sequence = 0
+
+            if self._last_ms >= self._leased_ms:
+                self._leased_ms = self._last_ms + LEASE_MS
+                self.store.extend_id_lease(self.worker_id, self._leased_ms)
+
+            return (self._last_ms << (WORKER_BITS + SEQUENCE_BITS)) | \
+                   (self.worker_id << SEQUENCE_BITS) | self._sequence
+
+    def next_id(self):
+        """Return the next order ID string"""
+        return f"{self.prefix}{self.next_number():0{ID_DIGITS}d}"
+
+
+def parse_order_id(order_id, prefix=ORDER_ID_PREFIX):
+    """Decode an order ID into its timestamp, worker and sequence.
+
+    Returns None for IDs not issued by OrderIdGenerator (such as the older
+    ORD-<unix seconds> format).
+    """
+    if not order_id or not order_id.startswith(prefix):
+        return None
+    digits = order_id[len(prefix):]
+    if len(digits) != ID_DIGITS or not digits.isdigit():
+        return None
+
+    number = int(digits)
+    timestamp_ms = (number >> (WORKER_BITS + SEQUENCE_BITS)) + EPOCH_MS
+    return {
+        'created_at': timestamp_ms / 1000.0,
+        'worker_id': (number >> SEQUENCE_BITS) & (MAX_WORKERS - 1),
+        'sequence': number & MAX_SEQUENCE
+    }
@@ -0,0 +1,310 @@
+"""
+Indexed order store backed by SQLite
+
+Orders used to be appended to data/orders.json by rewriting the whole file, and
+finding one meant scanning it. Here each order is a row keyed by its order ID
+with B-tree indexes on email, created date and status, so lookups cost
+O(log n) regardless of order history. Status changes update one row and append
+to a history table instead of rewriting anything.
+
+The full order document is kept as JSON in the `data` column; the indexed
+columns are copies used for lookups and filtering. On first use an existing
+orders.json is imported once.
+
+Sales rollups for the admin dashboard (see sales_rollups.py) are kept in the
+same database and updated in the same transaction as each order, and so is
+the order ID worker table: which process holds each worker slot, and how far
+ahead of the clock IDs from that slot may have gone (see order_ids.py).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from jsonstream import iter_json_array
+from order_export import parse_date, get_payment_method
+from processes import pid_alive
+import sales_rollups
+
+# Allowed status changes; anything may be cancelled until it ships
+ORDER_STATUS_TRANSITIONS = {
+    'pending': {'paid', 'cancelled'},
+    'paid': {'shipped', 'cancelled'},
+    'shipped': {'delivered'},
+    'delivered': set(),
+    'cancelled': set(),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    email TEXT NOT NULL DEFAULT '',
+    created_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    country TEXT NOT NULL DEFAULT '',
+    payment_method TEXT NOT NULL DEFAULT '',
+    total REAL NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_orders_email ON orders (email, created_at);
+CREATE INDEX IF NOT EXISTS idx_orders_created ON orders (created_at);
+CREATE INDEX IF NOT EXISTS idx_orders_status ON orders (status, created_at);
+CREATE TABLE IF NOT EXISTS order_status_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id TEXT NOT NULL REFERENCES orders (order_id),
+    status TEXT NOT NULL,
+    changed_at REAL NOT NULL,
+    note TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_status_history_order ON order_status_history (order_id, id);
+CREATE TABLE IF NOT EXISTS order_id_workers (
+    worker_id INTEGER PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    high_water_ms INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class InvalidStatusTransition(ValueError):
+    """Raised when an order cannot move to the requested status"""
+
+
+def normalize_status(status):
+    return (status or 'pending').strip().lower()
+
+
+class OrderStore:
+    """Thread- and fork-safe access to the orders database"""
+
+    def __init__(self, db_path, legacy_json=None):
+        self.db_path = db_path
+        self.legacy_json = legacy_json
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized_pid = None
+
+    def _connect(self):
+        """Get this thread's connection, creating the schema on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+
+        with self._init_lock:
+            if self._initialized_pid != os.getpid():
+                conn.executescript(SCHEMA + sales_rollups.ROLLUP_SCHEMA)
+                self._import_legacy(conn)
+                self._backfill_rollups(conn)
+                self._initialized_pid = os.getpid()
+        return conn
+
+    def _import_legacy(self, conn):
+        """Copy orders.json into an empty store (runs once)"""
+        if not self.legacy_json or not os.path.exists(self.legacy_json):
+            return
+        if conn.execute('SELECT 1 FROM orders LIMIT 1').fetchone():
+            return
+        with open(self.legacy_json) as f, conn:
+            # BEGIN IMMEDIATE so two workers starting together import only once
+            conn.execute('BEGIN IMMEDIATE')
+            if conn.execute('SELECT 1 FROM orders LIMIT 1').fetchone():
+                return
+            for order in iter_json_array(f):
+                if order.get('order_id'):
+                    self._insert(conn, order, ignore_duplicates=True)
+
+    def _backfill_rollups(self, conn):
+        """Build rollups for a store created before they existed"""
+        if conn.execute('SELECT 1 FROM sales_rollup LIMIT 1').fetchone():
+            return
+        if conn.execute('SELECT 1 FROM orders LIMIT 1').fetchone():
+            sales_rollups.rebuild(conn, (self._row_to_order(row) for row in conn.execute('SELECT * FROM orders')))
+
+    def _insert(self, conn, order, ignore_duplicates=False):
+        now = time.time()
+        status = normalize_status(order.get('status'))
+        order = dict(order, status=status)
+        created_at = order.get('created_at') or now
+        customer = order.get('customer_info') or {}
+        verb = 'INSERT OR IGNORE' if ignore_duplicates else 'INSERT'
+        cursor = conn.execute(
+            f'{verb} INTO orders (order_id, email, created_at, status, country, payment_method, total, updated_at, data) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (order['order_id'], (customer.get('email') or '').strip().lower(), created_at, status,
+             (customer.get('country') or '').strip(), get_payment_method(order).lower(),
+             float(order.get('total') or 0), now, json.dumps(order))
+        )
+        if cursor.rowcount == 0:
+            return
+        conn.execute(
+            'INSERT INTO order_status_history (order_id, status, changed_at, note) VALUES (?, ?, ?, ?)',
+            (order['order_id'], status, created_at, 'Order placed')
+        )
+        if status not in sales_rollups.EXCLUDED_STATUSES:
+            sales_rollups.apply_order(conn, dict(order, created_at=created_at))
+
+    @staticmethod
+    def _row_to_order(row):
+        order = json.loads(row['data'])
+        order['status'] = row['status']
+        order['updated_at'] = row['updated_at']
+        return order
+
+    def add_order(self, order):
+        """Store a new order; order['order_id'] must be unique"""
+        conn = self._connect()
+        with conn:
+            self._insert(conn, order)
+
+    def get_order(self, order_id, with_history=False):
+        """Look up one order by ID (primary key), or None"""
+        conn = self._connect()
+        row = conn.execute('SELECT * FROM orders WHERE order_id = ?', (order_id,)).fetchone()
+        if row is None:
+            return None
+        order = self._row_to_order(row)
+        if with_history:
+            order['status_history'] = self.status_history(order_id)
+        return order
+
+    def status_history(self, order_id):
+        conn = self._connect()
+        rows = conn.execute(
+            'SELECT status, changed_at, note FROM order_status_history WHERE order_id = ? ORDER BY id',
+            (order_id,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def update_status(self, order_id, status, note=''):
+        """Move an order to a new status, recording the change in its history"""
+        status = normalize_status(status)
+        if status not in ORDER_STATUS_TRANSITIONS:
+            raise InvalidStatusTransition(f'Unknown order status "{status}"')
+
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT status, data FROM orders WHERE order_id = ?', (order_id,)).fetchone()
+            if row is None:
+                raise KeyError(order_id)
+            current = row['status']
+            if status not in ORDER_STATUS_TRANSITIONS.get(current, set()):
+                raise InvalidStatusTransition(f'Cannot change order {order_id} from {current} to {status}')
+            now = time.time()
+            conn.execute('UPDATE orders SET status = ?, updated_at = ? WHERE order_id = ?',
+                         (status, now, order_id))
+            conn.execute(
+                'INSERT INTO order_status_history (order_id, status, changed_at, note) VALUES (?, ?, ?, ?)',
+                (order_id, status, now, note)
+            )
+            if status in sales_rollups.EXCLUDED_STATUSES:
+                sales_rollups.apply_order(conn, json.loads(row['data']), sign=-1)
+        return self.get_order(order_id, with_history=True)
+
+    def _where(self, email=None, status=None, country=None, payment_method=None, date_from=None, date_to=None):
+        clauses, params = [], []
+        if email:
+            clauses.append('email = ?')
+            params.append(email.strip().lower())
+        if status:
+            clauses.append('status = ?')
+            params.append(normalize_status(status))
+        if country:
+            clauses.append('country = ? COLLATE NOCASE')
+            params.append(country.strip())
+        if payment_method:
+            clauses.append('payment_method = ?')
+            params.append(payment_method.strip().lower())
+        start = parse_date(date_from)
+        if start is not None:
+            clauses.append('created_at >= ?')
+            params.append(start)
+        end = parse_date(date_to, end_of_day=True)
+        if end is not None:
+            clauses.append('created_at < ?')
+            params.append(end)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def find_orders(self, limit=50, offset=0, **filters):
+        """Get one page of matching orders (newest first) and the total match count"""
+        where, params = self._where(**filters)
+        conn = self._connect()
+        total = conn.execute(f'SELECT COUNT(*) FROM orders{where}', params).fetchone()[0]
+        rows = conn.execute(
+            f'SELECT * FROM orders{where} ORDER BY created_at DESC, order_id DESC LIMIT ? OFFSET ?',
+            params + [limit, offset]
+        ).fetchall()
+        return [self._row_to_order(row) for row in rows], total
+
+    def iter_orders(self, **filters):
+        """Yield matching orders oldest first without loading them all.
+
+        Filters are validated immediately, so bad dates raise ValueError here
+        rather than part-way through a streamed response.
+        """
+        where, params = self._where(**filters)
+        self._connect()  # make sure the schema and legacy import exist
+        return self._iter_rows(f'SELECT * FROM orders{where} ORDER BY created_at, order_id', params)
+
+    def _iter_rows(self, sql, params):
+        # A dedicated connection keeps the cursor independent of request work
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            for row in conn.execute(sql, params):
+                yield self._row_to_order(row)
+        finally:
+            conn.close()
+
+    def sales_dashboard(self, days=30, top=10):
+        """Pre-aggregated sales figures for the admin dashboard"""
+        return sales_rollups.read_dashboard(self._connect(), days=days, top=top)
+
+    def rebuild_rollups(self):
+        """Recompute all sales rollups from the stored orders; returns row count"""
+        conn = self._connect()
+        return sales_rollups.rebuild(conn, self._iter_rows('SELECT * FROM orders ORDER BY created_at', []))
+
+    def claim_id_worker(self, now_ms, lease_ms, max_workers):
+        """Take an order ID worker slot not held by a running process.
+
+        Returns (worker_id, start_ms): the slot's IDs must start after
+        start_ms, which is past every ID any slot may have issued, even if the
+        clock has since gone backwards. The slot is leased up to
+        start_ms + lease_ms; see extend_id_lease().
+        """
+        conn = self._connect()
+        with conn:
+            # BEGIN IMMEDIATE so two workers starting together take different slots
+            conn.execute('BEGIN IMMEDIATE')
+            holders = dict(conn.execute('SELECT worker_id, pid FROM order_id_workers').fetchall())
+            worker_id = next((slot for slot in range(max_workers) if not pid_alive(holders.get(slot))), None)
+            if worker_id is None:
+                raise RuntimeError(f'All {max_workers} order ID worker slots are in use')
+            high_water_ms = conn.execute('SELECT MAX(high_water_ms) FROM order_id_workers').fetchone()[0] or 0
+            start_ms = max(high_water_ms, now_ms)
+            conn.execute('INSERT OR REPLACE INTO order_id_workers (worker_id, pid, high_water_ms) VALUES (?, ?, ?)',
+                         (worker_id, os.getpid(), start_ms + lease_ms))
+        return worker_id, start_ms
+
+    def extend_id_lease(self, worker_id, high_water_ms):
+        """Record that a worker slot may issue IDs up to high_water_ms"""
+        conn = self._connect()
+        with conn:
+            conn.execute('UPDATE order_id_workers SET high_water_ms = MAX(high_water_ms, ?) '
+                         'WHERE worker_id = ? AND pid = ?', (high_water_ms, worker_id, os.getpid()))
+
+    def count(self):
+        return self._connect().execute('SELECT COUNT(*) FROM orders').fetchone()[0]
@@ -0,0 +1,207 @@
+"""
+Packing shipments into cartons, for the weight carriers charge
+
+Carriers weigh and measure every carton on its own. Each is charged on the
+greater of its gross weight and its volumetric weight (shipping.chargeable_weight),
+rounded up to the next CARTON_ROUNDING_KG. So 5,000 clamps cost what the
+cartons they fill cost, not what the clamps weigh together.
+
+pack() is first-fit-decreasing: pieces go in largest first (by packed volume,
+then weight), each into the first open carton with room for it by volume
+and weight, in the largest carton size. Identical pieces are placed a
+carton-load at a time, so a line of 5,000 clamps is a handful of steps, not
+5,000. Afterwards each carton moves to the smallest size its contents fit.
+Pieces that fit no carton ship in their own packaging.
+
+A product's packed size is its optional dimensions_cm [length, width, height];
+pieces without one only count against a carton's weight limit. A carton is
+charged on its volumetric weight only if every piece in it has a packed size;
+otherwise its size is a guess, and it is charged on gross weight (contents
+plus tare). Packings are
+cached by shipment signature (the distinct pieces and their quantities), so
+re-quoting an unchanged cart, or the same shipment in several shipping
+plans, does not pack it again.
+"""
+
+import math
+from functools import lru_cache
+
+from shipping import calculate_shipping_cost, chargeable_weight
+
+# Carton sizes we stock, smallest first: dimensions, most a carton may weigh packed, and its empty weight
+CARTONS = (
+    {'name': 'small', 'dimensions_cm': (30, 20, 15), 'max_weight_kg': 10.0, 'tare_kg': 0.25},
+    {'name': 'medium', 'dimensions_cm': (40, 30, 30), 'max_weight_kg': 20.0, 'tare_kg': 0.5},
+    {'name': 'large', 'dimensions_cm': (60, 40, 40), 'max_weight_kg': 30.0, 'tare_kg': 0.9},
+)
+# Share of a carton's volume that pieces can actually fill
+FILL_RATIO = 0.85
+# Carriers round each carton's chargeable weight up to this
+CARTON_ROUNDING_KG = 0.5
+OWN_PACKAGING = 'own packaging'
+
+EPSILON = 1e-9
+
+
+def _size(carton):
+    fit = tuple(sorted((float(d) for d in carton['dimensions_cm']), reverse=True))
+    volume = fit[0] * fit[1] * fit[2]
+    return dict(carton, fit=fit, volume_cm3=volume, capacity_cm3=volume * FILL_RATIO)
+
+
+SIZES = tuple(_size(carton) for carton in CARTONS)
+
+
+def packed_dimensions(product):
+    """A product's packed dimensions in cm, largest first, or None if it has none"""
+    try:
+        dimensions = tuple(sorted((float(d) for d in product.get('dimensions_cm') or ()), reverse=True))
+    except (TypeError, ValueError):
+        return None
+    if len(dimensions) != 3 or dimensions[2] <= 0:
+        return None
+    return dimensions
+
+
+def product_line(product, quantity=1):
+    """A shipment line for quantity of a catalog product, as the cart packs it (weight defaults to 1 kg)"""
+    try:
+        unit_weight = float(product.get('weight', 1.0))
+    except (TypeError, ValueError):
+        unit_weight = 1.0
+    return {'weight': unit_weight * quantity, 'quantity': quantity, 'unit_weight': unit_weight,
+            'dimensions': packed_dimensions(product)}
+
+
+def _volume(dimensions):
+    return dimensions[0] * dimensions[1] * dimensions[2] if dimensions else 0.0
+
+
+def _fits(size, weight, volume, fit):
+    return (weight <= size['max_weight_kg'] + EPSILON and volume <= size['capacity_cm3'] + EPSILON
+            and all(d <= s for d, s in zip(fit, size['fit'])))
+
+
+def _room(weight_left, volume_left, weight, volume):
+    """How many pieces of a weight and volume fit in what is left of a carton"""
+    room = math.inf
+    if weight > 0:
+        room = math.floor(weight_left / weight + EPSILON)
+    if volume > 0:
+        room = min(room, math.floor(volume_left / volume + EPSILON))
+    return room
+
+
+def shipment_signature(lines):
+    """The pieces in shipment lines, as pack() takes them: ((unit weight, dimensions, quantity), ...)
+
+    lines are dicts with 'weight' (kg for the line), 'quantity' and
+    optionally 'unit_weight' and 'dimensions' (as packed_dimensions() gives).
+    Identical pieces on different lines are counted together, and the order
+    of the lines does not matter.
+    """
+    pieces = {}
+    for line in lines:
+        quantity = int(line['quantity'])
+        if quantity <= 0:
+            continue
+        unit_weight = line.get('unit_weight', line['weight'] / quantity)
+        key = (round(unit_weight, 6), line.get('dimensions') or None)
+        pieces[key] = pieces.get(key, 0) + quantity
+    return tuple(sorted(((weight, dimensions, quantity) for (weight, dimensions), quantity in pieces.items()),
+                        key=lambda piece: (piece[0], piece[1] or (), piece[2])))
+
+
+@lru_cache(maxsize=4096)
+def pack(pieces):
+    """Pack a shipment_signature() into cartons.
+
+    Returns a tuple of (carton name, gross weight kg, volume cm³), one per
+    carton or piece in its own packaging. The volume is 0 for cartons
+    holding any piece without dimensions, which are charged on weight.
+    """
+    largest = SIZES[-1]
+    pieces = sorted(pieces, key=lambda piece: (_volume(piece[1]), piece[0]), reverse=True)
+    # Smallest weight and volume among the pieces still to pack, to close cartons nothing more fits in
+    least = [(math.inf, math.inf)] * (len(pieces) + 1)
+    for n in range(len(pieces) - 1, -1, -1):
+        weight, dimensions, _ = pieces[n]
+        least[n] = (min(least[n + 1][0], weight), min(least[n + 1][1], _volume(dimensions)))
+
+    packages = []
+    # Cartons in the largest size while packing, as stacks of identical ones:
+    # [count, weight, volume, fit, whether every piece has dimensions]
+    closed = []
+    open_stacks = []
+    for n, (weight, dimensions, quantity) in enumerate(pieces):
+        volume = _volume(dimensions)
+        fit = dimensions or (0.0, 0.0, 0.0)
+        if not _fits(largest, weight, volume, fit):
+            packages.extend([(OWN_PACKAGING, weight, volume)] * quantity)
+            continue
+
+        stacks = []
+        for stack in open_stacks:
+            count, stack_weight, stack_volume, stack_fit, stack_measured = stack
+            room = _room(largest['max_weight_kg'] - stack_weight, largest['capacity_cm3'] - stack_volume,
+                         weight, volume) if quantity else 0
+            if not room:
+                stacks.append(stack)
+                continue
+            # Fill the stack's cartons in turn: some full, perhaps one part-filled, the rest untouched
+            full, rest = divmod(min(quantity, room * count), room)
+            quantity -= full * room + rest
+            packed_fit = tuple(map(max, stack_fit, fit))
+            measured = stack_measured and dimensions is not None
+            if full:
+                stacks.append([full, stack_weight + weight * room, stack_volume + volume * room, packed_fit, measured])
+            if rest:
+                stacks.append([1, stack_weight + weight * rest, stack_volume + volume * rest, packed_fit, measured])
+            if count > full + bool(rest):
+                stacks.append([count - full - bool(rest), stack_weight, stack_volume, stack_fit, stack_measured])
+
+        if quantity:
+            per_carton = min(quantity, _room(largest['max_weight_kg'], largest['capacity_cm3'], weight, volume))
+            full, rest = divmod(quantity, per_carton)
+            measured = dimensions is not None
+            stacks.append([full, weight * per_carton, volume * per_carton, fit, measured])
+            if rest:
+                stacks.append([1, weight * rest, volume * rest, fit, measured])
+
+        min_weight, min_volume = least[n + 1]
+        open_stacks = []
+        for stack in stacks:
+            if (largest['max_weight_kg'] - stack[1] >= min_weight - EPSILON
+                    and largest['capacity_cm3'] - stack[2] >= min_volume - EPSILON):
+                open_stacks.append(stack)
+            else:
+                closed.append(stack)
+
+    for count, weight, volume, fit, measured in closed + open_stacks:
+        size = next(size for size in SIZES if _fits(size, weight, volume, fit))
+        packages.extend([(size['name'], round(weight + size['tare_kg'], 6),
+                          size['volume_cm3'] if measured else 0.0)] * count)
+    return tuple(packages)
+
+
+def packed_chargeable_weight(packages):
+    """What carriers charge for packages from pack(), in kg"""
+    return sum(math.ceil(chargeable_weight(weight, volume) / CARTON_ROUNDING_KG - EPSILON) * CARTON_ROUNDING_KG
+               for _, weight, volume in packages)
+
+
+def pack_shipment(lines):
+    """(cartons, chargeable weight kg) for shipment lines; see shipment_signature()"""
+    packages = pack(shipment_signature(lines))
+    return len(packages), packed_chargeable_weight(packages)
+
+
+def shipping_quote(country, lines, method='air'):
+    """(cartons, chargeable weight kg, cost) to ship lines from the works, packed as cart shipments are.
+
+    The cost is None if we do not ship to country. Listings, product pages and
+    /shipping-info quote with this, so their figures match the cart's.
+    """
+    cartons, chargeable = pack_shipment(lines)
+    quantity = sum(int(line['quantity']) for line in lines)
+    return cartons, chargeable, calculate_shipping_cost(country, chargeable, quantity, method)
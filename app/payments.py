@@ -0,0 +1,163 @@
+"""
+PayPal payments blueprint
+
+Creates and executes PayPal payments and handles the return from PayPal.
+paypalrestsdk is imported by the first payment, not when the module loads.
+"""
+
+import time
+
+from flask import Blueprint, flash, redirect, render_template, request, session, url_for
+
+from app import inventory, logger, metrics, order_store, paypal_api
+from currency import BASE_CURRENCY
+from inventory import OutOfStock, order_lines, shortage_message
+from notifications import send_order_notification
+from serving import run_in_background
+from warehouses import shipping_network
+
+bp = Blueprint('payments', __name__)
+
+def create_paypal_payment(order_total, order_id, return_url, cancel_url, currency=BASE_CURRENCY):
+    """Create a PayPal payment for order_total, an amount in currency"""
+    import paypalrestsdk
+    try:
+        payment = paypalrestsdk.Payment({
+            "intent": "sale",
+            "payer": {
+                "payment_method": "paypal"
+            },
+            "redirect_urls": {
+                "return_url": return_url,
+                "cancel_url": cancel_url
+            },
+            "transactions": [{
+                "item_list": {
+                    "items": [{
+                        "name": f"Quality Clamps Order #{order_id}",
+                        "sku": order_id,
+                        "price": f"{order_total:.2f}",
+                        "currency": currency,
+                        "quantity": 1
+                    }]
+                },
+                "amount": {
+                    "total": f"{order_total:.2f}",
+                    "currency": currency
+                },
+                "description": f"Payment for Quality Clamps Order #{order_id}"
+            }]
+        }, api=paypal_api._get_current_object())
+        
+        with metrics.span('paypal', call='create'):
+            created = payment.create()
+        if created:
+            return payment
+        else:
+            logger.error('PayPal payment creation failed', extra={'order_id': order_id, 'paypal_error': payment.error})
+            return None
+    except Exception:
+        logger.exception('PayPal payment creation raised', extra={'order_id': order_id})
+        return None
+
+def execute_paypal_payment(payment_id, payer_id):
+    """Execute a PayPal payment after user approval"""
+    import paypalrestsdk
+    try:
+        with metrics.span('paypal', call='execute'):
+            payment = paypalrestsdk.Payment.find(payment_id, api=paypal_api._get_current_object())
+            executed = payment.execute({"payer_id": payer_id})
+        if executed:
+            return payment
+        else:
+            logger.error('PayPal payment execution failed', extra={'payment_id': payment_id, 'paypal_error': payment.error})
+            return None
+    except Exception:
+        logger.exception('PayPal payment execution raised', extra={'payment_id': payment_id})
+        return None
+
+@bp.route('/paypal/success')
+def paypal_success():
+    payment_id = request.args.get('paymentId')
+    payer_id = request.args.get('PayerID')
+    
+    if not payment_id or not payer_id:
+        flash('Payment verification failed. Please try again.')
+        return redirect(url_for('cart.checkout'))
+    
+    # Get pending order from session
+    pending_order = session.get('pending_order')
+    if not pending_order or pending_order['payment_id'] != payment_id:
+        flash('Order information not found. Please try again.')
+        return redirect(url_for('cart.checkout'))
+    
+    # Hold the stock again (the reservation may have run out while the customer
+    # was at PayPal) so nothing sells it while the payment executes
+    order_id = pending_order['order_id']
+    lines = order_lines(pending_order['cart_items'])
+    origin_lines = shipping_network().origin_lines(pending_order.get('shipments', []))
+    try:
+        inventory.reserve(order_id, lines, origins=origin_lines)
+    except OutOfStock as e:
+        session.pop('pending_order', None)
+        flash(shortage_message(pending_order['cart_items'], e))
+        return redirect(url_for('cart.cart'))
+    
+    # Execute PayPal payment
+    if execute_paypal_payment(payment_id, payer_id):
+        shortages = inventory.commit(order_id, lines, origins=origin_lines, force=True)
+        if shortages:
+            # Only an admin lowering the stock can get here; the customer has paid, so the order takes what is left
+            logger.warning('Stock short for paid order', extra={
+                'order_id': order_id, 'shortages': {str(key): units for key, units in shortages.items()}})
+        
+        # Payment successful, create the order
+        order_data = {
+            'order_id': pending_order['order_id'],
+            'customer_info': pending_order['customer_info'],
+            'order_items': pending_order['cart_items'],
+            'subtotal': pending_order['cart_total'],  # This is products total
+            'shipping_cost': pending_order['shipping_cost'],
+            'total': round(pending_order['cart_total'] + pending_order['shipping_cost'], 2),
+            'total_weight': pending_order['total_weight'],
+            'chargeable_weight': pending_order.get('chargeable_weight'),
+            'currency': pending_order.get('currency', BASE_CURRENCY),
+            'exchange_rate': pending_order.get('exchange_rate', 1.0),
+            'price_list': pending_order.get('price_list'),
+            'shipments': pending_order.get('shipments', []),
+            'payment_info': {
+                'method': 'PayPal',
+                'status': 'Paid',
+                'transaction_id': payment_id,
+                'amount': pending_order.get('charge_amount', pending_order['cart_total'] + pending_order['shipping_cost']),
+                'currency': pending_order.get('charge_currency', BASE_CURRENCY)
+            },
+            'status': 'paid',
+            'created_at': time.time(),
+            'created_date': time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+        
+        # Save order
+        order_store.add_order(order_data)
+        
+        # Send email notification to sales team (while the confirmation renders, in gevent workers)
+        run_in_background(send_order_notification, order_data)
+        
+        # Clear session data
+        session.pop('cart', None)
+        session.pop('pending_order', None)
+        
+        return render_template('order_confirmation.html', order=order_data)
+    else:
+        inventory.release(order_id)
+        flash('Payment processing failed. Please try again.')
+        return redirect(url_for('cart.checkout'))
+
+@bp.route('/paypal/cancel')
+def paypal_cancel():
+    # Clear pending order if user cancels, and let go of its stock
+    pending_order = session.pop('pending_order', None)
+    if pending_order:
+        inventory.release(pending_order['order_id'])
+    flash('Payment was cancelled. Your order has not been placed.')
+    return redirect(url_for('cart.checkout'))
@@ -0,0 +1,150 @@
+"""
+Contract price lists
+
+Distributors and other contract customers get a price list: their own base
+prices and specification modifiers for some products, and optionally their
+own quantity discount ladder. A customer applies a list in the cart with the
+code we gave them (one code per customer, or one shared by a group). Lists
+live in data/price_lists.json, loaded with `flask pricing import <file>`:
+
+    [{"id": "acme", "name": "ACME Exhaust", "code": "ACME-2026",
+      "discounts": [[1, 0.0], [250, 0.05], [1000, 0.1]],
+      "products": {
+          "v_band/4-inch-v-band-clamp": {"price": 9.8, "options": {"Material": {"Stainless": 1.2}}}
+      }}]
+
+Products are keyed by SKU (inventory.product_sku). Anything a list does not
+mention is priced from the catalog; a list without "discounts" uses the
+standard ladder.
+
+The file is read through the catalog cache and compiled, once per version,
+into a PriceBook: flat dicts keyed by (price list, SKU, specification option),
+so pricing a cart line is a few dictionary lookups whether or not a list
+applies.
+"""
+
+import json
+import os
+
+from flask import g, session
+
+from app import catalog_cache
+from datastore import write_json
+
+PRICE_LISTS_FILE = os.path.join('data', 'price_lists.json')
+
+# Quantity discount for customers without a contract ladder, highest tier first
+STANDARD_DISCOUNTS = ((500, 0.25), (200, 0.20), (100, 0.12), (50, 0.08), (20, 0.05), (1, 0.02))
+
+
+def bulk_discount_rate(quantity, ladder=STANDARD_DISCOUNTS):
+    """Discount for quantity from a ladder of (minimum quantity, rate), highest tier first"""
+    for min_quantity, rate in ladder:
+        if quantity >= min_quantity:
+            return rate
+    return 0.0
+
+
+def _number(value, what, negative=False):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{what} must be a number')
+    if number < 0 and not negative:
+        raise ValueError(f'{what} cannot be negative')
+    return number
+
+
+def validate_price_lists(price_lists):
+    """Check a price lists document; returns a list of error messages"""
+    if not isinstance(price_lists, list):
+        return ['The file must contain a list of price lists']
+    errors = []
+    ids, codes = set(), set()
+    for n, price_list in enumerate(price_lists, 1):
+        label = f'Price list {price_list.get("id", n) if isinstance(price_list, dict) else n}'
+        if not isinstance(price_list, dict):
+            errors.append(f'{label}: must be an object')
+            continue
+        for field in ('id', 'name', 'code'):
+            if not str(price_list.get(field) or '').strip():
+                errors.append(f'{label}: {field} is required')
+        if price_list.get('id') in ids:
+            errors.append(f'{label}: duplicate id')
+        if str(price_list.get('code', '')).upper() in codes:
+            errors.append(f'{label}: duplicate code')
+        ids.add(price_list.get('id'))
+        codes.add(str(price_list.get('code', '')).upper())
+
+        try:
+            for tier in price_list.get('discounts', []):
+                min_quantity, rate = tier
+                _number(min_quantity, 'Discount quantity')
+                if not 0 <= _number(rate, 'Discount rate') < 1:
+                    raise ValueError('Discount rates must be between 0 and 1')
+            for sku, entry in (price_list.get('products') or {}).items():
+                if 'price' in entry:
+                    _number(entry['price'], f'{sku} price')
+                for category, options in (entry.get('options') or {}).items():
+                    for option, modifier in options.items():
+                        _number(modifier, f'{sku} {category}: {option} modifier', negative=True)
+        except (TypeError, ValueError, AttributeError) as e:
+            errors.append(f'{label}: {e}')
+    return errors
+
+
+class PriceBook:
+    """Price lists compiled into flat lookups keyed by (price list, SKU, option)"""
+
+    def __init__(self, price_lists):
+        self.codes = {}   # upper-case code -> price list id
+        self.names = {}   # price list id -> display name
+        self.ladders = {}  # price list id -> discount ladder, highest tier first
+        self.prices = {}  # (price list id, sku, None) -> base price; (id, sku, (category, option)) -> modifier
+        for price_list in price_lists:
+            list_id = price_list['id']
+            self.codes[str(price_list['code']).strip().upper()] = list_id
+            self.names[list_id] = price_list['name']
+            if 'discounts' in price_list:
+                self.ladders[list_id] = tuple(sorted(((int(q), float(r)) for q, r in price_list['discounts']),
+                                                     reverse=True))
+            for sku, entry in (price_list.get('products') or {}).items():
+                if 'price' in entry:
+                    self.prices[(list_id, sku, None)] = float(entry['price'])
+                for category, options in (entry.get('options') or {}).items():
+                    for option, modifier in options.items():
+                        self.prices[(list_id, sku, (category, option))] = float(modifier)
+
+    def base_price(self, list_id, sku, catalog_price):
+        return self.prices.get((list_id, sku, None), catalog_price)
+
+    def option_modifier(self, list_id, sku, category, option, catalog_modifier):
+        return self.prices.get((list_id, sku, (category, option)), catalog_modifier)
+
+    def discount_rate(self, list_id, quantity):
+        return bulk_discount_rate(quantity, self.ladders.get(list_id, STANDARD_DISCOUNTS))
+
+
+def parse_price_lists(f):
+    return PriceBook(json.load(f))
+
+
+NO_PRICE_LISTS = PriceBook([])
+
+
+def save_price_lists(price_lists):
+    """Replace data/price_lists.json after validate_price_lists() found no errors"""
+    write_json(PRICE_LISTS_FILE, price_lists)
+
+
+def price_book():
+    """The compiled price lists, checked against the file once per request"""
+    if 'price_book' not in g:
+        g.price_book = catalog_cache.load(PRICE_LISTS_FILE, parse=parse_price_lists) or NO_PRICE_LISTS
+    return g.price_book
+
+
+def current_price_list():
+    """ID of the price list the customer applied, or None for catalog prices"""
+    list_id = session.get('price_list')
+    return list_id if list_id in price_book().names else None
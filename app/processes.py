@@ -0,0 +1,24 @@
+"""
+Telling whether another worker process is still running
+
+Order ID worker slots and metrics snapshot files are labelled with the pid of
+the process that wrote them. A label whose process has exited can be taken
+over (a slot) or folded away (a snapshot); one whose process runs, including
+the current process, cannot.
+"""
+
+import os
+
+
+def pid_alive(pid):
+    """Check whether a process with this pid is running"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Running, but as another user
+        return True
+    return True
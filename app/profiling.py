@@ -0,0 +1,117 @@
+"""
+On-demand cProfile profiling of individual requests
+
+An admin asks for a profile by sending `X-Profile: 1` (or `?_profile=1`); the
+request then runs under cProfile and the result is saved to the profile
+directory: a JSON summary with the top functions by cumulative time, plus the
+raw .prof file for snakeviz or pstats. Profiles are files rather than memory
+so /admin/profile sees requests served by every gunicorn worker. Only the
+newest `keep` profiles are kept.
+
+Requests that do not ask for a profile pay for one header lookup; with
+PROFILING_ENABLED=0 the hooks are not registered at all.
+"""
+
+import cProfile
+import glob
+import io
+import json
+import os
+import pstats
+import re
+import time
+import uuid
+
+PROFILE_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+def _function_label(key):
+    filename, line, name = key
+    if filename == '~':
+        return name  # built-in
+    return f'{os.path.basename(filename)}:{line}({name})'
+
+
+class RequestProfiler:
+    """Run requests under cProfile and keep the newest profiles on disk"""
+
+    def __init__(self, directory, keep=100, top_n=25):
+        self.directory = os.path.abspath(directory)
+        self.keep = keep
+        self.top_n = top_n
+        os.makedirs(self.directory, exist_ok=True)
+
+    def start(self):
+        """Start profiling the current thread; None if a profiler is already active"""
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return None
+        return profiler
+
+    def finish(self, profiler, duration, **info):
+        """Stop profiling and save the profile; returns its summary"""
+        profiler.disable()
+        stats = pstats.Stats(profiler)
+        ranked = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+
+        text = io.StringIO()
+        stats.stream = text
+        stats.sort_stats('cumulative').print_stats(self.top_n)
+
+        profile = dict(info, **{
+            'id': uuid.uuid4().hex,
+            'created_at': time.time(),
+            'duration_ms': round(duration * 1000, 2),
+            'total_calls': stats.total_calls,
+            'top_functions': [
+                {'function': _function_label(key), 'calls': calls, 'tottime': round(tottime, 6),
+                 'cumtime': round(cumtime, 6)}
+                for key, (_, calls, tottime, cumtime, _) in ranked[:self.top_n]
+            ],
+            'text': text.getvalue(),
+        })
+        profiler.dump_stats(self.prof_path(profile['id']))
+        tmp_path = os.path.join(self.directory, f"{profile['id']}.json.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(profile, f)
+        os.replace(tmp_path, os.path.join(self.directory, f"{profile['id']}.json"))
+        self._prune()
+        return profile
+
+    def _prune(self):
+        paths = sorted(glob.glob(os.path.join(self.directory, '*.json')), key=os.path.getmtime, reverse=True)
+        for path in paths[self.keep:]:
+            for stale in (path, path[:-len('.json')] + '.prof'):
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
+
+    def prof_path(self, profile_id):
+        return os.path.join(self.directory, f'{profile_id}.prof')
+
+    def get(self, profile_id):
+        """Load one saved profile, or None"""
+        if not PROFILE_ID_PATTERN.match(profile_id or ''):
+            return None
+        try:
+            with open(os.path.join(self.directory, f'{profile_id}.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def slowest(self, limit=50):
+        """Saved profiles, slowest first, without the full text"""
+        profiles = []
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            try:
+                with open(path) as f:
+                    profile = json.load(f)
+            except (OSError, ValueError):
+                continue
+            profile.pop('text', None)
+            profiles.append(profile)
+        profiles.sort(key=lambda p: p['duration_ms'], reverse=True)
+        return profiles[:limit]
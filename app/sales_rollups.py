@@ -0,0 +1,135 @@
+"""
+Incrementally maintained sales aggregates for the admin dashboard
+
+Every order adds its contribution (order count, quantity, revenue and weight)
+to one row per dimension value in the sales_rollup table, inside the same
+transaction that stores the order. Cancelling an order subtracts it again. The
+dashboard therefore reads a handful of pre-aggregated rows instead of scanning
+order history.
+
+rebuild() recomputes every rollup from the orders table, summing each order's
+contributions into one row per (dimension, key) in a dict, then replaces the
+table in one transaction.
+"""
+
+import time
+
+from order_export import get_order_items, get_payment_method
+
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sales_rollup (
+    dimension TEXT NOT NULL,
+    key TEXT NOT NULL,
+    label TEXT NOT NULL DEFAULT '',
+    orders INTEGER NOT NULL DEFAULT 0,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    revenue REAL NOT NULL DEFAULT 0,
+    weight_kg REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimension, key)
+);
+"""
+
+EXCLUDED_STATUSES = {'cancelled'}
+
+
+def _number(value, cast=float):
+    try:
+        return cast(value or 0)
+    except (ValueError, TypeError):
+        return cast(0)
+
+
+def order_contributions(order):
+    """Yield (dimension, key, label, orders, quantity, revenue, weight_kg) for an order"""
+    customer = order.get('customer_info') or {}
+    items = get_order_items(order)
+
+    revenue = _number(order.get('total'))
+    weight = _number(order.get('total_weight'))
+    quantity = sum(_number(item.get('quantity'), int) for item in items)
+    day = time.strftime('%Y-%m-%d', time.localtime(_number(order.get('created_at')) or time.time()))
+    country = (customer.get('country') or 'Unknown').strip().title()
+    method = (get_payment_method(order) or 'unknown').strip().lower()
+
+    yield 'total', '', '', 1, quantity, revenue, weight
+    yield 'day', day, '', 1, quantity, revenue, weight
+    yield 'country', country, '', 1, quantity, revenue, weight
+    yield 'payment_method', method, '', 1, quantity, revenue, weight
+
+    for item in items:
+        product = item.get('product') or {}
+        name = product.get('name')
+        if not name:
+            continue
+        yield ('product', name, (product.get('oem') or '')[:120], 1,
+               _number(item.get('quantity'), int), _number(item.get('final_total')),
+               _number(item.get('total_weight')))
+
+
+def apply_order(conn, order, sign=1):
+    """Add (sign=1) or remove (sign=-1) an order's contribution to the rollups"""
+    conn.executemany(
+        'INSERT INTO sales_rollup (dimension, key, label, orders, quantity, revenue, weight_kg) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?) '
+        'ON CONFLICT (dimension, key) DO UPDATE SET '
+        'orders = orders + excluded.orders, quantity = quantity + excluded.quantity, '
+        'revenue = revenue + excluded.revenue, weight_kg = weight_kg + excluded.weight_kg, '
+        'label = CASE WHEN excluded.label != \'\' THEN excluded.label ELSE label END',
+        [(dimension, key, label, sign * orders, sign * quantity, sign * revenue, sign * weight)
+         for dimension, key, label, orders, quantity, revenue, weight in order_contributions(order)]
+    )
+
+
+def compute_rollups(orders):
+    """Sum contributions of all non-cancelled orders into rollup rows"""
+    totals = {}  # (dimension, key) -> [label, orders, quantity, revenue, weight_kg]
+    for order in orders:
+        if (order.get('status') or '').lower() in EXCLUDED_STATUSES:
+            continue
+        for dimension, key, label, count, quantity, revenue, weight in order_contributions(order):
+            row = totals.get((dimension, key))
+            if row is None:
+                totals[dimension, key] = [label, count, quantity, revenue, weight]
+                continue
+            row[1] += count
+            row[2] += quantity
+            row[3] += revenue
+            row[4] += weight
+            if label:
+                row[0] = label
+
+    return [(dimension, key, *row) for (dimension, key), row in totals.items()]
+
+
+def rebuild(conn, orders):
+    """Replace all rollups with totals recomputed from orders; returns row count"""
+    rows = compute_rollups(orders)
+    with conn:
+        conn.execute('DELETE FROM sales_rollup')
+        conn.executemany(
+            'INSERT INTO sales_rollup (dimension, key, label, orders, quantity, revenue, weight_kg) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)', rows
+        )
+    return len(rows)
+
+
+def read_dashboard(conn, days=30, top=10):
+    """Read the dashboard figures from the rollup table"""
+    def rows(sql, params=()):
+        return [dict(row) for row in conn.execute(sql, params).fetchall()]
+
+    columns = 'key, label, orders, quantity, ROUND(revenue, 2) AS revenue, ROUND(weight_kg, 3) AS weight_kg'
+    totals = rows(f'SELECT {columns} FROM sales_rollup WHERE dimension = ?', ('total',))
+    since = time.strftime('%Y-%m-%d', time.localtime(time.time() - days * 86400))
+
+    return {
+        'totals': totals[0] if totals else {'orders': 0, 'quantity': 0, 'revenue': 0.0, 'weight_kg': 0.0},
+        'by_day': rows(f'SELECT {columns} FROM sales_rollup WHERE dimension = ? AND key >= ? ORDER BY key',
+                       ('day', since)),
+        'by_country': rows(f'SELECT {columns} FROM sales_rollup WHERE dimension = ? AND orders > 0 '
+                           'ORDER BY revenue DESC LIMIT ?', ('country', top)),
+        'by_payment_method': rows(f'SELECT {columns} FROM sales_rollup WHERE dimension = ? AND orders > 0 '
+                                  'ORDER BY revenue DESC', ('payment_method',)),
+        'top_products': rows(f'SELECT {columns} FROM sales_rollup WHERE dimension = ? AND orders > 0 '
+                             'ORDER BY quantity DESC LIMIT ?', ('product', top)),
+    }
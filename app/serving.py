@@ -0,0 +1,66 @@
+"""
+Serving modes: sync workers (the default) and gevent workers
+
+Checkout spends most of its time waiting on PayPal and the SMTP server. A sync
+gunicorn worker is blocked for all of that, so a few slow PayPal calls can tie
+up every worker. Under gevent workers (gevent_wsgi.py) the standard library is
+patched, PayPal's HTTP calls and Flask-Mail's SMTP session yield while they
+wait, and one worker serves many requests at a time.
+
+run_in_background() takes the sales-team e-mails off the request path in
+gevent workers: the order confirmation renders while the message is being
+sent. In sync workers (and in tests) it simply calls the function.
+"""
+
+import atexit
+import sys
+
+from flask import copy_current_request_context, g, has_request_context
+
+# Seconds a stopping worker waits for e-mails still being sent
+BACKGROUND_GRACE_SECONDS = 30
+
+_pending = set()
+
+
+def cooperative():
+    """True when gevent has patched the standard library (gevent workers)"""
+    monkey = sys.modules.get('gevent.monkey')
+    return monkey is not None and monkey.is_module_patched('socket')
+
+
+def run_in_background(func, *args, **kwargs):
+    """Call func in its own greenlet under gevent, otherwise right away.
+
+    The greenlet gets a copy of the current request context, so func can use
+    current_app, the mail service and the request ID in its log lines. Returns
+    the greenlet, or func's result when it ran inline.
+    """
+    if not cooperative():
+        return func(*args, **kwargs)
+
+    import gevent
+
+    if has_request_context():
+        request_id = g.get('request_id')
+
+        @copy_current_request_context
+        def run():
+            g.request_id = request_id
+            return func(*args, **kwargs)
+    else:
+        def run():
+            return func(*args, **kwargs)
+
+    greenlet = gevent.spawn(run)
+    _pending.add(greenlet)
+    greenlet.link(_pending.discard)
+    return greenlet
+
+
+@atexit.register
+def _finish_pending():
+    # gunicorn stops accepting requests first, so this only waits for e-mails
+    if _pending:
+        import gevent
+        gevent.joinall(list(_pending), timeout=BACKGROUND_GRACE_SECONDS)
@@ -0,0 +1,98 @@
+"""
+Shipping rates from the Faridabad works to each destination country
+
+Cost is distance based: a per-kg rate per 1000 km with a volume discount,
+for air or sea freight. Distances are great-circle distances from the origin
+to the country (see geography.py). Used by product pages, the cart and
+checkout.
+"""
+
+import math
+
+from app import metrics
+from geography import DistanceTable, country_code
+
+# Shipping configuration
+EXCLUDED_COUNTRIES = ['Pakistan', 'China']
+SHIPPING_RATE_PER_1000KM_PER_KG = 14  # Updated rate per 1000km per kg
+SHIPPING_DISCOUNT = 0.50  # Increased from 30% to 50% discount on calculated shipping
+
+# Where orders ship from: origin id -> (country code, latitude, longitude)
+ORIGIN = 'faridabad'
+ORIGINS = {ORIGIN: ('IN', 28.41, 77.32)}
+DOMESTIC_RATE_PER_KG = 5.8  # Within the origin's own country, instead of the distance rate
+
+DISTANCES = DistanceTable({origin: (lat, lon) for origin, (_, lat, lon) in ORIGINS.items()})
+
+def is_shipping_allowed(country):
+    """Check if shipping is allowed to a specific country (unknown countries are not)"""
+    code = country_code(country)
+    return code is not None and code not in {country_code(c) for c in EXCLUDED_COUNTRIES}
+
+def is_domestic(country, origin=ORIGIN):
+    return country_code(country) == ORIGINS[origin][0]
+
+def get_shipping_distance(country, origin=ORIGIN):
+    """Great-circle distance in km from the origin to a country, or None if the country is unknown"""
+    return DISTANCES.distance(origin, country)
+
+SHIPPING_METHODS = ('air', 'sea')
+
+# Bulky freight is charged by volume: cm³ that count as one kg. Sea freight is
+# priced as a share of the air cost, so both are charged on the air figure.
+VOLUMETRIC_DIVISOR = 5000
+
+def chargeable_weight(weight_kg, volume_cm3=0.0):
+    """The greater of actual and volumetric weight"""
+    return max(weight_kg, volume_cm3 / VOLUMETRIC_DIVISOR)
+
+# Air freight discount by pieces in the shipment, highest tier first
+QUANTITY_DISCOUNTS = ((5000, 0.92), (3000, 0.91), (2000, 0.90), (1500, 0.89), (1000, 0.88),
+                      (500, 0.29), (200, 0.18), (100, 0.14), (50, 0.08))
+# Sea freight is 16% of the discounted air cost, less a further discount by pieces
+SEA_FREIGHT_SHARE = 0.16
+SEA_QUANTITY_DISCOUNTS = ((5000, 0.32), (3000, 0.28), (2000, 0.25), (1500, 0.22), (1000, 0.20),
+                          (500, 0.15), (200, 0.10), (100, 0.08), (50, 0.05))
+
+def quantity_discount_rate(quantity, ladder=QUANTITY_DISCOUNTS):
+    for min_quantity, rate in ladder:
+        if quantity >= min_quantity:
+            return rate
+    return 0.0
+
+def rate_per_kg(distance_km, domestic=False, rate_multiplier=1.0, domestic_rate=DOMESTIC_RATE_PER_KG):
+    """Cost per chargeable kg before quantity discounts, for a shipment over distance_km"""
+    if domestic:
+        return domestic_rate * rate_multiplier
+    # $14 per 1000km per kg, then the standing 50% discount
+    return (distance_km / 1000) * SHIPPING_RATE_PER_1000KM_PER_KG * (1 - SHIPPING_DISCOUNT) * rate_multiplier
+
+def billed_weight(weight_kg):
+    """The kg a shipment is charged for: its chargeable weight rounded up to whole kg, at least 1kg"""
+    return math.ceil(weight_kg) if weight_kg > 0 else 1
+
+def shipment_cost(per_kg, weight_kg, quantity=1, method='air'):
+    """Cost of one shipment at a rate_per_kg(), with weight rounded up to whole kg and quantity discounts"""
+    base_cost = per_kg * billed_weight(weight_kg)
+    
+    if method == 'air':
+        final_cost = base_cost * (1 - quantity_discount_rate(quantity))
+    elif method == 'sea':
+        air_cost_with_discounts = base_cost * (1 - quantity_discount_rate(quantity))
+        base_sea_cost = air_cost_with_discounts * SEA_FREIGHT_SHARE
+        final_cost = base_sea_cost * (1 - quantity_discount_rate(quantity, SEA_QUANTITY_DISCOUNTS))
+    else:
+        final_cost = base_cost
+    
+    return round(final_cost, 2)
+
+@metrics.timed('shipping_calculation')
+def calculate_shipping_cost(country, weight_kg, quantity=1, method='air'):
+    """Calculate shipping cost from the works based on distance, weight, quantity, and shipping method"""
+    if not is_shipping_allowed(country):
+        return None
+    return shipment_cost(rate_per_kg(get_shipping_distance(country), is_domestic(country)), weight_kg, quantity, method)
+
+def get_shipping_cost(country, weight_kg=1, quantity=1, method='air'):
+    """Get shipping cost based on country, weight, quantity, and method (backward compatibility)"""
+    return calculate_shipping_cost(country, weight_kg, quantity, method)
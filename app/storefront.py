@@ -0,0 +1,309 @@
+"""
+Storefront blueprint: home, catalog and product pages, static content
+pages, the contact form, shipping estimates, customer order lookup and the
+display currency
+"""
+
+import json
+import math
+
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, session, url_for
+
+from app import order_store, slugify
+from cart import get_cart_total_quantity
+from catalog import (add_india_shipping, add_live_stock, cached_fragment, catalog_page, get_category, get_listing_args,
+                     load_categories, load_products, paginate_products, stock_revision)
+from currency import (BASE_CURRENCY, currency_format, current_currency, format_amount, money, order_money,
+                      rate_table)
+from geography import country_name
+from notifications import send_contact_notification
+from packing import product_line, shipping_quote
+from serving import run_in_background
+from shipping import (DOMESTIC_RATE_PER_KG, EXCLUDED_COUNTRIES, SHIPPING_DISCOUNT, SHIPPING_RATE_PER_1000KM_PER_KG,
+                      billed_weight, get_shipping_distance, is_domestic, is_shipping_allowed, quantity_discount_rate)
+
+bp = Blueprint('storefront', __name__)
+
+# Prices are stored in BASE_CURRENCY; templates show them with these
+bp.add_app_template_filter(money)
+bp.add_app_template_filter(order_money)
+bp.add_app_template_filter(format_amount)
+bp.add_app_template_global(currency_format)
+bp.add_app_template_global(current_currency)
+bp.add_app_template_global(rate_table)
+
+@bp.route('/')
+@catalog_page
+def index():
+    # Only clear cart if explicitly requested via URL parameter
+    if request.args.get('clear_cart') == 'true':
+        session['cart'] = {}
+        flash('Cart has been cleared.')
+    
+    categories = load_categories()
+    category_tiles_html = cached_fragment(
+        'home_category_tiles', 'all',
+        lambda: render_template('fragments/home_category_tiles.html', categories=categories))
+    return render_template('index.html', categories=categories, category_tiles_html=category_tiles_html)
+
+@bp.route('/fabrication')
+def fabrication():
+    return render_template('fabrication.html')
+
+@bp.route('/custom-clamps')
+def custom_clamps():
+    return render_template('custom_clamps.html')
+
+@bp.route('/products')
+@catalog_page
+def products():
+    """Display all product categories"""
+    categories = load_categories()
+    category_tiles_html = cached_fragment(
+        'category_tiles', 'all',
+        lambda: render_template('fragments/category_tiles.html', categories=categories))
+    return render_template('products.html', categories=categories, category_tiles_html=category_tiles_html)
+
+@bp.route('/products/<category_folder>')
+@catalog_page
+def category_products(category_folder):
+    """Display products in a specific category"""
+    categories = load_categories()
+    category = None
+    
+    # Find the category
+    for cat in categories:
+        if cat['folder'] == category_folder:
+            category = cat
+            break
+    
+    if not category:
+        flash('Category not found.')
+        return redirect(url_for('storefront.products'))
+    
+    page, per_page, sort = get_listing_args()
+    
+    def render_grid():
+        pagination = paginate_products(load_products(category_folder), page, per_page, sort)
+        # Only the products on this page need live stock and the India shipping estimate
+        products = add_india_shipping(add_live_stock(category_folder, pagination['items']))
+        return render_template('fragments/product_grid.html', category=category, products=products, pagination=pagination)
+    
+    product_grid_html = cached_fragment('product_grid', (category_folder, page, per_page, sort,
+                                                         stock_revision(category_folder)), render_grid)
+    return render_template('category_products.html', category=category, product_grid_html=product_grid_html)
+
+@bp.route('/api/products/<category_folder>')
+@catalog_page
+def category_products_page(category_folder):
+    """JSON endpoint returning one page of product cards for infinite scroll"""
+    category = get_category(category_folder)
+    if not category:
+        return jsonify({'success': False, 'message': 'Category not found'}), 404
+    
+    page, per_page, sort = get_listing_args()
+    
+    def render_page():
+        pagination = paginate_products(load_products(category_folder), page, per_page, sort)
+        products = add_india_shipping(add_live_stock(category_folder, pagination['items']))
+        html = render_template('fragments/product_cards.html', category=category, products=products)
+        return json.dumps({
+            'success': True,
+            'html': html,
+            'page': pagination['page'],
+            'pages': pagination['pages'],
+            'total': pagination['total'],
+            'has_next': pagination['has_next']
+        })
+    
+    payload = cached_fragment('product_cards', (category_folder, page, per_page, sort,
+                                                stock_revision(category_folder)), render_page)
+    return current_app.response_class(str(payload), mimetype='application/json')
+
+@bp.route('/product/<category_folder>/<product_slug>')
+@catalog_page
+def product_detail(category_folder, product_slug):
+    """Display individual product details"""
+    categories = load_categories()
+    category = None
+    
+    # Find the category
+    for cat in categories:
+        if cat['folder'] == category_folder:
+            category = cat
+            break
+    
+    if not category:
+        flash('Category not found.')
+        return redirect(url_for('storefront.products'))
+    
+    products = load_products(category_folder)
+    product = None
+    
+    # Find the product by slug
+    for p in products:
+        if slugify(p['name']) == product_slug:
+            product = p
+            break
+    
+    if not product:
+        flash('Product not found.')
+        return redirect(url_for('storefront.category_products', category_folder=category_folder))
+    
+    add_live_stock(category_folder, [product])
+    
+    # Shipping one piece to sample countries, packed and priced as the cart will
+    line = product_line(product)
+    sample_shipping = {country: shipping_quote(country, [line])[2]
+                       for country in ('India', 'United States', 'Germany', 'Australia')}
+    
+    product_body_html = cached_fragment(
+        'product_detail_body', (category_folder, product_slug, product.get('stock')),
+        lambda: render_template('fragments/product_detail_body.html', category=category, product=product))
+    
+    return render_template('product_detail.html', 
+                         category=category, 
+                         product=product, 
+                         product_slug=product_slug,  # Pass the slug to template
+                         sample_shipping=sample_shipping,
+                         product_body_html=product_body_html)
+
+@bp.route("/contact", methods=["GET", "POST"])
+def contact():
+    if request.method == "POST":
+        # handle contact form submission (email or DB storage)
+        contact_data = {
+            'name': request.form.get("name"),
+            'email': request.form.get("email"),
+            'phone': request.form.get("phone"),
+            'inquiry': request.form.get("inquiry"),
+            'message': request.form.get("message")
+        }
+        
+        # Send email notification to sales team; the visitor sees the same
+        # message even if it fails (failures are logged)
+        run_in_background(send_contact_notification, contact_data)
+        flash("Thank you for your message. We'll get back to you soon!", "success")
+        
+        return redirect(url_for("storefront.contact"))
+    return render_template("contact.html")
+
+@bp.route("/shipping-info/<country>")
+def shipping_info(country):
+    """API endpoint to check shipping availability and cost"""
+    country = country_name(country) or country.strip().title()
+    try:
+        weight = float(request.args.get('weight', 1.0))  # Default to 1kg if not specified
+        quantity = int(request.args.get('quantity', get_cart_total_quantity() or 1))  # Get cart quantity or default to 1
+    except ValueError:
+        return {"allowed": False, "country": country, "message": "Weight and quantity must be numbers"}, 400
+    if not math.isfinite(weight) or weight < 0 or quantity < 1:
+        return {"allowed": False, "country": country, "message": "Weight and quantity must be positive"}, 400
+    method = request.args.get('method', 'air').lower()  # Default to air shipping
+    
+    if is_shipping_allowed(country):
+        # Packed into cartons and charged on their chargeable weight, as the cart's shipments are
+        cartons, chargeable, cost = shipping_quote(country, [{'weight': weight, 'quantity': quantity}], method)
+        
+        distance = round(get_shipping_distance(country))
+        shipping_weight = billed_weight(chargeable)
+        
+        # Create calculation explanation
+        if is_domestic(country):
+            base_calculation = f"{money(DOMESTIC_RATE_PER_KG)} × {shipping_weight}kg ({country} domestic rate)"
+        else:
+            base_rate = (distance / 1000) * shipping_weight * SHIPPING_RATE_PER_1000KM_PER_KG
+            base_calculation = f"{money(SHIPPING_RATE_PER_1000KM_PER_KG)} × {distance/1000:.1f} (1000km units) × {shipping_weight}kg = {money(base_rate)}, with 50% discount"
+        
+        if method == 'sea':
+            calculation_text = f"{base_calculation}, Sea shipping (16% of air cost) = {money(cost)}"
+        elif method == 'air' and quantity >= 50:
+            # Show quantity discount for air shipping
+            discount_rate = quantity_discount_rate(quantity)
+            
+            if discount_rate > 0:
+                calculation_text = f"{base_calculation}, Quantity discount ({int(discount_rate*100)}% for {quantity} pcs) = {money(cost)}"
+            else:
+                calculation_text = f"{base_calculation} = {money(cost)}"
+        else:
+            calculation_text = f"{base_calculation} = {money(cost)}"
+        
+        return {
+            "allowed": True,
+            "country": country,
+            "weight_kg": weight,
+            "cartons": cartons,
+            "chargeable_weight_kg": chargeable,
+            "shipping_weight_kg": shipping_weight,
+            "distance_km": distance,
+            "shipping_cost": cost,
+            "method": method,
+            "currency": BASE_CURRENCY,
+            # The cost in the customer's display currency, as used in the calculation text
+            "display_currency": current_currency(),
+            "display_cost": rate_table().convert(cost, current_currency()),
+            "calculation": calculation_text
+        }
+    elif country_name(country) is None:
+        return {
+            "allowed": False,
+            "country": country,
+            "message": f"Sorry, we could not find a country called {country}"
+        }
+    else:
+        return {
+            "allowed": False,
+            "country": country,
+            "message": f"Sorry, we do not ship to {country}"
+        }
+
+@bp.route('/currency', methods=['POST'])
+def set_currency():
+    """Switch the display currency and go back to the page the customer was on"""
+    code = request.form.get('currency', '').upper()
+    if code in rate_table().multipliers:
+        session['currency'] = code
+    next_url = request.form.get('next', '')
+    if not next_url.startswith('/') or next_url.startswith('//'):
+        next_url = url_for('storefront.index')
+    return redirect(next_url)
+
+@bp.route("/shipping-policy")
+def shipping_policy():
+    """Display shipping policy page"""
+    return render_template("shipping_policy.html", 
+                         excluded_countries=EXCLUDED_COUNTRIES,
+                         rate_per_1000km_per_kg=SHIPPING_RATE_PER_1000KM_PER_KG,
+                         shipping_discount=SHIPPING_DISCOUNT)
+
+@bp.route('/orders/<order_id>', methods=['GET', 'POST'])
+def order_status(order_id):
+    """Let a customer look up an order by confirming the email it was placed with"""
+    email = (request.values.get('email') or '').strip().lower()
+    wants_json = request.args.get('format') == 'json' or request.accept_mimetypes.best == 'application/json'
+    
+    order = None
+    if email:
+        found = order_store.get_order(order_id, with_history=True)
+        # Same answer for unknown orders and wrong emails, so IDs can't be probed
+        if found and (found.get('customer_info') or {}).get('email', '').strip().lower() == email:
+            order = found
+    
+    if wants_json:
+        if not email:
+            return jsonify({'success': False, 'message': 'Email is required'}), 400
+        if not order:
+            return jsonify({'success': False, 'message': 'Order not found'}), 404
+        return jsonify({
+            'success': True,
+            'order_id': order['order_id'],
+            'status': order['status'],
+            'created_date': order.get('created_date'),
+            'total': order.get('total'),
+            'shipping_method': order['customer_info'].get('shipping_method'),
+            'status_history': order['status_history']
+        })
+    
+    if email and not order:
+        flash('We could not find an order with that number and email address.')
+    return render_template('order_status.html', order_id=order_id, order=order)
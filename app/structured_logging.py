@@ -0,0 +1,139 @@
+"""
+Structured, non-blocking logging
+
+Log calls only put the record on an in-memory queue (QueueHandler); a
+background QueueListener thread formats it and does the actual write, so a slow
+stdout or journald pipe never holds up a request. Records are written as one
+JSON object per line with the level, logger, message, the request ID of the
+request that logged them and any fields passed through `extra`.
+
+High-volume DEBUG events are sampled: only LOG_DEBUG_SAMPLE_RATE of them are
+kept, so enabling debug logging in production does not flood the output.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+
+from flask import g, has_request_context
+from flask.logging import default_handler
+
+# Attributes every LogRecord has; anything else came from `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach the current request ID (or '-') to each record"""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = g.get('request_id', '-') if has_request_context() else '-'
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of DEBUG records; other levels always pass"""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON documents"""
+
+    def format(self, record):
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps `extra` fields and pre-renders the traceback"""
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(app, logger_names=('qualclamps',), level=None, fmt=None, sample_rate=None, stream=None):
+    """Route the given loggers and app.logger through a background queue.
+
+    Settings default to the LOG_LEVEL, LOG_FORMAT ('json' or 'text') and
+    LOG_DEBUG_SAMPLE_RATE environment variables. Returns the QueueListener.
+    """
+    level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+    fmt = (fmt or os.getenv('LOG_FORMAT', 'json')).lower()
+    if sample_rate is None:
+        sample_rate = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', 0.1))
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    if fmt == 'json':
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s'))
+
+    log_queue = queue.SimpleQueue()
+    handler = _QueueHandler(log_queue)
+    # Filters run in the calling thread, where the request context is available
+    handler.addFilter(RequestContextFilter())
+    handler.addFilter(SamplingFilter(sample_rate))
+
+    app.logger.removeHandler(default_handler)
+    for logger in [logging.getLogger(name) for name in logger_names] + [app.logger]:
+        logger.handlers = [handler]
+        logger.setLevel(level)
+        logger.propagate = False
+
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+
+    @atexit.register
+    def flush_on_exit():
+        if listener._thread is not None:
+            listener.stop()
+
+    def restart_in_child():
+        # The listener thread does not survive fork (gunicorn --preload)
+        handler.queue = listener.queue = queue.SimpleQueue()
+        listener._thread = None
+        listener.start()
+
+    os.register_at_fork(after_in_child=restart_in_child)
+    return listener
+
+
+def share_logging(app, logger_name='qualclamps'):
+    """Send app.logger through the handler configure_logging() gave logger_name"""
+    source = logging.getLogger(logger_name)
+    app.logger.removeHandler(default_handler)
+    app.logger.handlers = list(source.handlers)
+    app.logger.setLevel(source.level)
+    app.logger.propagate = False
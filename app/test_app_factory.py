@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test script for create_app(), lazy services and the shared catalog cache
+"""
+
+import gc
+import json
+import os
+import subprocess
+import sys
+
+import app as app_module
+from app import create_app, catalog_cache
+from catalog import load_products
+from catalog_cache import CatalogCache
+from harness import write_test_catalog
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def test_create_app_defers_clients_and_files(tmp_path):
+    """Building an app imports neither PayPal nor Flask-Mail and opens no order store"""
+    script = (
+        'import sys; sys.path.insert(0, sys.argv[1]); import app; '
+        'application = app.create_app({"ORDERS_DB": "orders.db"}); '
+        'print(sorted(name for name in ("paypalrestsdk", "flask_mail") if name in sys.modules))'
+    )
+    result = subprocess.run([sys.executable, '-c', script, APP_DIR], cwd=tmp_path,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == '[]'
+    assert not (tmp_path / 'orders.db').exists()
+
+def test_admin_views_load_on_first_admin_request(tmp_path):
+    script = (
+        'import sys; sys.path.insert(0, sys.argv[1]); import app; '
+        'client = app.create_app().test_client(); client.get("/contact"); '
+        'print("admin_views" in sys.modules, "uploads" in sys.modules); '
+        'client.get("/admin/login"); print("admin_views" in sys.modules)'
+    )
+    result = subprocess.run([sys.executable, '-c', script, APP_DIR], cwd=tmp_path,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ['False', 'False', 'True']
+
+def test_storefront_only_app(storefront):
+    shop = create_app({'ADMIN_ENABLED': False})
+    client = shop.test_client()
+    assert client.get('/products/v_band').status_code == 200
+    assert client.get('/admin/login').status_code == 404
+
+def test_services_are_per_app(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first = create_app({'ORDERS_DB': str(tmp_path / 'first.db')})
+    second = create_app({'ORDERS_DB': str(tmp_path / 'second.db')})
+    with first.app_context():
+        first_store = app_module.order_store._get_current_object()
+        assert app_module.order_store._get_current_object() is first_store
+    with second.app_context():
+        assert app_module.order_store.db_path != first_store.db_path
+
+def test_catalog_cache_revalidates_on_write(tmp_path):
+    path = tmp_path / 'products.json'
+    path.write_text(json.dumps([{'name': 'A'}]))
+    cache = CatalogCache()
+
+    assert cache.load(str(path)) is cache.load(str(path))
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    path.write_text(json.dumps([{'name': 'A'}, {'name': 'B'}]))
+    assert len(cache.load(str(path))) == 2
+    path.unlink()
+    assert cache.load(str(path)) is None
+
+def test_loaders_hand_out_copies(tmp_path, monkeypatch):
+    """Callers may annotate products without changing the cached catalog"""
+    write_test_catalog(str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    load_products('v_band')[0]['india_shipping'] = 99
+    assert 'india_shipping' not in load_products('v_band')[0]
+
+def test_catalog_preload(tmp_path, monkeypatch):
+    write_test_catalog(str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    products_file = str(tmp_path / 'data' / 'v_band' / 'products.json')
+    create_app({'CATALOG_PRELOAD': True})
+    hits = catalog_cache.hits
+    assert catalog_cache.load(products_file) is not None
+    assert catalog_cache.hits == hits + 1
+    gc.unfreeze()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Smoke test keeping the benchmark suite runnable
+"""
+
+import json
+import os
+
+import pytest
+
+import bench
+
+def test_bench_runs_against_synthetic_catalog(tmp_path):
+    """A tiny run covers every scenario, start-up included, and restores the working directory"""
+    cwd = os.getcwd()
+    output = tmp_path / 'result.json'
+
+    assert bench.main(['--products', '30', '--categories', '3', '--cart-lines', '2',
+                       '--requests', '3', '--startup-runs', '1', '-o', str(output)]) == 0
+
+    report = json.loads(output.read_text())
+    assert set(report['results']) == {
+        f'products=30/{name}' for name in
+        ['home', 'category', 'product', 'shipping_info',
+         'cart[lines=2]', 'update_cart[lines=2]', 'place_order[lines=2]'] +
+        [f'{label}/{phase}' for label in ('startup', 'startup[preload]')
+         for phase in ('import', 'create_app', 'first_request', 'total')]
+    }
+    assert report['results']['products=30/home']['requests'] == 3
+    assert os.getcwd() == cwd
+
+    baseline = json.loads(output.read_text())
+    for stats in baseline['results'].values():
+        stats['p50_ms'] /= 10
+    assert bench.compare(report, baseline, threshold=50) == list(report['results'])
+
+def test_bench_compares_serving_modes(tmp_path):
+    """Concurrent PayPal checkouts run against sync and gevent gunicorn workers"""
+    pytest.importorskip('gunicorn')
+    pytest.importorskip('gevent')
+    output = tmp_path / 'result.json'
+
+    assert bench.main(['--products', '30', '--categories', '3', '--cart-lines', '1', '--requests', '8',
+                       '--startup-runs', '0', '--checkout-concurrency', '8', '--paypal-latency', '0.2',
+                       '-o', str(output)]) == 0
+
+    results = json.loads(output.read_text())['results']
+    sync = results['products=30/checkout[concurrency=8]/sync']
+    cooperative = results['products=30/checkout[concurrency=8]/gevent']
+    assert sync['requests'] == cooperative['requests'] == 8
+    # Two sync workers wait on PayPal one checkout at a time each; gevent workers overlap them
+    assert cooperative['throughput_rps'] > sync['throughput_rps']
@@ -3,69 +3,83 @@
 Test script to verify cart total calculations
 """
 
-import json
-import sys
 import os
 
-# Add the current directory to the Python path
-sys.path.insert(0, '/Users/themagician/QualityClamps_Flask')
+from datastore import write_json
+from shipping import calculate_shipping_cost
 
-from app import *
+def add_with_shipping(client, product_slug, quantity, country, method='air'):
+    response = client.post('/add-to-cart', json={
+        'category_folder': 'v_band', 'product_slug': product_slug, 'quantity': quantity, 'specifications': {},
+        'shipping': {'country': country, 'method': method, 'cost': 1.0}})
+    assert response.get_json()['success']
+    return response.get_json()['cart_key']
 
-def test_cart_totals():
-    """Test cart total calculations"""
-    print("🧪 Testing Cart Total Calculations")
-    print("=" * 50)
-    
-    with app.app_context():
-        # Clear any existing cart
-        session.clear()
-        
-        # Load a sample product
-        products = load_products('v_band')
-        if not products:
-            print("❌ No products found in v_band category")
-            return False
-        
-        product = products[0]
-        print(f"📦 Test Product: {product['name']}")
-        print(f"💰 Base Price: ${product['price']}")
-        print(f"⚖️  Weight: {product.get('weight', 1.0)} kg")
-        
-        # Add item to cart with shipping
-        cart_key = add_to_cart('v_band', slugify(product['name']), 5, {}, {
-            'country': 'United States',
-            'method': 'air',
-            'cost': 50.0
-        })
-        
-        # Calculate different totals
-        products_total = get_cart_products_total()
-        shipping_total = get_cart_shipping_total()
-        full_total = get_cart_total()
-        
-        print("\n📊 Cart Total Breakdown:")
-        print(f"Products Total: ${products_total:.2f}")
-        print(f"Shipping Total: ${shipping_total:.2f}")
-        print(f"Full Total (products + shipping): ${full_total:.2f}")
-        print(f"Manual Calculation: ${products_total + shipping_total:.2f}")
-        
-        # Verify the calculations
-        expected_full_total = products_total + shipping_total
-        
-        if abs(full_total - expected_full_total) < 0.01:  # Allow for floating point precision
-            print("\n✅ Cart totals are consistent!")
-            return True
-        else:
-            print(f"\n❌ Cart totals are inconsistent!")
-            print(f"Expected: ${expected_full_total:.2f}")
-            print(f"Actual: ${full_total:.2f}")
-            return False
+def formatted(amount):
+    return f'${amount:,.2f}'
 
-if __name__ == "__main__":
-    success = test_cart_totals()
-    if success:
-        print("\n🎉 All tests passed!")
-    else:
-        print("\n💥 Tests failed!")
-        sys.exit(1)
+def test_cart_totals(storefront):
+    """The cart total is always products plus shipping"""
+    client = storefront.client()
+    cart_key = storefront.add_to_cart(client, quantity=5, specifications={'Material': 'Stainless'})
+    storefront.add_to_cart(client, product_slug='5-inch-v-band-clamp', quantity=2)
+
+    for quantity in (5, 50, 500):
+        totals = client.post('/update-cart', json={'cart_key': cart_key, 'quantity': quantity}).get_json()
+        assert totals['success']
+        assert abs(totals['cart_total'] - (totals['products_total'] + totals['shipping_total'])) < 0.01
+        assert totals['cart_count'] == 2
+
+def test_cart_checkout_and_order_share_one_shipment(storefront):
+    client = storefront.client()
+    cart_key = add_with_shipping(client, '4-inch-v-band-clamp', 10, 'USA')
+    add_with_shipping(client, '5-inch-v-band-clamp', 20, 'USA')
+    totals = client.post('/update-cart', json={'cart_key': cart_key, 'quantity': 30}).get_json()
+
+    # One shipment for the whole cart: 17 kg and 50 pieces, packed in one carton
+    assert totals['cartons'] == 1 and totals['chargeable_weight'] == 17.5
+    assert totals['shipping_total'] == calculate_shipping_cost('United States', 17.5, 50)
+    assert 'Shipping (Air to United States)' in client.get('/cart').get_data(as_text=True)
+
+    quote = client.post('/cart-shipping', json={'country': 'Germany'}).get_json()
+    assert quote['shipping_total'] == calculate_shipping_cost('Germany', 17.5, 50)
+    assert quote['cart_total'] == round(quote['products_total'] + quote['shipping_total'], 2)
+    assert formatted(quote['cart_total']) in client.get('/checkout').get_data(as_text=True)
+    assert client.post('/cart-shipping', json={'country': 'Narnia'}).status_code == 400
+
+    # The form cannot switch the method chosen with the shipping calculator
+    response = storefront.place_order(client, country='Germany', shipping_method='sea')
+    assert response.headers['Location'].endswith('/checkout')
+    assert storefront.order_store.count() == 0
+    assert storefront.place_order(client, country='Germany', shipping_method='air').status_code == 200
+    order = storefront.order_store.find_orders()[0][0]
+    assert order['customer_info']['shipping_method'] == 'air'
+    assert order['shipping_cost'] == quote['shipping_total']
+    assert order['total'] == quote['cart_total']
+
+def test_order_ships_by_the_method_chosen_for_the_cart(storefront):
+    """Checkout's method radios are disabled, so a sea cart posts no method and ships by sea"""
+    client = storefront.client()
+    add_with_shipping(client, '4-inch-v-band-clamp', 100, 'Germany', method='sea')
+    quote = client.post('/cart-shipping', json={'country': 'Germany'}).get_json()
+    assert quote['method'] == 'sea'
+
+    assert storefront.place_order(client, country='Germany', shipping_method='').status_code == 200
+    order = storefront.order_store.find_orders()[0][0]
+    assert order['customer_info']['shipping_method'] == 'sea'
+    assert order['shipping_cost'] == quote['shipping_total']
+
+def test_bulky_products_are_charged_by_volume(storefront):
+    products = storefront.products()
+    products[1]['dimensions_cm'] = [30, 20, 10]  # 6000 cm³ against 0.4 kg
+    write_json(os.path.join(storefront.data_dir, 'v_band', 'products.json'), products)
+
+    client = storefront.client()
+    add_with_shipping(client, '5-inch-v-band-clamp', 10, 'Germany')
+    quote = client.post('/cart-shipping', json={'country': 'Germany'}).get_json()
+    # Ten need the large carton: 96000 cm³ is 19.2 kg by volume
+    assert quote['total_weight'] == 4.0
+    assert quote['cartons'] == 1 and quote['chargeable_weight'] == 19.5
+    assert quote['shipping_total'] == calculate_shipping_cost('Germany', 19.5, 10)
+    page = client.get('/cart').get_data(as_text=True)
+    assert 'Chargeable Weight' in page and 'Cartons:' in page
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script for the bulk catalog import command
+"""
+
+import io
+import json
+import os
+
+from catalog import load_products, load_categories
+from catalog_import import iter_json_array, match_image, build_image_index, normalize_record
+
+def make_catalog(root):
+    """Create an empty 'bulk' category with one uploaded image in root"""
+    os.makedirs(os.path.join(root, 'data', 'bulk'))
+    os.makedirs(os.path.join(root, 'static', 'images'), exist_ok=True)
+    with open(os.path.join(root, 'static', 'images', 'clamp_1753603503.jpg'), 'wb') as f:
+        f.write(b'jpg')
+    with open(os.path.join(root, 'data', 'categories.json'), 'w') as f:
+        json.dump([{'name': 'Bulk', 'description': 'Bulk', 'folder': 'bulk', 'image': '', 'count': 0}], f)
+
+def test_iter_json_array_small_chunks():
+    """Array items are decoded correctly even when split across reads"""
+    items = [{'name': f'Clamp {i}', 'price': i} for i in range(50)]
+    assert list(iter_json_array(io.StringIO(json.dumps(items)), chunk_size=7)) == items
+
+def test_match_image_ignores_upload_timestamp(tmp_path):
+    """Images are matched by name even after save_uploaded_file added a timestamp"""
+    make_catalog(str(tmp_path))
+    index = build_image_index(str(tmp_path / 'static' / 'images'))
+    assert match_image('clamp.jpg', index) == 'clamp_1753603503.jpg'
+    assert match_image('CLAMP_1753603503.JPG', index) == 'clamp_1753603503.jpg'
+    assert match_image('missing.jpg', index) is None
+
+def test_import_jsonl(storefront):
+    """Thousands of records are imported with a single write and count update"""
+    make_catalog(storefront.root)
+    with open('products.jsonl', 'w') as f:
+        for i in range(2000):
+            f.write(json.dumps({'name': f'Clamp {i}', 'description': 'Test clamp', 'price': 1.5,
+                                'weight': 0.2, 'stock': 10, 'images': 'clamp.jpg'}) + '\n')
+
+    result = storefront.app.test_cli_runner().invoke(args=['catalog', 'import', 'products.jsonl', '--category', 'bulk'])
+    assert result.exit_code == 0, result.output
+    products = load_products('bulk')
+    assert len(products) == 2000
+    assert products[0]['images'] == ['clamp_1753603503.jpg']
+    assert load_categories()[0]['count'] == 2000
+
+def test_import_rejects_invalid_batch(storefront):
+    """One invalid record aborts the import unless --skip-invalid is given"""
+    make_catalog(storefront.root)
+    with open('products.csv', 'w') as f:
+        f.write('name,description,price,weight\nGood,Clamp,2.0,0.5\nBad,Clamp,abc,0.5\n')
+
+    runner = storefront.app.test_cli_runner()
+    result = runner.invoke(args=['catalog', 'import', 'products.csv', '--category', 'bulk'])
+    assert result.exit_code != 0
+    assert load_products('bulk') == []
+
+    result = runner.invoke(args=['catalog', 'import', 'products.csv', '--category', 'bulk', '--skip-invalid'])
+    assert result.exit_code == 0, result.output
+    assert [p['name'] for p in load_products('bulk')] == ['Good']
+
+def test_replace_keeps_fields_missing_from_the_file(storefront):
+    """--replace with a price-only file changes prices and keeps stock, specifications and photos"""
+    make_catalog(storefront.root)
+    with open('products.jsonl', 'w') as f:
+        f.write(json.dumps({'name': 'Clamp 1', 'description': 'Test clamp', 'price': 1.5, 'weight': 0.2, 'stock': 10,
+                            'images': 'clamp.jpg', 'specifications': [
+                                {'category': 'Material', 'options': [{'name': 'Steel', 'price_modifier': 1}]}]}) + '\n')
+    with open('prices.csv', 'w') as f:
+        f.write('name,description,price,stock\nClamp 1,Test clamp,2.25,\n')
+
+    runner = storefront.app.test_cli_runner()
+    assert runner.invoke(args=['catalog', 'import', 'products.jsonl', '--category', 'bulk']).exit_code == 0
+    result = runner.invoke(args=['catalog', 'import', 'prices.csv', '--category', 'bulk', '--replace'])
+    assert result.exit_code == 0, result.output
+    product, = load_products('bulk')
+    assert product['price'] == 2.25
+    assert product['stock'] == 10 and product['weight'] == '0.2'
+    assert product['specifications'][0]['options'][0]['name'] == 'Steel'
+    assert product['images'] == ['clamp_1753603503.jpg']
+
+def test_malformed_records_are_row_errors():
+    """Records the validator cannot use are reported as errors, not tracebacks or NaN prices"""
+    def errors(record):
+        product, errors = normalize_record(record, {}, {})
+        assert product is None
+        return errors
+
+    assert errors(['Clamp', 1.5]) == ['record must be an object']
+    good = {'name': 'Clamp', 'description': 'Test clamp', 'price': 1.5}
+    assert errors(dict(good, price='nan')) == ['price must be a finite number']
+    assert errors(dict(good, weight=float('inf'))) == ['weight must be a finite number']
+    assert errors(dict(good, stock=1e999)) == ['stock must be a number']
+    assert errors(dict(good, specifications=[{'category': 'Material', 'options': ['Steel']}])) == [
+        'specification option must be an object: Material']
+    assert errors(dict(good, specifications=[{'category': 'Material', 'options': [
+        {'name': 'Steel', 'price_modifier': 'NaN'}]}])) == ['invalid modifier in specification option: Steel']
+
+def test_unreadable_csv_is_reported(storefront):
+    make_catalog(storefront.root)
+    with open('products.csv', 'w') as f:
+        f.write('name,description,price\nClamp,' + 'x' * 200000 + ',1.5\n')  # over the csv module's field limit
+
+    result = storefront.app.test_cli_runner().invoke(args=['catalog', 'import', 'products.csv', '--category', 'bulk'])
+    assert result.exit_code != 0
+    assert 'Could not read products.csv' in result.output
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test script for simultaneous checkouts and admin catalog writes
+"""
+
+import io
+import threading
+
+THREADS = 8
+
+def run_together(target, count=THREADS):
+    """Start count threads that call target(i) at the same moment; re-raise failures"""
+    barrier = threading.Barrier(count)
+    errors = []
+
+    def worker(i):
+        try:
+            barrier.wait()
+            target(i)
+        except Exception as e:  # collected and re-raised in the main thread
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+def test_simultaneous_orders(storefront):
+    """Concurrent checkouts get distinct IDs and are all stored, counted and e-mailed"""
+    clients = [storefront.client() for _ in range(THREADS)]
+    for i, client in enumerate(clients):
+        storefront.add_to_cart(client, quantity=i + 1)
+
+    def place(i):
+        assert storefront.place_order(clients[i], email=f'buyer{i}@example.com').status_code == 200
+
+    run_together(place)
+
+    orders, total = storefront.order_store.find_orders()
+    assert total == THREADS
+    assert len({order['order_id'] for order in orders}) == THREADS
+    assert storefront.order_store.sales_dashboard()['totals']['orders'] == THREADS
+    assert len(storefront.smtp.messages) == THREADS
+
+def test_simultaneous_admin_product_writes(storefront):
+    """Products added by several admins at once are all kept"""
+    clients = [storefront.admin_client() for _ in range(THREADS)]
+
+    def add(i):
+        response = clients[i].post('/admin/manage/v_band/add', data={
+            'name': f'Concurrent Clamp {i}', 'description': 'Added concurrently', 'price': '10',
+            'weight': '0.2', 'stock': '1', 'images[]': (io.BytesIO(b'\xff\xd8\xff\xd9'), f'c{i}.jpg')})
+        assert response.status_code == 302
+
+    run_together(add)
+
+    names = {product['name'] for product in storefront.products()}
+    assert {f'Concurrent Clamp {i}' for i in range(THREADS)} <= names
+    assert len(storefront.products()) == 3 + THREADS
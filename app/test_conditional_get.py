@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test script for conditional GET (ETag) handling on catalog pages
+"""
+
+import os
+import shutil
+
+from catalog import get_catalog_revision
+
+CATALOG_URLS = ['/', '/products', '/products/v_band']
+
+def test_catalog_pages_revalidate(storefront):
+    """Catalog pages return an ETag and answer a matching If-None-Match with 304"""
+    client = storefront.client()
+
+    for url in CATALOG_URLS:
+        response = client.get(url)
+        assert response.status_code == 200, url
+        etag = response.headers.get('ETag')
+        assert etag, f"No ETag on {url}"
+        assert 'no-cache' in response.headers['Cache-Control']
+
+        revalidated = client.get(url, headers={'If-None-Match': etag})
+        assert revalidated.status_code == 304, url
+        assert revalidated.data == b''
+        assert revalidated.headers.get('ETag') == etag
+
+def test_cart_change_invalidates_etag(storefront):
+    """Adding to the cart changes the navbar badge, so the ETag must change"""
+    client = storefront.client()
+    etag = client.get('/products').headers['ETag']
+
+    with client.session_transaction() as sess:
+        sess['cart'] = {'v_band:test:{}': {'category_folder': 'v_band', 'product_slug': 'test',
+                                          'quantity': 1, 'specifications': {}, 'shipping': {}}}
+
+    response = client.get('/products', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+def test_fragment_template_edit_changes_revision(storefront):
+    """Editing a template under templates/fragments/ changes the revision cached fragments are keyed on"""
+    app = storefront.app
+    templates = os.path.join(storefront.root, 'templates')
+    shutil.copytree(os.path.join(app.root_path, app.template_folder), templates)
+    app.template_folder = templates
+
+    def revision():
+        with app.test_request_context('/'):
+            return get_catalog_revision()
+
+    before = revision()
+    assert revision() == before
+    with open(os.path.join(templates, 'fragments', 'product_grid.html'), 'a') as f:
+        f.write('\n')
+    assert revision() != before
+
+def test_stock_change_only_invalidates_its_category(storefront):
+    """A checkout changes the stock shown on its category's pages, and no other page's ETag"""
+    browser = storefront.client()
+    etags = {url: browser.get(url).headers['ETag'] for url in CATALOG_URLS}
+
+    buyer = storefront.client()
+    storefront.add_to_cart(buyer, quantity=3)
+    storefront.place_order(buyer)
+
+    for url in ['/', '/products']:
+        assert browser.get(url, headers={'If-None-Match': etags[url]}).status_code == 304, url
+    response = browser.get('/products/v_band', headers={'If-None-Match': etags['/products/v_band']})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etags['/products/v_band']
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test script for exchange rate files, the display currency and paying in it
+"""
+
+import json
+import os
+
+import pytest
+
+from currency import format_amount, normalize_rates, read_rates_file
+
+RATES = {'base': 'EUR', 'rates': {'USD': 1.25, 'INR': 100.0, 'GBP': 0.85, 'XYZ': 3.0}}
+
+def import_rates(storefront, rates=RATES):
+    path = os.path.join(storefront.root, 'rates.json')
+    with open(path, 'w') as f:
+        json.dump(rates, f)
+    result = storefront.app.test_cli_runner().invoke(args=['fx', 'import', path])
+    assert result.exit_code == 0, result.output
+    return result
+
+def test_rates_are_rebased_to_usd(tmp_path):
+    assert normalize_rates(RATES) == {'EUR': 0.8, 'INR': 80.0, 'GBP': 0.68}
+
+    path = tmp_path / 'rates.csv'
+    path.write_text('currency,rate\nINR,88.5\nAED,3.6725\n')
+    assert read_rates_file(str(path)) == {'INR': 88.5, 'AED': 3.6725}
+
+    with pytest.raises(ValueError):
+        normalize_rates({'base': 'EUR', 'rates': {'INR': 100.0}})
+    with pytest.raises(ValueError):
+        normalize_rates({'rates': {'INR': 'n/a'}})
+    assert format_amount(1234.5, 'INR', 80.0) == '₹98,760.00'
+    assert format_amount(10, 'KWD', 0.3071) == 'KWD 3.071'
+
+def test_import_and_refresh_commands(storefront):
+    assert 'Saved 3 rates' in import_rates(storefront).output
+    with open(os.path.join(storefront.data_dir, 'fx_rates.json')) as f:
+        saved = json.load(f)
+    assert saved['base'] == 'USD'
+    assert saved['rates']['INR'] == 80.0
+
+    # Rates APIs use the same document shape; file:// stands in for the download
+    path = os.path.join(storefront.root, 'latest.json')
+    with open(path, 'w') as f:
+        json.dump({'result': 'success', 'base_code': 'USD', 'rates': {'USD': 1, 'INR': 88.0}}, f)
+    result = storefront.app.test_cli_runner().invoke(args=['fx', 'refresh', '--url', f'file://{path}'])
+    assert result.exit_code == 0, result.output
+    with open(os.path.join(storefront.data_dir, 'fx_rates.json')) as f:
+        assert json.load(f)['rates'] == {'INR': 88.0}
+
+    result = storefront.app.test_cli_runner().invoke(args=['fx', 'refresh', '--url', 'file:///missing.json'])
+    assert result.exit_code != 0
+
+def test_pages_follow_the_chosen_currency(storefront):
+    client = storefront.client()
+    page = client.get('/product/v_band/4-inch-v-band-clamp')
+    assert '$12.50' in page.get_data(as_text=True)
+    assert 'name="currency"' not in page.get_data(as_text=True)
+
+    import_rates(storefront)
+    page = client.get('/product/v_band/4-inch-v-band-clamp')
+    assert 'name="currency"' in page.get_data(as_text=True)
+    etag = page.headers['ETag']
+
+    response = client.post('/currency', data={'currency': 'INR', 'next': '/product/v_band/4-inch-v-band-clamp'})
+    assert response.headers['Location'] == '/product/v_band/4-inch-v-band-clamp'
+    page = client.get('/product/v_band/4-inch-v-band-clamp')
+    assert page.headers['ETag'] != etag
+    assert '₹1,000.00' in page.get_data(as_text=True)
+    assert '₹' in client.get('/api/products/v_band').get_json()['html']
+    # Another customer still gets dollars from the fragment cache
+    assert '$12.50' in storefront.client().get('/product/v_band/4-inch-v-band-clamp').get_data(as_text=True)
+
+    info = client.get('/shipping-info/germany?weight=2').get_json()
+    assert info['currency'] == 'USD'
+    assert info['display_currency'] == 'INR'
+    assert info['display_cost'] == round(info['shipping_cost'] * 80, 2)
+
+    # Unknown currencies and off-site redirects are ignored
+    response = client.post('/currency', data={'currency': 'XYZ', 'next': '//evil.example.com/'})
+    assert response.headers['Location'] == '/'
+    storefront.add_to_cart(client)
+    assert '₹980.00' in client.get('/cart').get_data(as_text=True)
+
+def test_orders_are_paid_in_the_chosen_currency(storefront):
+    import_rates(storefront)
+    client = storefront.client()
+    client.post('/currency', data={'currency': 'INR'})
+    storefront.add_to_cart(client, quantity=2)
+    assert storefront.place_order(client).status_code == 200
+
+    order = storefront.order_store.find_orders()[0][0]
+    assert order['currency'] == 'INR' and order['exchange_rate'] == 80.0
+    assert order['payment_info']['currency'] == 'INR'
+    assert order['payment_info']['amount'] == round(order['total'] * 80, 2)
+    assert '₹' in storefront.smtp.messages[0]['message'].get_body(('html',)).get_content()
+
+    # PayPal cannot take rupees, so that checkout is charged in dollars; euros are charged as euros
+    for currency, charged in (('INR', 'USD'), ('EUR', 'EUR')):
+        client.post('/currency', data={'currency': currency})
+        storefront.add_to_cart(client)
+        assert storefront.place_order(client, payment_method='paypal').status_code == 302
+        payment = list(storefront.paypal.payments.values())[-1]
+        assert payment['transactions'][0]['amount']['currency'] == charged
+        client.get(f"/paypal/success?paymentId={payment['id']}&PayerID=PAYER1")
+        with client.session_transaction() as sess:
+            sess['cart'] = {}
+
+    orders, _ = storefront.order_store.find_orders()
+    paid_in_euros = next(o for o in orders if o['payment_info']['currency'] == 'EUR')
+    assert paid_in_euros['payment_info']['amount'] == round(paid_in_euros['total'] * 0.8, 2)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test script for locked, atomic JSON writes under many concurrent writers and readers
+"""
+
+import json
+import multiprocessing
+import os
+import threading
+
+from catalog_cache import CatalogCache
+from datastore import locked, read_json, update_json, write_json
+
+PROCESSES = 4
+THREADS = 4
+WRITES = 25
+
+def append_records(path, writer):
+    for n in range(WRITES):
+        with update_json(path, []) as records:
+            records.append({'writer': writer, 'n': n, 'padding': 'x' * (n * 37 % 200)})
+
+def write_from_threads(path, process_no):
+    threads = [threading.Thread(target=append_records, args=(path, f'{process_no}-{i}'))
+               for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def test_concurrent_writers_and_readers(tmp_path):
+    """Every append from every process and thread is kept; readers only see whole documents"""
+    path = str(tmp_path / 'products.json')
+    write_json(path, [])
+    stop = threading.Event()
+    seen = []
+    errors = []
+
+    def read():
+        cache = CatalogCache()
+        while not stop.is_set():
+            try:
+                direct = read_json(path)
+                cached = cache.load(path)
+            except ValueError as e:
+                errors.append(e)
+                return
+            seen.append((len(direct), len(cached)))
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+
+    context = multiprocessing.get_context('fork')
+    writers = [context.Process(target=write_from_threads, args=(path, i)) for i in range(PROCESSES)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    stop.set()
+    for reader in readers:
+        reader.join()
+
+    assert all(writer.exitcode == 0 for writer in writers)
+    assert errors == []
+    assert seen
+    records = read_json(path)
+    assert len(records) == PROCESSES * THREADS * WRITES
+    for writer_no in range(PROCESSES * THREADS):
+        writer = f'{writer_no // THREADS}-{writer_no % THREADS}'
+        assert [r['n'] for r in records if r['writer'] == writer] == list(range(WRITES))
+    # The cache never hands out an older version than the file
+    assert CatalogCache().load(path) == records
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+def test_lock_is_reentrant(tmp_path):
+    path = str(tmp_path / 'categories.json')
+    with locked(path):
+        with update_json(path, []) as categories:
+            categories.append({'folder': 'v_band'})
+        write_json(path, categories + [{'folder': 't_bolt'}])
+    assert [c['folder'] for c in read_json(path)] == ['v_band', 't_bolt']
+
+def test_failed_update_writes_nothing(tmp_path):
+    path = str(tmp_path / 'categories.json')
+    write_json(path, [{'folder': 'v_band'}])
+    try:
+        with update_json(path, []) as categories:
+            categories.clear()
+            raise RuntimeError('validation failed')
+    except RuntimeError:
+        pass
+    assert read_json(path) == [{'folder': 'v_band'}]
+    assert read_json(str(tmp_path / 'missing.json'), []) == []
+
+def test_each_version_gets_a_new_stamp(tmp_path):
+    """Same-size rewrites in quick succession are still seen by a stat-based cache"""
+    path = str(tmp_path / 'products.json')
+    cache = CatalogCache()
+    for n in range(50):
+        write_json(path, {'n': n % 10})
+        assert cache.load(path) == {'n': n % 10}
+    with open(path) as f:
+        assert json.load(f) == {'n': 9}
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Test script for the rendered fragment cache
+"""
+
+from fragment_cache import FragmentCache
+from app import fragment_cache
+
+def test_lru_eviction_and_stats():
+    """Least recently used entries are evicted and counted per fragment"""
+    cache = FragmentCache(max_entries=2)
+    cache.set('grid', 'a', '<a>')
+    cache.set('grid', 'b', '<b>')
+    assert cache.get('grid', 'a') == '<a>'  # 'a' is now most recent
+    cache.set('tiles', 'c', '<c>')           # evicts 'b'
+
+    assert cache.get('grid', 'b') is None
+    stats = cache.stats()
+    assert stats['grid']['hits'] == 1
+    assert stats['grid']['misses'] == 1
+    assert stats['grid']['evictions'] == 1
+    assert stats['grid']['hit_rate'] == 0.5
+    assert stats['tiles']['entries'] == 1
+
+def test_catalog_pages_use_cache(storefront):
+    """A second render of the category page is served from the fragment cache"""
+    client = storefront.client()
+
+    first = client.get('/products/v_band')
+    hits_before = fragment_cache.stats()['product_grid']['hits']
+    second = client.get('/products/v_band')
+
+    assert first.data == second.data
+    assert fragment_cache.stats()['product_grid']['hits'] == hits_before + 1
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Test script for country matching and the distances shipping is priced on
+"""
+
+
+from geography import COUNTRIES, DistanceTable, country_code, country_name
+from shipping import calculate_shipping_cost, get_shipping_distance, is_shipping_allowed
+
+def test_country_names_codes_and_aliases():
+    for typed in ('United States', 'USA', 'u.s.a.', 'US', 'United States of America', ' united  states '):
+        assert country_code(typed) == 'US', typed
+    assert country_name('UAE') == 'United Arab Emirates'
+    assert country_name('Deutschland') == 'Germany'
+    assert country_name('the Netherlands') == 'Netherlands'
+    assert country_name("Côte d'Ivoire") == 'Ivory Coast'
+    assert country_name('GBR') == 'United Kingdom'
+    # Close spellings, but not between real countries
+    assert country_name('Germnay') == 'Germany'
+    assert country_name('Austria') == 'Austria'
+    assert country_name('Niger') == 'Niger'
+    assert country_code('Narnia') is None
+    assert country_code('') is None
+    assert len({code for code, _, _, _, _ in COUNTRIES}) == len(COUNTRIES)
+
+def test_distances():
+    table = DistanceTable({'equator': (0.0, 0.0), 'works': (28.41, 77.32)})
+    # Along the equator: 37.9 degrees of arc
+    assert round(table.distance('equator', 'Kenya')) == round(6371.0 * 3.14159265 / 2 * 37.9 / 90)
+    assert table.distance('works', 'India') < 1000
+    assert 12000 < table.distance('works', 'USA') < 13500
+    assert table.distance('works', 'Germany') == get_shipping_distance('Deutschland')
+    assert table.distance('works', 'Narnia') is None
+
+def test_shipping_uses_matched_countries():
+    assert calculate_shipping_cost('USA', 10) == calculate_shipping_cost('United States', 10)
+    assert calculate_shipping_cost('in', 2) == calculate_shipping_cost('India', 2) == 11.6
+    assert not is_shipping_allowed('PRC')
+    assert not is_shipping_allowed('Narnia')
+    assert calculate_shipping_cost('Narnia', 10) is None
+
+def test_storefront_country_handling(storefront):
+    client = storefront.client()
+    info = client.get('/shipping-info/uae?weight=2').get_json()
+    assert info['allowed'] and info['country'] == 'United Arab Emirates'
+    assert 'could not find' in client.get('/shipping-info/Narnia').get_json()['message']
+    assert 'do not ship' in client.get('/shipping-info/Pakistan').get_json()['message']
+
+    storefront.add_to_cart(client)
+    response = storefront.place_order(client, country='Narnia')
+    assert response.status_code == 302 and response.headers['Location'].endswith('/checkout')
+    assert storefront.order_store.find_orders()[0] == []
+
+    assert storefront.place_order(client, country='USA').status_code == 200
+    assert storefront.order_store.find_orders()[0][0]['customer_info']['country'] == 'United States'
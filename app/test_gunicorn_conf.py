@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test script for the shipped gunicorn settings
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from harness import write_test_catalog
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG = os.path.join(APP_DIR, 'gunicorn.conf.py')
+
+READ_CONFIG = """
+import json, os, runpy, sys
+settings = runpy.run_path(sys.argv[1])
+names = ['bind', 'worker_class', 'workers', 'threads', 'wsgi_app', 'preload_app', 'max_requests',
+         'max_requests_jitter', 'timeout', 'keepalive']
+print(json.dumps(dict({name: settings[name] for name in names}, catalog_preload=os.environ['CATALOG_PRELOAD'])))
+"""
+
+def read_config(tmp_path, **env):
+    base = {key: value for key, value in os.environ.items()
+            if not key.startswith(('GUNICORN_', 'WEB_CONCURRENCY', 'CATALOG_PRELOAD'))}
+    result = subprocess.run([sys.executable, '-c', READ_CONFIG, CONFIG], cwd=tmp_path, env=dict(base, **env),
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+def test_defaults(tmp_path):
+    settings = read_config(tmp_path)
+    assert settings['worker_class'] == 'gthread'
+    assert 3 <= settings['workers'] <= 12
+    assert settings['threads'] == 4
+    assert settings['wsgi_app'] == 'wsgi:application'
+    assert settings['preload_app'] is True
+    assert settings['catalog_preload'] == '1'
+    assert (settings['max_requests'], settings['max_requests_jitter']) == (1000, 100)
+    assert settings['timeout'] > 30 and settings['keepalive'] > 0
+
+def test_environment_overrides(tmp_path):
+    settings = read_config(tmp_path, GUNICORN_WORKER_CLASS='gevent', WEB_CONCURRENCY='2',
+                           GUNICORN_MAX_REQUESTS='0', CATALOG_PRELOAD='0')
+    assert (settings['workers'], settings['threads']) == (2, 1)
+    assert settings['wsgi_app'] == 'gevent_wsgi:application'
+    assert (settings['max_requests'], settings['max_requests_jitter']) == (0, 0)
+    assert settings['catalog_preload'] == '0'
+
+def test_worker_sizing_limits(tmp_path):
+    assert read_config(tmp_path, GUNICORN_MAX_WORKERS='2')['workers'] <= 2
+    # Workers that each need more memory than the machine has still get one
+    assert read_config(tmp_path, GUNICORN_WORKER_MEMORY_MB=str(2**40))['workers'] == 1
+    assert read_config(tmp_path, WEB_CONCURRENCY='5', GUNICORN_MAX_WORKERS='2')['workers'] == 5
+
+def test_gunicorn_accepts_config(tmp_path):
+    """gunicorn --check-config loads the settings and the preloaded app"""
+    pytest.importorskip('gunicorn')
+    write_test_catalog(str(tmp_path))
+    subprocess.run([sys.executable, '-m', 'gunicorn', '-c', CONFIG, '--check-config'], cwd=tmp_path,
+                   env=dict(os.environ, PYTHONPATH=APP_DIR, LOG_LEVEL='WARNING'), check=True)
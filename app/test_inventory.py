@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Test script for stock levels, checkout reservations and concurrent orders
+"""
+
+import multiprocessing
+import threading
+from urllib.parse import urlparse
+
+import pytest
+
+from inventory import Inventory, OriginOutOfStock, OutOfStock
+
+SKU = 'v_band/4-inch-v-band-clamp'
+PROCESSES = 4
+THREADS = 4
+ATTEMPTS = 10
+
+def order_from_threads(inventory, process_no, results):
+    sold = []
+
+    def buy(thread_no):
+        for n in range(ATTEMPTS):
+            try:
+                inventory.commit(f'ORD-{process_no}-{thread_no}-{n}', {SKU: (1, 50)})
+                sold.append(1)
+            except OutOfStock:
+                pass
+
+    threads = [threading.Thread(target=buy, args=(i,)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put(len(sold))
+
+def test_concurrent_orders_never_oversell(tmp_path):
+    """160 single-unit orders from 4 processes and 16 threads against 50 in stock sell exactly 50"""
+    inventory = Inventory(str(tmp_path / 'orders.db'))
+    assert inventory.available(SKU, 50) == 50
+
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    buyers = [context.Process(target=order_from_threads, args=(inventory, i, results)) for i in range(PROCESSES)]
+    for buyer in buyers:
+        buyer.start()
+    sold = sum(results.get(timeout=60) for _ in buyers)
+    for buyer in buyers:
+        buyer.join()
+
+    assert all(buyer.exitcode == 0 for buyer in buyers)
+    assert sold == 50
+    # The parent's snapshot notices the other processes' commits
+    assert inventory.available(SKU, 50) == 0
+
+def test_reservations_hold_stock_until_released_or_expired(tmp_path):
+    now = [1000.0]
+    inventory = Inventory(str(tmp_path / 'orders.db'), reservation_ttl=60, clock=lambda: now[0])
+
+    inventory.reserve('ORD-1', {SKU: (3, 5)})
+    assert inventory.available(SKU, 5) == 2
+    with pytest.raises(OutOfStock) as error:
+        inventory.reserve('ORD-2', {SKU: (3, 5)})
+    assert error.value.shortages == {SKU: 2}
+
+    inventory.release('ORD-1')
+    assert inventory.available(SKU, 5) == 5
+
+    inventory.reserve('ORD-1', {SKU: (3, 5)})
+    inventory.commit('ORD-3', {'tips/3-inch-tip': (1, 5)})
+    revision = inventory.revision('v_band')
+    other = inventory.revision('tips')
+    now[0] += 61
+    assert inventory.available(SKU, 5) == 5
+    assert inventory.revision('v_band') != revision
+    assert inventory.revision('tips') == other
+    inventory.commit('ORD-2', {SKU: (5, 5)})
+    assert inventory.available(SKU, 5) == 0
+
+def test_commit_uses_the_orders_own_reservation(tmp_path):
+    inventory = Inventory(str(tmp_path / 'orders.db'))
+    inventory.reserve('ORD-1', {SKU: (4, 4)})
+    # Re-reserving (e.g. on return from PayPal) replaces rather than adds
+    inventory.reserve('ORD-1', {SKU: (4, 4)})
+    inventory.commit('ORD-1', {SKU: (4, 4)})
+    assert inventory.available(SKU, 4) == 0
+    with pytest.raises(OutOfStock):
+        inventory.commit('ORD-2', {SKU: (1, 4)})
+
+def test_new_catalog_stock_replaces_on_hand(tmp_path):
+    """An admin edit or catalog import sets the level; untracked products never run out"""
+    inventory = Inventory(str(tmp_path / 'orders.db'))
+    inventory.commit('ORD-1', {SKU: (3, 10)})
+    assert inventory.available(SKU, 10) == 7
+    assert inventory.available(SKU, 20) == 20
+    inventory.commit('ORD-2', {SKU: (1, 20), 'v_band/untracked': (1000, None)})
+    assert inventory.available(SKU, 20) == 19
+    assert inventory.available('v_band/untracked', None) is None
+
+def test_cart_rejects_more_than_in_stock(storefront):
+    client = storefront.client()
+    cart_key = storefront.add_to_cart(client, product_slug='5-inch-v-band-clamp', quantity=40)
+
+    response = client.post('/add-to-cart', json={'category_folder': 'v_band', 'product_slug': '5-inch-v-band-clamp',
+                                                 'quantity': 20, 'specifications': {}})
+    assert response.status_code == 400
+    assert 'Only 50' in response.get_json()['message']
+
+    response = client.post('/update-cart', json={'cart_key': cart_key, 'quantity': 51})
+    assert response.status_code == 400
+    assert client.post('/update-cart', json={'cart_key': cart_key, 'quantity': 50}).get_json()['success']
+
+    response = client.post('/add-to-cart', json={'category_folder': 'v_band', 'product_slug': '6-inch-v-band-clamp',
+                                                 'quantity': 1, 'specifications': {}})
+    assert 'out of stock' in response.get_json()['message']
+
+def test_orders_take_stock_and_paypal_checkouts_hold_it(storefront):
+    first, second = storefront.client(), storefront.client()
+    storefront.add_to_cart(first, product_slug='5-inch-v-band-clamp', quantity=30)
+    storefront.add_to_cart(second, product_slug='5-inch-v-band-clamp', quantity=30)
+
+    assert storefront.place_order(first).status_code == 200
+    response = storefront.place_order(second)
+    assert urlparse(response.headers['Location']).path == '/cart'
+    assert storefront.order_store.count() == 1
+    assert '20 units available' in second.get('/product/v_band/5-inch-v-band-clamp').get_data(as_text=True)
+
+    # A PayPal checkout holds the rest while the customer is at PayPal
+    with second.session_transaction() as sess:
+        sess['cart'] = {}
+    storefront.add_to_cart(second, product_slug='5-inch-v-band-clamp', quantity=20)
+    assert storefront.place_order(second, payment_method='paypal').status_code == 302
+    third = storefront.client()
+    response = third.post('/add-to-cart', json={'category_folder': 'v_band', 'product_slug': '5-inch-v-band-clamp',
+                                                'quantity': 1, 'specifications': {}})
+    assert response.status_code == 400
+
+    second.get('/paypal/cancel')
+    storefront.add_to_cart(third, product_slug='5-inch-v-band-clamp', quantity=20)
+    assert storefront.service('inventory').available('v_band/5-inch-v-band-clamp', 50) == 20
+
+def test_warehouse_lines_are_taken_with_the_order(tmp_path):
+    inventory = Inventory(str(tmp_path / 'orders.db'))
+    origins = {('rotterdam', SKU): (30, 40)}
+    inventory.reserve('ORD-1', {SKU: (30, 100)}, origins=origins)
+    assert inventory.origin_available('rotterdam', SKU, 40) == 10
+    assert inventory.origin_available('houston', SKU, 40) == 40
+
+    # A second order cannot ship those 30 from Rotterdam, and reserves nothing when refused
+    with pytest.raises(OriginOutOfStock) as error:
+        inventory.reserve('ORD-2', {SKU: (20, 100)}, origins={('rotterdam', SKU): (20, 40)})
+    assert error.value.shortages == {('rotterdam', SKU): 10}
+    assert inventory.available(SKU, 100) == 70
+
+    inventory.commit('ORD-1', {SKU: (30, 100)}, origins=origins)
+    assert inventory.origin_available('rotterdam', SKU, 40) == 10
+    inventory.release('ORD-1')
+    assert inventory.origin_available('rotterdam', SKU, 40) == 10
+    # Importing a new stock figure for the warehouse replaces what is left
+    assert inventory.origin_available('rotterdam', SKU, 60) == 60
+
+def test_forced_commit_takes_what_is_left(tmp_path):
+    inventory = Inventory(str(tmp_path / 'orders.db'))
+    inventory.reserve('ORD-1', {SKU: (3, 5)})
+    # The reservation runs out and another order takes most of the stock
+    inventory.release('ORD-1')
+    inventory.commit('ORD-2', {SKU: (3, 5)})
+    with pytest.raises(OutOfStock):
+        inventory.commit('ORD-1', {SKU: (3, 5)})
+    assert inventory.commit('ORD-1', {SKU: (3, 5)}, force=True) == {SKU: 2}
+    assert inventory.available(SKU, 5) == 0
+    assert inventory.commit('ORD-3', {SKU: (0, 5)}) == {}
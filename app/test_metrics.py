@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script for request timing metrics and the /metrics endpoint
+"""
+
+import multiprocessing
+import os
+import shutil
+import threading
+
+from metrics import MetricsCollector
+
+def test_histogram_rendering():
+    """Observations land in cumulative buckets with sum and count"""
+    collector = MetricsCollector(buckets=(0.01, 0.1))
+    collector.observe('request_duration_seconds', 0.005, endpoint='index', status=200)
+    collector.observe('request_duration_seconds', 0.05, endpoint='index', status=200)
+    with collector.span('json_parse'):
+        pass
+
+    text = collector.render()
+    assert '# TYPE qualclamps_request_duration_seconds histogram' in text
+    assert 'qualclamps_request_duration_seconds_bucket{endpoint="index",status="200",le="0.01"} 1' in text
+    assert 'qualclamps_request_duration_seconds_bucket{endpoint="index",status="200",le="+Inf"} 2' in text
+    assert 'qualclamps_request_duration_seconds_count{endpoint="index",status="200"} 2' in text
+    assert 'qualclamps_span_duration_seconds_count{span="json_parse"} 1' in text
+
+def _observe_in_child(directory):
+    collector = MetricsCollector(directory)
+    for _ in range(3):
+        collector.observe('span_duration_seconds', 0.02, span='smtp_send')
+    collector.flush(force=True)
+
+def test_worker_snapshots_are_aggregated(tmp_path):
+    """Series written by other (exited) workers are summed and kept after archiving"""
+    directory = str(tmp_path / 'metrics')
+    collector = MetricsCollector(directory)
+    collector.observe('span_duration_seconds', 0.02, span='smtp_send')
+
+    for _ in range(2):
+        child = multiprocessing.get_context('fork').Process(target=_observe_in_child, args=(directory,))
+        child.start()
+        child.join()
+
+    assert 'qualclamps_span_duration_seconds_count{span="smtp_send"} 7' in collector.render()
+    assert os.listdir(directory).count('metrics-archive.json') == 1
+    # Archived counts are not added twice on the next scrape
+    assert 'qualclamps_span_duration_seconds_count{span="smtp_send"} 7' in collector.render()
+
+def test_concurrent_flushes_never_raise(tmp_path):
+    """Request threads flushing at once share no temporary file, and a failed write is only logged"""
+    directory = str(tmp_path / 'metrics')
+    collector = MetricsCollector(directory, flush_interval=0)
+    errors = []
+    start = threading.Barrier(8)
+
+    def observe():
+        start.wait()
+        try:
+            for _ in range(200):
+                collector.observe('span_duration_seconds', 0.01, span='cart_quote')
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=observe) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    collector.flush(force=True)
+    assert not [name for name in os.listdir(directory) if name.endswith('.tmp')]
+    assert 'qualclamps_span_duration_seconds_count{span="cart_quote"} 1600' in collector.render()
+
+    shutil.rmtree(directory)
+    collector.observe('span_duration_seconds', 0.01, span='cart_quote')  # logs instead of raising
+    assert collector._dirty
+    collector.directory = None  # nothing to write at exit
+
+def test_metrics_endpoint(storefront, monkeypatch):
+    """Requests are timed per route and /metrics needs a token or admin session"""
+    monkeypatch.setenv('METRICS_TOKEN', 'secret')
+    client = storefront.client()
+
+    client.get('/products')
+    assert client.get('/metrics').status_code == 403
+    text = client.get('/metrics', headers={'Authorization': 'Bearer secret'}).get_data(as_text=True)
+    assert 'endpoint="storefront.products",method="GET",status="200"' in text
+    assert 'span="load_categories"' in text
+    assert 'span="template_render",template="products.html"' in text
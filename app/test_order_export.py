@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming order export
+"""
+
+import csv
+import io
+import json
+import os
+import time
+
+from order_export import export_orders
+from order_store import OrderStore
+
+def make_order(order_id, country, method, day):
+    created_at = time.mktime(time.strptime(day, '%Y-%m-%d')) + 3600
+    return {
+        'order_id': order_id,
+        'customer_info': {'name': 'Test', 'email': 'test@example.com', 'country': country,
+                          'payment_method': method, 'shipping_method': 'air'},
+        'order_items': [{'quantity': 5}, {'quantity': 7}],
+        'subtotal': 100.0, 'shipping_cost': 10.0, 'total': 110.0, 'total_weight': 2.5,
+        'payment_info': {'method': method, 'status': 'pending'},
+        'status': 'pending',
+        'created_at': created_at,
+        'created_date': day + ' 01:00:00'
+    }
+
+def add_orders(store):
+    for order in [
+        make_order('ORD-1', 'India', 'upi', '2025-07-01'),
+        make_order('ORD-2', 'Canada', 'paypal', '2025-07-15'),
+        make_order('ORD-3', 'India', 'cod', '2025-08-01'),
+    ]:
+        store.add_order(order)
+    return store
+
+def test_filters_and_formats(tmp_path):
+    """Filters combine, CSV gets a header row and JSONL one order per line"""
+    store = add_orders(OrderStore(os.path.join(str(tmp_path), 'orders.db')))
+
+    csv_text = ''.join(export_orders(store.iter_orders(country='india', date_to='2025-07-31'), 'csv'))
+    lines = csv_text.strip().splitlines()
+    assert lines[0].startswith('order_id,')
+    assert len(lines) == 2 and lines[1].startswith('ORD-1,')
+    assert ',12,' in lines[1]  # total quantity
+
+    jsonl = list(export_orders(store.iter_orders(payment_method='PAYPAL'), 'jsonl'))
+    assert [json.loads(line)['order_id'] for line in jsonl] == ['ORD-2']
+
+def test_csv_cells_cannot_run_formulas(tmp_path):
+    store = OrderStore(os.path.join(str(tmp_path), 'orders.db'))
+    order = make_order('ORD-1', 'India', 'cod', '2025-07-01')
+    order['customer_info'].update(name='=HYPERLINK("http://evil.example","Click")', company='@SUM(A1)',
+                                  city='-2+3', phone='+91 98765 43210')
+    store.add_order(order)
+
+    row = next(csv.DictReader(io.StringIO(''.join(export_orders(store.iter_orders(), 'csv')))))
+    assert row['name'] == '\'=HYPERLINK("http://evil.example","Click")'
+    assert (row['company'], row['city'], row['phone']) == ("'@SUM(A1)", "'-2+3", "'+91 98765 43210")
+    assert row['total'] == '110.0' and row['email'] == 'test@example.com'
+    # JSON Lines keeps the values as entered
+    assert json.loads(next(export_orders(store.iter_orders(), 'jsonl')))['customer_info']['company'] == '@SUM(A1)'
+
+def test_export_endpoint_streams(storefront):
+    """Admins can download filtered orders; bad dates are rejected"""
+    add_orders(storefront.order_store)
+    assert storefront.client().get('/admin/orders/export').status_code == 302
+
+    client = storefront.admin_client()
+    response = client.get('/admin/orders/export?format=jsonl&from=2025-07-10')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert 'attachment' in response.headers['Content-Disposition']
+    assert [json.loads(line)['order_id'] for line in response.data.decode().splitlines()] == ['ORD-2', 'ORD-3']
+
+    assert client.get('/admin/orders/export?from=July').status_code == 400
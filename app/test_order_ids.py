@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test script for the order ID generator
+"""
+
+import multiprocessing
+import threading
+
+from order_ids import LEASE_MS, OrderIdGenerator, parse_order_id
+from order_store import OrderStore
+
+def _issue_ids(db_path, count, queue):
+    generator = OrderIdGenerator(OrderStore(db_path))
+    queue.put([generator.next_id() for _ in range(count)])
+
+def test_ids_sorted_and_decodable(tmp_path):
+    """IDs from one generator are strictly increasing and decode to their parts"""
+    generator = OrderIdGenerator(OrderStore(str(tmp_path / 'orders.db')), clock=lambda: 1753803111.5)
+    ids = [generator.next_id() for _ in range(100)]
+
+    assert ids == sorted(ids) and len(set(ids)) == 100
+    parsed = parse_order_id(ids[5])
+    # The first ID after claiming a worker slot moves to the next millisecond
+    assert parsed['created_at'] == 1753803111.501
+    assert parsed['worker_id'] == generator.worker_id
+    assert parsed['sequence'] == 5
+    assert parse_order_id('ORD-1753803111') is None
+
+def test_clock_going_backwards_stays_monotonic(tmp_path):
+    """A clock step backwards must not reissue or reorder IDs"""
+    now = [1753803111.0]
+    store = OrderStore(str(tmp_path / 'orders.db'))
+    generator = OrderIdGenerator(store, clock=lambda: now[0])
+    first = generator.next_id()
+    now[0] -= 5
+    second = generator.next_id()
+    assert second > first
+
+    # Issuing past the lease records a new high water mark first
+    now[0] += 5 + LEASE_MS / 1000 * 2.5
+    issued = generator.next_id()
+
+    # Another process (or this one after a restart) with the clock a minute behind
+    restarted = OrderIdGenerator(OrderStore(str(tmp_path / 'orders.db')), clock=lambda: now[0] - 60)
+    assert restarted.next_id() > issued
+    # The first generator still holds its slot: this process is alive
+    assert restarted.worker_id != generator.worker_id
+
+def test_unique_across_threads(tmp_path):
+    """Concurrent checkouts in one worker never share an ID"""
+    generator = OrderIdGenerator(OrderStore(str(tmp_path / 'orders.db')))
+    ids = []
+    lock = threading.Lock()
+
+    def issue():
+        batch = [generator.next_id() for _ in range(500)]
+        with lock:
+            ids.extend(batch)
+
+    threads = [threading.Thread(target=issue) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(ids)) == 4000
+
+def test_unique_across_processes(tmp_path):
+    """Separate worker processes never issue the same ID"""
+    db_path = str(tmp_path / 'orders.db')
+    queue = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_issue_ids, args=(db_path, 1000, queue)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    batches = [queue.get(timeout=30) for _ in processes]
+    for process in processes:
+        process.join()
+
+    ids = [order_id for batch in batches for order_id in batch]
+    assert len(set(ids)) == 4000
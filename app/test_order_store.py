@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test script for the indexed order store and order lookup routes
+"""
+
+import json
+
+import pytest
+
+from order_store import OrderStore, InvalidStatusTransition
+
+def make_order(order_id, email='buyer@example.com', created_at=1753803111.0):
+    return {
+        'order_id': order_id,
+        'customer_info': {'name': 'Buyer', 'email': email, 'country': 'India',
+                          'payment_method': 'cod', 'shipping_method': 'air'},
+        'order_items': [{'product': {'name': 'Clamp'}, 'quantity': 2, 'final_total': 10.0}],
+        'subtotal': 10.0, 'shipping_cost': 5.0, 'total': 15.0, 'total_weight': 0.4,
+        'payment_info': {'method': 'cod', 'status': 'pending'},
+        'status': 'pending',
+        'created_at': created_at,
+        'created_date': '2025-07-29 21:01:51'
+    }
+
+def test_status_transitions_are_incremental(tmp_path):
+    """Status changes are validated and recorded in the history"""
+    store = OrderStore(str(tmp_path / 'orders.db'))
+    store.add_order(make_order('ORD-1'))
+
+    store.update_status('ORD-1', 'paid')
+    order = store.update_status('ORD-1', 'shipped', note='DHL 123')
+    assert order['status'] == 'shipped'
+    assert [h['status'] for h in order['status_history']] == ['pending', 'paid', 'shipped']
+    assert order['status_history'][-1]['note'] == 'DHL 123'
+
+    with pytest.raises(InvalidStatusTransition):
+        store.update_status('ORD-1', 'pending')
+    with pytest.raises(KeyError):
+        store.update_status('ORD-404', 'paid')
+
+def test_find_orders_by_index(tmp_path):
+    """Email and status filters use the indexes and paginate newest first"""
+    store = OrderStore(str(tmp_path / 'orders.db'))
+    for i in range(30):
+        store.add_order(make_order(f'ORD-{i:03d}', email=f'buyer{i % 3}@example.com', created_at=1753800000.0 + i))
+
+    orders, total = store.find_orders(email='BUYER1@example.com', limit=5)
+    assert total == 10
+    assert [o['order_id'] for o in orders] == ['ORD-028', 'ORD-025', 'ORD-022', 'ORD-019', 'ORD-016']
+
+    plan = store._connect().execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM orders WHERE email = ? ORDER BY created_at DESC", ('x',)
+    ).fetchall()
+    assert 'idx_orders_email' in ' '.join(row[3] for row in plan)
+
+def test_legacy_orders_json_imported_once(tmp_path):
+    """An existing orders.json is copied into a new store"""
+    legacy = tmp_path / 'orders.json'
+    legacy.write_text(json.dumps([make_order('ORD-1753803111')]))
+    store = OrderStore(str(tmp_path / 'orders.db'), legacy_json=str(legacy))
+    assert store.get_order('ORD-1753803111')['total'] == 15.0
+    assert OrderStore(str(tmp_path / 'orders.db'), legacy_json=str(legacy)).count() == 1
+
+def test_customer_lookup_requires_matching_email(storefront):
+    """Customers only see an order when they give the email it was placed with"""
+    storefront.order_store.add_order(make_order('ORD-1'))
+    client = storefront.client()
+
+    assert client.get('/orders/ORD-1?format=json').status_code == 400
+    assert client.get('/orders/ORD-1?format=json&email=other@example.com').status_code == 404
+    response = client.get('/orders/ORD-1?format=json&email=Buyer@Example.com')
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'pending'
+
+    page = client.post('/orders/ORD-1', data={'email': 'buyer@example.com'})
+    assert b'Clamp' in page.data
+
+def test_admin_list_and_status_update(storefront):
+    """Admins can list orders and move them through their statuses"""
+    store = storefront.order_store
+    store.add_order(make_order('ORD-1'))
+    client = storefront.admin_client()
+
+    assert b'ORD-1' in client.get('/admin/orders?status=pending').data
+    response = client.post('/admin/orders/ORD-1/status', json={'status': 'paid'})
+    assert response.status_code == 200
+    assert store.get_order('ORD-1')['status'] == 'paid'
+    assert client.post('/admin/orders/ORD-1/status', json={'status': 'delivered'}).status_code == 400
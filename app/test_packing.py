@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test script for packing shipments into cartons and their chargeable weight
+"""
+
+import os
+import random
+import time
+
+from catalog import add_india_shipping
+from datastore import write_json
+from packing import OWN_PACKAGING, pack, pack_shipment, packed_dimensions, shipment_signature
+from shipping import calculate_shipping_cost
+
+def clamps(quantity, unit_weight=0.3, dimensions=None):
+    return {'weight': unit_weight * quantity, 'quantity': quantity, 'unit_weight': unit_weight,
+            'dimensions': dimensions}
+
+def test_cartons_are_filled_then_downsized():
+    # 100 clamps to a 30 kg large carton; the last 12 (3.6 kg) go in a small one
+    packages = pack(shipment_signature([clamps(5012)]))
+    assert len(packages) == 51
+    # Clamps have no dimensions, so their cartons are charged on weight, not volume
+    assert packages.count(('large', 30.9, 0.0)) == 50
+    assert ('small', 3.85, 0.0) in packages
+    # Each carton is rounded up on its own: 50 x 31 kg and 3.85 -> 4 kg
+    assert pack_shipment([clamps(5012)]) == (51, 50 * 31.0 + 4.0)
+
+def test_smaller_pieces_fill_the_gaps():
+    # Bulky pieces leave weight to spare, which the clamps use before a new carton opens
+    bulky = clamps(10, 0.5, packed_dimensions({'dimensions_cm': [30, 20, 10]}))
+    cartons, chargeable = pack_shipment([bulky, clamps(20)])
+    assert cartons == 1
+    assert chargeable == 12.0  # 11.9 kg: the clamps have no dimensions, so the carton's volume is not charged
+    assert pack_shipment([bulky]) == (1, 19.5)  # the large carton's volumetric weight, more than its 5.9 kg
+    assert pack_shipment([clamps(1)]) == (1, 1.0)  # 0.3 kg and a small carton's tare, not its 1.8 kg volume
+    assert pack_shipment([clamps(1, 45.0), clamps(1, 1.0, (120.0, 10.0, 10.0))])[0] == 2
+    assert [name for name, _, _ in pack(shipment_signature([clamps(1, 45.0)]))] == [OWN_PACKAGING]
+    assert packed_dimensions({'dimensions_cm': 'big'}) is None
+    assert packed_dimensions({}) is None
+
+def test_signature_ignores_line_order_and_merges_identical_pieces():
+    lines = [clamps(30), clamps(5, 0.4, (12.0, 12.0, 4.0)), clamps(20)]
+    assert shipment_signature(lines) == shipment_signature(lines[::-1])
+    assert shipment_signature(lines) == ((0.3, None, 50), (0.4, (12.0, 12.0, 4.0), 5))
+    assert shipment_signature([clamps(0)]) == ()
+    assert pack_shipment([]) == (0, 0)
+
+def test_large_carts_pack_quickly():
+    rng = random.Random(7)
+    lines = [clamps(rng.randint(1, 2000), round(rng.uniform(0.05, 3.0), 2),
+                    tuple(sorted((rng.randint(2, 30), rng.randint(2, 30), rng.randint(1, 20)), reverse=True)))
+             for _ in range(500)]
+    pack.cache_clear()
+    start = time.perf_counter()
+    cartons, chargeable = pack_shipment(lines)
+    assert time.perf_counter() - start < 5.0  # about 0.1 s; placing 500,000 pieces one by one takes minutes
+    assert cartons > 1000 and chargeable >= sum(line['weight'] for line in lines)
+    assert pack.cache_info().misses == 1
+    assert pack_shipment(lines[::-1]) == (cartons, chargeable)
+    assert pack.cache_info().hits == 1
+
+def test_shipping_estimates_are_packed_like_orders(storefront):
+    """The product page's estimate charges the cartons, as the cart does, not the raw weight"""
+    client = storefront.client()
+    info = client.get('/shipping-info/germany?weight=30&quantity=100').get_json()
+    assert info['cartons'] == 1 and info['chargeable_weight_kg'] == 31.0  # 30 kg of clamps and the carton
+    assert info['shipping_weight_kg'] == 31
+    assert info['shipping_cost'] == calculate_shipping_cost('Germany', 31.0, 100)
+
+    for query in ('weight=heavy', 'weight=nan', 'weight=-1', 'quantity=many', 'quantity=0'):
+        response = client.get(f'/shipping-info/germany?{query}')
+        assert response.status_code == 400, query
+        assert not response.get_json()['allowed']
+
+def test_listing_and_product_page_quote_what_the_cart_charges(storefront):
+    products = storefront.products()
+    products[0]['dimensions_cm'] = [30, 20, 10]  # a small carton's 1.8 kg volumetric weight, not its 0.55 kg
+    write_json(os.path.join(storefront.data_dir, 'v_band', 'products.json'), products)
+    client = storefront.client()
+    storefront.add_to_cart(client)
+    quotes = {country: client.post('/cart-shipping', json={'country': country}).get_json()['shipping_total']
+              for country in ('India', 'Germany')}
+
+    with storefront.app.test_request_context():
+        assert add_india_shipping(products[:1])[0]['india_shipping'] == quotes['India']
+    page = storefront.client().get('/product/v_band/4-inch-v-band-clamp').get_data(as_text=True)
+    assert f"${quotes['Germany']:,.2f}" in page
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test script for category listing pagination and sorting
+"""
+
+import os
+
+import catalog
+from catalog import paginate_products, get_product_size, load_categories
+from datastore import write_json
+
+SYNTHETIC_PRODUCTS = [
+    {'name': f'{size} inch V-Band Clamp', 'price': price}
+    for size, price in [(5.88, 7.0), (2.5, 9.5), (4.75, 5.3), (3.0, 6.1), (10.5, 12.0)]
+]
+
+def test_paginate_and_sort():
+    """Pages are cut after sorting and report their neighbours"""
+    first = paginate_products(SYNTHETIC_PRODUCTS, page=1, per_page=2, sort='size')
+    assert [get_product_size(p) for p in first['items']] == [2.5, 3.0]
+    assert first['pages'] == 3 and first['has_next'] and not first['has_prev']
+
+    last = paginate_products(SYNTHETIC_PRODUCTS, page=99, per_page=2, sort='price_desc')
+    assert last['page'] == 3
+    assert [p['price'] for p in last['items']] == [5.3]
+    assert not last['has_next']
+
+def test_default_sort_keeps_catalog_order():
+    """Without a sort the catalog file order is preserved"""
+    page = paginate_products(SYNTHETIC_PRODUCTS, per_page=10)
+    assert page['items'] == SYNTHETIC_PRODUCTS
+
+def test_infinite_scroll_endpoint(storefront):
+    """The JSON endpoint returns rendered cards for the requested page"""
+    client = storefront.client()
+    response = client.get('/api/products/v_band?per_page=1&page=1')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['success'] and data['page'] == 1
+    assert data['html'].count('class="product-card"') == 1
+    assert 'loading="lazy"' in data['html']
+
+    assert client.get('/api/products/no_such_category').status_code == 404
+
+def test_page_links_keep_the_page_size(storefront):
+    page = storefront.client().get('/products/v_band?per_page=1&page=2&sort=price').get_data(as_text=True)
+    assert '/products/v_band?page=1&amp;per_page=1&amp;sort=price' in page
+    assert '/products/v_band?page=3&amp;per_page=1&amp;sort=price' in page
+    assert '<input type="hidden" name="per_page" value="1">' in page
+
+def test_category_counts_do_not_copy_products(storefront, monkeypatch):
+    """Listing categories counts products off the parsed files instead of loading each category"""
+    def copy_products(folder):
+        raise AssertionError(f'{folder} products were copied to count them')
+    monkeypatch.setattr(catalog, 'load_products', copy_products)
+
+    assert [category['count'] for category in load_categories()] == [3]
+    write_json(os.path.join(storefront.data_dir, 'v_band', 'products.json'), storefront.products()[:2])
+    assert [category['count'] for category in load_categories()] == [2]
+    assert storefront.client().get('/products').status_code == 200
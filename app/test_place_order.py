@@ -1,56 +1,117 @@
 #!/usr/bin/env python3
 """
-Debug script to test place_order function
+Test script for order placement (COD and PayPal) against the test harness
 """
 
-import requests
-import json
-
-def test_place_order():
-    """Test the place_order endpoint with debug info"""
-    
-    # Test data for placing an order
-    test_data = {
-        'name': 'Test Customer',
-        'email': 'test@example.com',
-        'phone': '+1234567890',
-        'company': 'Test Company',
-        'address': '123 Test Street',
-        'city': 'Test City',
-        'state': 'Test State',
-        'country': 'United States',
-        'postal_code': '12345',
-        'shipping_method': 'air',
-        'payment_method': 'paypal',
-        'notes': 'Test order'
-    }
-    
-    try:
-        # First, let's check if the checkout page loads
-        print("🔍 Testing checkout page...")
-        checkout_response = requests.get('http://127.0.0.1:5000/checkout')
-        print(f"Checkout page status: {checkout_response.status_code}")
-        
-        if checkout_response.status_code == 302:
-            print("🛒 Cart is empty - checkout redirected")
-            return
-        
-        # Test the place_order endpoint
-        print("\n📦 Testing place_order endpoint...")
-        response = requests.post('http://127.0.0.1:5000/place-order', data=test_data)
-        
-        print(f"Response status: {response.status_code}")
-        print(f"Response headers: {dict(response.headers)}")
-        
-        if response.status_code == 302:
-            print(f"🔄 Redirect to: {response.headers.get('Location', 'Unknown')}")
-        else:
-            print(f"Response content preview: {response.text[:500]}...")
-            
-    except requests.exceptions.ConnectionError:
-        print("❌ Connection failed - make sure Flask app is running")
-    except Exception as e:
-        print(f"❌ Error: {e}")
-
-if __name__ == "__main__":
-    test_place_order()
+import sqlite3
+from urllib.parse import urlparse
+
+SKU_5_INCH = 'v_band/5-inch-v-band-clamp'
+
+def test_cod_order_is_stored_and_emailed(storefront):
+    """A COD order is saved, the sales team is e-mailed and the cart is emptied"""
+    client = storefront.client()
+    storefront.add_to_cart(client, quantity=3)
+
+    response = storefront.place_order(client)
+    assert response.status_code == 200
+
+    orders, total = storefront.order_store.find_orders()
+    assert total == 1
+    order = orders[0]
+    assert order['order_id'] in response.get_data(as_text=True)
+    assert order['status'] == 'pending'
+    assert order['order_items'][0]['quantity'] == 3
+    assert order['total'] == order['subtotal'] + order['shipping_cost']
+
+    assert len(storefront.smtp.messages) == 1
+    assert storefront.smtp.messages[0]['recipients'] == ['sales@qualclamps.com']
+    assert order['order_id'] in storefront.smtp.messages[0]['subject']
+
+    with client.session_transaction() as sess:
+        assert sess['cart'] == {}
+
+def test_missing_fields_and_empty_cart_redirect(storefront):
+    client = storefront.client()
+    assert storefront.place_order(client).headers['Location'].endswith('/cart')
+
+    storefront.add_to_cart(client)
+    response = storefront.place_order(client, email='')
+    assert response.headers['Location'].endswith('/checkout')
+    assert storefront.order_store.count() == 0
+    assert storefront.smtp.messages == []
+
+def test_paypal_order_completes_after_approval(storefront):
+    """PayPal orders redirect for approval and are stored as paid on return"""
+    client = storefront.client()
+    storefront.add_to_cart(client, quantity=2)
+
+    response = storefront.place_order(client, payment_method='paypal')
+    assert response.status_code == 302
+    approval_url = response.headers['Location']
+    assert approval_url.startswith(storefront.paypal.url)
+    assert storefront.order_store.count() == 0
+
+    payment_id = next(iter(storefront.paypal.payments))
+    response = client.get(f'/paypal/success?paymentId={payment_id}&PayerID=PAYER1')
+    assert response.status_code == 200
+    assert storefront.paypal.payments[payment_id]['state'] == 'approved'
+
+    orders, _ = storefront.order_store.find_orders()
+    assert orders[0]['status'] == 'paid'
+    assert orders[0]['payment_info']['transaction_id'] == payment_id
+    assert len(storefront.smtp.messages) == 1
+
+def test_paypal_failure_returns_to_checkout(storefront):
+    client = storefront.client()
+    storefront.add_to_cart(client)
+    storefront.paypal.fail_next = True
+
+    response = storefront.place_order(client, payment_method='paypal')
+    assert urlparse(response.headers['Location']).path == '/checkout'
+    assert storefront.order_store.count() == 0
+
+def test_paypal_without_approval_url_releases_stock(storefront, monkeypatch):
+    """A created payment with no approval link returns to checkout and lets the stock go"""
+    create = storefront.paypal.create
+    monkeypatch.setattr(storefront.paypal, 'create',
+                        lambda body: dict(create(body), links=[]))
+    client = storefront.client()
+    storefront.add_to_cart(client, product_slug='5-inch-v-band-clamp', quantity=50)
+
+    response = storefront.place_order(client, payment_method='paypal')
+    assert urlparse(response.headers['Location']).path == '/checkout'
+    assert storefront.order_store.count() == 0
+    assert storefront.service('inventory').available(SKU_5_INCH, 50) == 50
+    with client.session_transaction() as sess:
+        assert 'pending_order' not in sess
+
+def test_order_that_cannot_be_stored_keeps_its_stock(storefront, monkeypatch):
+    """If the order insert fails, the stock it claimed is released, not sold"""
+    def fail(order):
+        raise sqlite3.OperationalError('database is locked')
+    monkeypatch.setattr(storefront.order_store, 'add_order', fail)
+    client = storefront.client()
+    storefront.add_to_cart(client, product_slug='5-inch-v-band-clamp', quantity=50)
+
+    assert storefront.place_order(client).status_code == 500
+    assert storefront.service('inventory').available(SKU_5_INCH, 50) == 50
+
+def test_order_short_after_it_is_stored_still_takes_its_stock(storefront, monkeypatch):
+    """If other orders took the stock while it was being stored, the order takes what is left and holds nothing"""
+    add_order = storefront.order_store.add_order
+    inventory = storefront.service('inventory')
+
+    def add_order_while_others_buy(order):
+        add_order(order)
+        inventory.release(order['order_id'])  # as if its reservation had run out
+        inventory.commit('ANOTHER-ORDER', {SKU_5_INCH: (45, 50)})
+    monkeypatch.setattr(storefront.order_store, 'add_order', add_order_while_others_buy)
+    client = storefront.client()
+    storefront.add_to_cart(client, product_slug='5-inch-v-band-clamp', quantity=10)
+
+    assert storefront.place_order(client).status_code == 200
+    assert storefront.order_store.count() == 1
+    assert inventory.available(SKU_5_INCH, 50) == 0
+    with sqlite3.connect(inventory.db_path) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM stock_reservations').fetchone()[0] == 0
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script for contract price lists: compiling, importing and pricing the cart with them
+"""
+
+import json
+import os
+
+from pricing import PriceBook, STANDARD_DISCOUNTS, bulk_discount_rate, validate_price_lists
+
+SKU = 'v_band/4-inch-v-band-clamp'
+PRICE_LISTS = [
+    {'id': 'acme', 'name': 'ACME Exhaust', 'code': 'ACME-2026',
+     'discounts': [[1, 0.0], [250, 0.05]],
+     'products': {SKU: {'price': 9.8, 'options': {'Material': {'Stainless': 1.2}}}}},
+    {'id': 'fleet', 'name': 'Fleet Parts', 'code': 'fleet'},
+]
+
+def import_price_lists(storefront, price_lists=PRICE_LISTS, *args):
+    path = os.path.join(storefront.root, 'price_lists.json')
+    with open(path, 'w') as f:
+        json.dump(price_lists, f)
+    return storefront.app.test_cli_runner().invoke(args=['pricing', 'import', path, *args])
+
+def test_price_book_lookups():
+    book = PriceBook(PRICE_LISTS)
+    assert book.codes == {'ACME-2026': 'acme', 'FLEET': 'fleet'}
+    assert book.base_price('acme', SKU, 12.5) == 9.8
+    assert book.base_price('fleet', SKU, 12.5) == 12.5
+    assert book.base_price(None, SKU, 12.5) == 12.5
+    assert book.option_modifier('acme', SKU, 'Material', 'Stainless', 2.0) == 1.2
+    assert book.option_modifier('acme', SKU, 'Material', 'Mild steel', 0.0) == 0.0
+    assert book.discount_rate('acme', 300) == 0.05
+    assert book.discount_rate('acme', 20) == 0.0
+    assert book.discount_rate('fleet', 20) == bulk_discount_rate(20, STANDARD_DISCOUNTS) == 0.05
+
+def test_validation():
+    assert validate_price_lists(PRICE_LISTS) == []
+    assert validate_price_lists({'id': 'acme'}) == ['The file must contain a list of price lists']
+    errors = validate_price_lists([
+        {'id': 'a', 'name': 'A', 'code': 'X', 'discounts': [[10, 1.5]]},
+        {'id': 'a', 'name': '', 'code': 'x', 'products': {SKU: {'price': -1}}},
+    ])
+    assert any('between 0 and 1' in e for e in errors)
+    assert any('duplicate id' in e for e in errors)
+    assert any('duplicate code' in e for e in errors)
+    assert any('name is required' in e for e in errors)
+    assert any('cannot be negative' in e for e in errors)
+
+def test_import_command(storefront):
+    result = import_price_lists(storefront, [{'id': 'bad'}])
+    assert result.exit_code != 0
+    assert not os.path.exists(os.path.join(storefront.data_dir, 'price_lists.json'))
+
+    result = import_price_lists(storefront, PRICE_LISTS, '--dry-run')
+    assert result.exit_code == 0 and 'Dry run' in result.output
+    assert not os.path.exists(os.path.join(storefront.data_dir, 'price_lists.json'))
+
+    result = import_price_lists(storefront)
+    assert result.exit_code == 0, result.output
+    assert 'Saved 2 price list(s)' in result.output
+
+def test_cart_and_order_use_the_applied_price_list(storefront):
+    assert import_price_lists(storefront).exit_code == 0
+    client = storefront.client()
+    storefront.add_to_cart(client, quantity=10, specifications={'Material': 'Stainless'})
+    assert '$142.10' in client.get('/cart').get_data(as_text=True)
+
+    client.post('/price-list', data={'code': 'nope'})
+    page = client.get('/cart').get_data(as_text=True)
+    assert 'That price list code is not valid.' in page
+    assert '$142.10' in page
+
+    client.post('/price-list', data={'code': ' acme-2026 '})
+    page = client.get('/cart').get_data(as_text=True)
+    assert 'ACME Exhaust pricing applied.' in page
+    assert '$110.00' in page
+
+    # A list removed from the file stops applying
+    assert import_price_lists(storefront, PRICE_LISTS[1:]).exit_code == 0
+    assert '$142.10' in client.get('/cart').get_data(as_text=True)
+    assert import_price_lists(storefront).exit_code == 0
+
+    assert storefront.place_order(client).status_code == 200
+    order = storefront.order_store.find_orders()[0][0]
+    assert order['price_list'] == 'acme'
+    assert order['subtotal'] == 110.0
+
+    client.post('/price-list', data={'code': ''})
+    with client.session_transaction() as sess:
+        assert 'price_list' not in sess
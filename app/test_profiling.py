@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Test script for the admin-only request profiler
+"""
+
+import os
+
+from profiling import RequestProfiler
+
+def test_profiles_are_saved_and_pruned(tmp_path):
+    """Only the newest profiles are kept, and they list the top functions"""
+    profiler = RequestProfiler(str(tmp_path), keep=2, top_n=5)
+    for i in range(3):
+        running = profiler.start()
+        sorted(range(1000), key=lambda x: -x)
+        profile = profiler.finish(running, 0.01 * (i + 1), path=f'/page/{i}')
+
+    assert [p['path'] for p in profiler.slowest()] == ['/page/2', '/page/1']
+    assert len(profile['top_functions']) <= 5
+    assert os.path.exists(profiler.prof_path(profile['id']))
+    assert profiler.get('../etc/passwd') is None
+
+def test_profiling_requires_admin(storefront):
+    """Anonymous profile requests run normally; admin ones are saved and listed"""
+    client = storefront.client()
+
+    response = client.get('/products', headers={'X-Profile': '1'})
+    assert response.status_code == 200
+    assert 'X-Profile-ID' not in response.headers
+
+    client = storefront.admin_client()
+    response = client.get('/products', headers={'X-Profile': '1'})
+    profile_id = response.headers['X-Profile-ID']
+    assert b'<html' in response.data
+
+    text = client.get('/products?_profile=text').get_data(as_text=True)
+    assert 'function calls' in text
+
+    profiles = client.get('/admin/profile?format=json').get_json()['profiles']
+    assert profile_id in [p['id'] for p in profiles]
+    assert client.get(f'/admin/profile/{profile_id}').status_code == 200
+    assert b'Request Profiles' in client.get('/admin/profile').data
+    assert os.listdir(os.path.join(storefront.data_dir, 'profiles'))
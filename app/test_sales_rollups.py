@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test script for the incrementally maintained sales rollups and dashboard
+"""
+
+import time
+
+from order_store import OrderStore
+from sales_rollups import compute_rollups
+
+def make_order(order_id, country='India', method='cod', total=15.0, quantity=2, created_at=None):
+    return {
+        'order_id': order_id,
+        'customer_info': {'name': 'Buyer', 'email': 'buyer@example.com', 'country': country,
+                          'payment_method': method},
+        'order_items': [{'product': {'name': 'V-Band Clamp 4"', 'oem': 'EXCO 123'},
+                         'quantity': quantity, 'final_total': total - 5.0, 'total_weight': 0.2 * quantity}],
+        'total': total, 'total_weight': 0.2 * quantity,
+        'payment_info': {'method': method, 'status': 'pending'},
+        'status': 'pending',
+        'created_at': created_at or 1753803111.0,
+    }
+
+def rollup_rows(store):
+    rows = store._connect().execute(
+        'SELECT dimension, key, label, orders, quantity, ROUND(revenue, 6), ROUND(weight_kg, 6) FROM sales_rollup'
+    ).fetchall()
+    return sorted(tuple(row) for row in rows)
+
+def test_rollups_follow_orders_and_cancellations(tmp_path):
+    """Adding orders updates every dimension; cancelling subtracts them again"""
+    store = OrderStore(str(tmp_path / 'orders.db'))
+    store.add_order(make_order('ORD-1'))
+    store.add_order(make_order('ORD-2', country='germany', method='paypal', total=25.0, quantity=3))
+
+    stats = store.sales_dashboard(days=100000)
+    assert stats['totals']['orders'] == 2
+    assert stats['totals']['revenue'] == 40.0
+    assert [row['key'] for row in stats['by_country']] == ['Germany', 'India']
+    assert {row['key']: row['orders'] for row in stats['by_payment_method']} == {'paypal': 1, 'cod': 1}
+    assert stats['top_products'][0]['quantity'] == 5
+    assert stats['top_products'][0]['label'] == 'EXCO 123'
+
+    store.update_status('ORD-2', 'cancelled')
+    stats = store.sales_dashboard(days=100000)
+    assert stats['totals']['orders'] == 1
+    assert stats['totals']['revenue'] == 15.0
+    assert [row['key'] for row in stats['by_country']] == ['India']
+
+def test_rebuild_matches_incremental_rollups(tmp_path):
+    """Recomputing from the order history gives the same rows as incremental updates"""
+    store = OrderStore(str(tmp_path / 'orders.db'))
+    for i in range(20):
+        store.add_order(make_order(f'ORD-{i}', country=['India', 'USA', 'UK'][i % 3],
+                                   method=['cod', 'paypal'][i % 2], total=10.0 + i,
+                                   quantity=1 + i % 4, created_at=1753800000.0 + i * 86400))
+    store.update_status('ORD-3', 'cancelled')
+    incremental = rollup_rows(store)
+
+    store.rebuild_rollups()
+    # Cancelled orders leave zero rows behind incrementally; rebuild drops them
+    assert [row for row in incremental if row[3] != 0] == rollup_rows(store)
+
+def test_compute_rollups_skips_cancelled_orders():
+    rows = compute_rollups([make_order('ORD-1'), dict(make_order('ORD-2'), status='cancelled')])
+    totals = [row for row in rows if row[0] == 'total'][0]
+    assert totals[3:6] == (1, 2, 15.0)
+
+def test_admin_dashboard(storefront):
+    """The dashboard needs an admin session and renders rollup figures"""
+    storefront.order_store.add_order(make_order('ORD-1', created_at=time.time()))
+    assert storefront.client().get('/admin/dashboard').status_code == 302
+
+    client = storefront.admin_client()
+    response = client.get('/admin/dashboard?format=json')
+    assert response.get_json()['totals']['orders'] == 1
+    assert len(response.get_json()['by_day']) == 1
+    assert b'EXCO 123' in client.get('/admin/dashboard').data
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Test script for the gevent serving mode and background e-mails
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from harness import write_test_catalog
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+GEVENT_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, sys.argv[1])
+from gevent import monkey
+monkey.patch_all()
+import gevent, serving
+from app import create_app
+app = create_app({'MAIL_SERVER': '127.0.0.1', 'MAIL_PORT': int(sys.argv[2]), 'MAIL_USE_TLS': False,
+                  'MAIL_USERNAME': None, 'MAIL_PASSWORD': None, 'MAIL_SUPPRESS_SEND': False})
+started = time.perf_counter()
+status = app.test_client().post('/contact', data={'name': 'Greenlet', 'inquiry': 'Quote'}).status_code
+responded = time.perf_counter() - started
+pending = len(serving._pending)
+gevent.joinall(list(serving._pending))
+print(json.dumps({'status': status, 'responded': responded, 'pending': pending}))
+"""
+
+def test_contact_mail_sent_in_background_under_gevent(tmp_path, smtp_server):
+    """The response does not wait for a slow SMTP server, and the message still arrives"""
+    pytest.importorskip('gevent')
+    write_test_catalog(str(tmp_path))
+    smtp_server.clear()
+    smtp_server.latency = 1.0
+    try:
+        result = subprocess.run([sys.executable, '-c', GEVENT_SCRIPT, APP_DIR, str(smtp_server.port)],
+                                cwd=tmp_path, capture_output=True, text=True, check=True,
+                                env=dict(os.environ, LOG_LEVEL='WARNING'))
+        subjects = [m['subject'] for m in smtp_server.messages]
+    finally:
+        smtp_server.clear()
+    outcome = json.loads(result.stdout.splitlines()[-1])
+    assert outcome['status'] == 302
+    assert outcome['pending'] == 1
+    assert outcome['responded'] < 1.0
+    assert subjects == ['Contact Form: Quote - Greenlet']
+
+def test_sync_workers_send_inline(storefront):
+    storefront.smtp.latency = 0.2
+    response = storefront.client().post('/contact', data={'name': 'Inline', 'inquiry': 'Quote'})
+    assert response.status_code == 302
+    assert [m['subject'] for m in storefront.smtp.messages] == ['Contact Form: Quote - Inline']
@@ -9,7 +9,7 @@ import os
 # Add the current directory to Python path
 sys.path.insert(0, '/Users/themagician/QualityClamps_Flask')
 
-from app import calculate_shipping_cost
+from shipping import calculate_shipping_cost, get_shipping_distance
 
 def test_shipping_calculations():
     """Test the updated shipping calculations"""
@@ -58,7 +58,7 @@ def test_shipping_calculations():
     
     print("\n🎯 Rate Verification:")
     # Test base rate calculation
-    base_cost_no_discount = (12000 / 1000) * 10 * 14  # US distance, 10kg, $14 rate
+    base_cost_no_discount = (get_shipping_distance("United States") / 1000) * 10 * 14  # US distance, 10kg, $14 rate
     discounted_base = base_cost_no_discount * 0.5  # 50% discount
     print(f"Base calculation (no quantity discount): ${discounted_base:.2f}")
     
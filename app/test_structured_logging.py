@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Test script for structured, queue-based logging
+"""
+
+import io
+import json
+import logging
+
+from flask import Flask, g
+
+from structured_logging import configure_logging, SamplingFilter
+
+def test_json_lines_carry_request_id_and_fields():
+    """Records are written by the listener as JSON with request ID and extra fields"""
+    stream = io.StringIO()
+    test_app = Flask('logging_test')
+    listener = configure_logging(test_app, logger_names=('logging_test',), level='INFO',
+                                 fmt='json', sample_rate=1.0, stream=stream)
+    logger = logging.getLogger('logging_test')
+
+    with test_app.test_request_context('/'):
+        g.request_id = 'abc123'
+        logger.info('Order %s saved', 'ORD-1', extra={'order_id': 'ORD-1'})
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            logger.exception('Failed')
+    logger.debug('not emitted at INFO')
+    listener.stop()
+
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert len(entries) == 2
+    assert entries[0]['message'] == 'Order ORD-1 saved'
+    assert entries[0]['request_id'] == 'abc123'
+    assert entries[0]['order_id'] == 'ORD-1'
+    assert entries[1]['level'] == 'ERROR'
+    assert 'ValueError: boom' in entries[1]['exception']
+
+def test_debug_sampling():
+    """Only DEBUG records are sampled"""
+    record = logging.LogRecord('x', logging.DEBUG, '', 0, 'debug', (), None)
+    assert not SamplingFilter(0.0).filter(record)
+    assert SamplingFilter(1.0).filter(record)
+    record.levelno = logging.INFO
+    assert SamplingFilter(0.0).filter(record)
+
+def test_request_id_header(storefront):
+    """Responses echo a valid incoming X-Request-ID and generate one otherwise"""
+    client = storefront.client()
+    assert client.get('/contact', headers={'X-Request-ID': 'edge-42'}).headers['X-Request-ID'] == 'edge-42'
+    generated = client.get('/contact', headers={'X-Request-ID': 'bad id!'}).headers['X-Request-ID']
+    assert len(generated) == 32
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test script for warehouses and choosing the cheapest origin for each order
+"""
+
+import json
+import os
+
+from shipping import calculate_shipping_cost
+from warehouses import ShippingNetwork, validate_warehouses
+
+SKU = 'v_band/4-inch-v-band-clamp'
+OTHER_SKU = 'v_band/5-inch-v-band-clamp'
+ROTTERDAM = {'id': 'rotterdam', 'name': 'Rotterdam stock point', 'country': 'Netherlands',
+             'latitude': 51.92, 'longitude': 4.48, 'rate_multiplier': 1.5, 'handling_fee': 10.0,
+             'stock': {SKU: 500}}
+HOUSTON = {'id': 'houston', 'name': 'Houston stock point', 'country': 'USA',
+           'latitude': 29.76, 'longitude': -95.37, 'domestic_rate_per_kg': 3.0, 'stock': {OTHER_SKU: 100}}
+
+def lines(*quantities):
+    return [{'sku': sku, 'weight': quantity * 0.3, 'quantity': quantity}
+            for sku, quantity in zip((SKU, OTHER_SKU), quantities)]
+
+def test_works_only_matches_calculate_shipping_cost():
+    plan = ShippingNetwork([]).plan('Germany', lines(10, 5))
+    shipment = plan['shipments'][0]
+    assert shipment['cartons'] == 1 and shipment['chargeable_weight'] == 5.0  # 4.5 kg in a small carton
+    assert plan['cost'] == calculate_shipping_cost('Germany', 5.0, 15)
+    assert [s['origin'] for s in plan['shipments']] == ['faridabad']
+    assert ShippingNetwork([]).plan('Pakistan', lines(1)) is None
+
+def test_cheapest_origin_and_split():
+    network = ShippingNetwork([ROTTERDAM, HOUSTON])
+    # Rotterdam is much closer to Germany, even at 1.5 times the rate plus handling
+    plan = network.plan('Germany', lines(100))
+    assert [s['origin'] for s in plan['shipments']] == ['rotterdam']
+    assert plan['cost'] < calculate_shipping_cost('Germany', 30, 100)
+
+    # Not enough stock in Rotterdam: everything comes from the works
+    assert [s['origin'] for s in network.plan('Germany', lines(600))['shipments']] == ['faridabad']
+    # Nor once orders have taken most of it, or when two lines of the SKU need more than it has
+    left = network.plan('Germany', lines(100), available=lambda origin, sku, stock: stock - 450)
+    assert [s['origin'] for s in left['shipments']] == ['faridabad']
+    assert [s['origin'] for s in network.plan('Germany', lines(300) + lines(300))['shipments']] == ['faridabad']
+
+    # Each line from its nearest stock point beats either single origin
+    plan = network.plan('United States', lines(400, 100))
+    assert sorted(s['origin'] for s in plan['shipments']) == ['houston', 'rotterdam']
+    assert plan['cost'] == round(sum(s['cost'] for s in plan['shipments']), 2)
+    houston = next(s for s in plan['shipments'] if s['origin'] == 'houston')
+    assert houston['skus'] == [OTHER_SKU] and houston['cost'] == round(3.0 * 31 * (1 - 0.14), 2)  # domestic rate on a full carton, 100 pcs discount
+
+def test_validation():
+    assert validate_warehouses([ROTTERDAM, HOUSTON]) == []
+    errors = validate_warehouses([
+        dict(ROTTERDAM, country='Atlantis'),
+        dict(ROTTERDAM, latitude=95),
+        dict(HOUSTON, id='faridabad', stock={SKU: 'lots'}),
+    ])
+    assert any('unknown country Atlantis' in e for e in errors)
+    assert any('duplicate id' in e for e in errors)
+    assert any('latitude must be between' in e for e in errors)
+    assert any('stock of' in e and 'must be a number' in e for e in errors)
+
+def test_orders_ship_from_the_chosen_warehouse(storefront):
+    path = os.path.join(storefront.root, 'warehouses.json')
+    with open(path, 'w') as f:
+        json.dump([ROTTERDAM], f)
+    runner = storefront.app.test_cli_runner()
+    result = runner.invoke(args=['warehouses', 'import', path])
+    assert result.exit_code == 0, result.output
+    assert 'Saved 1 warehouse(s)' in result.output
+
+    client = storefront.client()
+    storefront.add_to_cart(client, quantity=100)
+    response = storefront.place_order(client, country='Germany')
+    assert 'Rotterdam stock point' in response.get_data(as_text=True)
+    order = storefront.order_store.find_orders()[0][0]
+    assert [s['origin'] for s in order['shipments']] == ['rotterdam']
+    assert order['shipping_cost'] == order['shipments'][0]['cost']
+
+    # The order took its clamps off Rotterdam's stock, so a larger order now ships from the works
+    inventory = storefront.service('inventory')
+    assert inventory.origin_available('rotterdam', SKU, 500) == 400
+    client = storefront.client()
+    storefront.add_to_cart(client, quantity=450)
+    storefront.place_order(client, country='Germany')
+    orders, _ = storefront.order_store.find_orders()
+    assert [s['origin'] for s in orders[0]['shipments']] == ['faridabad']
+    assert inventory.origin_available('rotterdam', SKU, 500) == 400
+
+def test_paypal_checkout_holds_warehouse_stock_until_cancelled(storefront):
+    path = os.path.join(storefront.root, 'warehouses.json')
+    with open(path, 'w') as f:
+        json.dump([ROTTERDAM], f)
+    assert storefront.app.test_cli_runner().invoke(args=['warehouses', 'import', path]).exit_code == 0
+    inventory = storefront.service('inventory')
+
+    client = storefront.client()
+    storefront.add_to_cart(client, quantity=100)
+    storefront.place_order(client, country='Germany', payment_method='paypal')
+    assert inventory.origin_available('rotterdam', SKU, 500) == 400
+    client.get('/paypal/cancel')
+    assert inventory.origin_available('rotterdam', SKU, 500) == 500
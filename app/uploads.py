@@ -0,0 +1,84 @@
+"""
+Image upload handling for the admin product forms
+
+Only imported by the admin views, so storefront workers never load it.
+"""
+
+import os
+import time
+
+from flask import current_app
+from werkzeug.utils import secure_filename
+
+from app import logger
+
+# File upload helper functions
+def allowed_file(filename):
+    """Check if file extension is allowed"""
+    return '.' in filename and \
+           os.path.splitext(filename)[1].lower() in current_app.config['UPLOAD_EXTENSIONS']
+
+def save_uploaded_file(file, filename=None):
+    """Save uploaded file with proper error handling and verification"""
+    try:
+        if not file:
+            return None, "No file object provided"
+            
+        if not file.filename:
+            return None, "No filename provided"
+        
+        logger.debug('Upload started', extra={'upload_filename': file.filename})
+        
+        # Check file extension
+        if not allowed_file(file.filename):
+            allowed_exts = ', '.join(current_app.config['UPLOAD_EXTENSIONS'])
+            return None, f"File type not allowed. Allowed types: {allowed_exts}"
+        
+        # Use provided filename or secure the original filename
+        if filename:
+            secure_name = filename
+        else:
+            secure_name = secure_filename(file.filename)
+        
+        if not secure_name:
+            return None, "Invalid filename after security check"
+        
+        # Add timestamp to avoid naming conflicts
+        timestamp = str(int(time.time()))
+        name_parts = secure_name.rsplit('.', 1)
+        if len(name_parts) == 2:
+            secure_name = f"{name_parts[0]}_{timestamp}.{name_parts[1]}"
+        else:
+            secure_name = f"{secure_name}_{timestamp}"
+        
+        # Ensure upload directory exists
+        upload_dir = current_app.config['UPLOAD_FOLDER']
+        if not os.path.exists(upload_dir):
+            os.makedirs(upload_dir, exist_ok=True)
+            logger.info('Created upload directory', extra={'path': upload_dir})
+        
+        # Save file
+        file_path = os.path.join(upload_dir, secure_name)
+        
+        # Save the file
+        file.save(file_path)
+        
+        # Verify file was saved and has content
+        if not os.path.exists(file_path):
+            return None, f"File was not saved to {file_path}"
+        
+        file_size = os.path.getsize(file_path)
+        if file_size == 0:
+            try:
+                os.remove(file_path)
+            except:
+                pass
+            return None, "Uploaded file is empty"
+        
+        logger.info('Upload saved', extra={'path': file_path, 'size_bytes': file_size})
+        return secure_name, None
+        
+    except Exception as e:
+        error_msg = f"Error saving file: {str(e)}"
+        logger.exception('Upload failed', extra={'upload_filename': getattr(file, 'filename', None)})
+        return None, error_msg
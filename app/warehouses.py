@@ -0,0 +1,212 @@
+"""
+Stock points abroad, and choosing where each order ships from
+
+Besides the Faridabad works, which can ship everything, we keep stock at
+warehouses listed in data/warehouses.json, loaded with
+`flask warehouses import <file>`:
+
+    [{"id": "rotterdam", "name": "Rotterdam stock point", "country": "Netherlands",
+      "latitude": 51.92, "longitude": 4.48,
+      "rate_multiplier": 1.1, "handling_fee": 15.0, "domestic_rate_per_kg": 4.0,
+      "stock": {"v_band/4-inch-v-band-clamp": 2000}}]
+
+rate_multiplier scales the distance (or domestic) rate for freight leaving
+that warehouse, handling_fee is added once per shipment from it, and stock
+is pieces on hand by SKU (inventory.product_sku). The inventory takes what
+orders ship from each warehouse off that count, and a warehouse only ships
+a SKU it can still send the order's full quantity of.
+
+The file is read through the catalog cache and, once per version, turned
+into a ShippingNetwork holding the distance from every origin to every
+country. Planning an order reads the destination's column of that matrix as
+a per-kg rate for each origin, then prices two kinds of plan: everything
+from one origin (for each origin that stocks the whole order) and each line
+from the origin with the lowest rate for it. The cheapest plan wins.
+"""
+
+import json
+import os
+
+from flask import g
+
+from app import catalog_cache, metrics
+from datastore import write_json
+from geography import INDEX, DistanceTable, country_code
+from packing import pack_shipment
+from shipping import DOMESTIC_RATE_PER_KG, ORIGIN, ORIGINS, is_shipping_allowed, rate_per_kg, shipment_cost
+
+WAREHOUSES_FILE = os.path.join('data', 'warehouses.json')
+
+WORKS = {
+    'id': ORIGIN,
+    'name': 'Faridabad works',
+    'country': ORIGINS[ORIGIN][0],
+    'latitude': ORIGINS[ORIGIN][1],
+    'longitude': ORIGINS[ORIGIN][2],
+    'rate_multiplier': 1.0,
+    'handling_fee': 0.0,
+    'domestic_rate_per_kg': DOMESTIC_RATE_PER_KG,
+    'stock': None,  # Ships everything; stock is checked by the inventory
+}
+
+
+def _number(value, what):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{what} must be a number')
+
+
+def validate_warehouses(warehouses):
+    """Check a warehouses document; returns a list of error messages"""
+    if not isinstance(warehouses, list):
+        return ['The file must contain a list of warehouses']
+    errors = []
+    ids = {ORIGIN}
+    for n, warehouse in enumerate(warehouses, 1):
+        if not isinstance(warehouse, dict):
+            errors.append(f'Warehouse {n}: must be an object')
+            continue
+        label = f'Warehouse {warehouse.get("id", n)}'
+        for field in ('id', 'name', 'country'):
+            if not str(warehouse.get(field) or '').strip():
+                errors.append(f'{label}: {field} is required')
+        if warehouse.get('id') in ids:
+            errors.append(f'{label}: duplicate id')
+        ids.add(warehouse.get('id'))
+        if warehouse.get('country') and country_code(warehouse['country']) is None:
+            errors.append(f'{label}: unknown country {warehouse["country"]}')
+
+        try:
+            if not -90 <= _number(warehouse.get('latitude'), 'latitude') <= 90:
+                raise ValueError('latitude must be between -90 and 90')
+            if not -180 <= _number(warehouse.get('longitude'), 'longitude') <= 180:
+                raise ValueError('longitude must be between -180 and 180')
+            if _number(warehouse.get('rate_multiplier', 1.0), 'rate_multiplier') <= 0:
+                raise ValueError('rate_multiplier must be positive')
+            for field in ('handling_fee', 'domestic_rate_per_kg'):
+                if _number(warehouse.get(field, 0), field) < 0:
+                    raise ValueError(f'{field} cannot be negative')
+            for sku, quantity in (warehouse.get('stock') or {}).items():
+                if _number(quantity, f'stock of {sku}') < 0:
+                    raise ValueError(f'stock of {sku} cannot be negative')
+        except (ValueError, AttributeError) as e:
+            errors.append(f'{label}: {e}')
+    return errors
+
+
+class ShippingNetwork:
+    """The works and the warehouses, with the distance from each to every country"""
+
+    def __init__(self, warehouses):
+        self.origins = [WORKS]
+        for warehouse in warehouses:
+            self.origins.append({
+                'id': warehouse['id'],
+                'name': warehouse['name'],
+                'country': country_code(warehouse['country']),
+                'latitude': float(warehouse['latitude']),
+                'longitude': float(warehouse['longitude']),
+                'rate_multiplier': float(warehouse.get('rate_multiplier', 1.0)),
+                'handling_fee': float(warehouse.get('handling_fee', 0.0)),
+                'domestic_rate_per_kg': float(warehouse.get('domestic_rate_per_kg', DOMESTIC_RATE_PER_KG)),
+                'stock': {sku: int(quantity) for sku, quantity in (warehouse.get('stock') or {}).items()},
+            })
+        self.by_id = {origin['id']: origin for origin in self.origins}
+        self.distances = DistanceTable({origin['id']: (origin['latitude'], origin['longitude'])
+                                        for origin in self.origins})
+
+    def stocks(self, origin, sku, quantity, available=None):
+        """Whether an origin can ship quantity of sku; available(origin id, sku, file stock) gives live units"""
+        if origin['stock'] is None:
+            return True
+        stock = origin['stock'].get(sku, 0)
+        return (available(origin['id'], sku, stock) if available else stock) >= quantity
+
+    @metrics.timed('shipping_plan')
+    def plan(self, country, lines, method='air', available=None):
+        """The cheapest way to ship lines to a country, or None if we do not ship there.
+
+        lines are dicts with 'sku', 'weight' (kg for the whole line),
+        'quantity' and optionally 'unit_weight' and 'dimensions' (see
+        packing.shipment_signature). Warehouses are held to their stock in
+        the file unless available (Inventory.origin_available) gives what
+        they have left. Each shipment is packed into cartons and charged on
+        their chargeable weight. Returns {'cost': total, 'shipments':
+        [{'origin', 'name', 'skus', 'quantities', 'weight', 'cartons',
+        'chargeable_weight', 'quantity', 'cost'}, ...]}.
+        """
+        if not is_shipping_allowed(country):
+            return None
+        destination = country_code(country)
+        column = INDEX[destination]
+        per_kg = {
+            origin['id']: rate_per_kg(self.distances.rows[origin['id']][column],
+                                      domestic=origin['country'] == destination,
+                                      rate_multiplier=origin['rate_multiplier'],
+                                      domestic_rate=origin['domestic_rate_per_kg'])
+            for origin in self.origins
+        }
+
+        # Lines of one SKU (different specifications) may share an origin, so each must stock them all
+        quantities = {}
+        for line in lines:
+            quantities[line['sku']] = quantities.get(line['sku'], 0) + line['quantity']
+        options = [[origin['id'] for origin in self.origins
+                    if self.stocks(origin, line['sku'], quantities[line['sku']], available)] for line in lines]
+        candidates = {tuple(origin['id'] for _ in lines)
+                      for origin in self.origins if all(origin['id'] in ids for ids in options)}
+        candidates.add(tuple(min(ids, key=per_kg.get) for ids in options))
+        return min((self.price(assignment, lines, per_kg, method) for assignment in candidates),
+                   key=lambda plan: (plan['cost'], len(plan['shipments'])))
+
+    def price(self, assignment, lines, per_kg, method):
+        shipments = {}
+        shipment_lines = {}
+        for origin_id, line in zip(assignment, lines):
+            shipment = shipments.setdefault(origin_id, {
+                'origin': origin_id, 'name': self.by_id[origin_id]['name'], 'skus': [], 'quantities': {},
+                'weight': 0.0, 'quantity': 0})
+            shipment['skus'].append(line['sku'])
+            shipment['quantities'][line['sku']] = shipment['quantities'].get(line['sku'], 0) + line['quantity']
+            shipment['weight'] += line['weight']
+            shipment['quantity'] += line['quantity']
+            shipment_lines.setdefault(origin_id, []).append(line)
+
+        for shipment in shipments.values():
+            origin = self.by_id[shipment['origin']]
+            shipment['cartons'], shipment['chargeable_weight'] = pack_shipment(shipment_lines[origin['id']])
+            shipment['cost'] = round(shipment_cost(per_kg[origin['id']], shipment['chargeable_weight'],
+                                                   shipment['quantity'], method)
+                                     + origin['handling_fee'], 2)
+        return {'cost': round(sum(s['cost'] for s in shipments.values()), 2), 'shipments': list(shipments.values())}
+
+    def origin_lines(self, shipments):
+        """Inventory lines {(origin, sku): (quantity, file stock)} for the shipments leaving warehouses"""
+        lines = {}
+        for shipment in shipments:
+            origin = self.by_id.get(shipment['origin'])
+            if origin is None or origin['stock'] is None:
+                continue
+            for sku, quantity in shipment.get('quantities', {}).items():
+                lines[origin['id'], sku] = (quantity, origin['stock'].get(sku, 0))
+        return lines
+
+
+def parse_warehouses(f):
+    return ShippingNetwork(json.load(f))
+
+
+WORKS_ONLY = ShippingNetwork([])
+
+
+def save_warehouses(warehouses):
+    """Replace data/warehouses.json after validate_warehouses() found no errors"""
+    write_json(WAREHOUSES_FILE, warehouses)
+
+
+def shipping_network():
+    """The current origins and distances, checked against the file once per request"""
+    if 'shipping_network' not in g:
+        g.shipping_network = catalog_cache.load(WAREHOUSES_FILE, parse=parse_warehouses) or WORKS_ONLY
+    return g.shipping_network
@@ -10,16 +10,18 @@ import sys
 sys.path.insert(0, os.path.dirname(__file__))
 
 try:
-    from app import app
-    application = app  # This is the WSGI application callable for Gunicorn
+    from app import create_app
+    application = create_app()  # This is the WSGI application callable for Gunicorn
 
     # For local development only:
     # Use `python wsgi.py` to test
-    # For production, use Gunicorn: `gunicorn wsgi:application --bind 127.0.0.1:8000`
+    # For production, use Gunicorn with the shipped settings: `gunicorn -c gunicorn.conf.py`
+    # (preloads this module with CATALOG_PRELOAD=1, so the catalog is parsed once in the
+    # master and shared by the forked workers)
 
 except ImportError as e:
     print(f"Error importing app: {e}")
     sys.exit(1)
 except Exception as e:
     print(f"Error starting application: {e}")
-    sys.exit(1)
\ No newline at end of file
+    sys.exit(1)